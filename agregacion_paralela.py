@@ -0,0 +1,267 @@
+# ====================================
+# AGREGACIÓN PARALELA POR BLOQUES DE FILAS
+# ====================================
+# Conceptos: paralelismo de datos, agregados parciales combinables,
+#            ThreadPoolExecutor / ProcessPoolExecutor, memoria compartida
+
+# Un groupby o un describe() de pandas usa un solo núcleo. En un servidor
+# con 32 núcleos, 31 están parados mientras el dashboard calcula.
+#
+# La idea es la misma que en el cubo de ventas combinado por bloques
+# (ver cubo_ventas.combinar_cubos): se divide la tabla en bloques de filas,
+# cada bloque se agrega por separado y los resultados parciales se combinan.
+# Como los bloques son independientes, se pueden calcular a la vez:
+#
+#   - Con hilos, cada tarea recibe una vista del DataFrame (sin copiarlo).
+#     Las operaciones de NumPy y los groupby de pandas liberan el GIL
+#     mientras recorren los arrays, así que varios hilos avanzan a la vez.
+#   - Con procesos, cada tarea recibe solo la ruta del dataset compartido
+#     y su rango de filas (ver dataset_compartido.py): cada proceso mapea
+#     los mismos archivos y solo viaja de vuelta el resultado parcial.
+#
+# Los parciales que se combinan son:
+#   - El cubo Producto × Región (sumas, conteos, mínimos y máximos).
+#   - Por columna: conteo, media y M2 (fórmula de Chan, ver
+#     ingesta_csv.EstadisticasColumna), mínimo, máximo y, para columnas
+#     enteras, un histograma con el que los cuartiles son exactos.
+
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from cubo_ventas import combinar_cubos, construir_cubo
+from dataset_compartido import abrir
+from datos_ventas import MEDIDAS
+from ingesta_csv import CUANTILES, EstadisticasColumna
+
+# Con menos filas por bloque que esto no compensa repartir el trabajo
+FILAS_MINIMAS = 250_000
+
+# Rango máximo (máximo - mínimo) de una columna entera para usar histograma;
+# con rangos mayores los cuartiles se calculan sobre una muestra
+RANGO_HISTOGRAMA = 1 << 22
+
+# Tipos de ejecutor disponibles
+EJECUTORES = ['hilos', 'procesos']
+
+
+def rangos_filas(n_filas, n_partes, filas_minimas=FILAS_MINIMAS):
+    """Divide n_filas en como mucho n_partes rangos [inicio, fin) de tamaño parecido
+
+    Nunca crea bloques de menos de filas_minimas filas (salvo si hay menos
+    filas en total, en cuyo caso devuelve un único rango).
+    """
+    n_partes = max(1, min(n_partes, n_filas // max(filas_minimas, 1)))
+    limites = np.linspace(0, n_filas, n_partes + 1).astype('int64')
+    return [(int(a), int(b)) for a, b in zip(limites[:-1], limites[1:])]
+
+
+# ------------------------------------
+# Agregados parciales de un bloque
+# ------------------------------------
+
+def _histograma(valores):
+    """Histograma (mínimo, conteos) de una columna entera o None si no procede"""
+    if len(valores) == 0 or valores.dtype.kind not in 'iu':
+        return None
+    minimo, maximo = int(valores.min()), int(valores.max())
+    if maximo - minimo > RANGO_HISTOGRAMA:
+        return None
+    return minimo, np.bincount((valores - minimo).astype('int64'), minlength=maximo - minimo + 1)
+
+
+def _combinar_histogramas(a, b):
+    """Suma dos histogramas (mínimo, conteos) que pueden empezar en valores distintos"""
+    if a is None or b is None:
+        return None
+    minimo = min(a[0], b[0])
+    fin = max(a[0] + len(a[1]), b[0] + len(b[1]))
+    conteos = np.zeros(fin - minimo, dtype='int64')
+    for inicio, parcial in (a, b):
+        conteos[inicio - minimo:inicio - minimo + len(parcial)] += parcial
+    return minimo, conteos
+
+
+def _cuantiles_histograma(histograma, qs=CUANTILES):
+    """Cuantiles exactos (interpolación lineal, como pandas) de un histograma"""
+    minimo, conteos = histograma
+    n = int(conteos.sum())
+    # acumulado[i] = posición (en el orden) de la última fila con valor minimo + i
+    acumulado = np.cumsum(conteos) - 1
+    resultado = []
+    for q in qs:
+        posicion = q * (n - 1)
+        abajo = int(np.floor(posicion))
+        v_abajo = minimo + np.searchsorted(acumulado, abajo)
+        v_arriba = minimo + np.searchsorted(acumulado, min(abajo + 1, n - 1))
+        resultado.append(float(v_abajo + (v_arriba - v_abajo) * (posicion - abajo)))
+    return resultado
+
+
+def estadisticas_bloque(df, columnas, semilla=0):
+    """Estadísticas parciales de cada columna de un bloque de filas"""
+    parciales = {}
+    for columna in columnas:
+        valores = df[columna].to_numpy()
+        estadisticas = EstadisticasColumna(semilla=semilla)
+        estadisticas.actualizar(valores)
+        sin_nulos = valores.dtype.kind in 'iu'
+        parciales[columna] = (estadisticas, _histograma(valores) if sin_nulos else None)
+    return parciales
+
+
+def combinar_estadisticas(parciales):
+    """Combina las estadísticas parciales de varios bloques"""
+    total = {}
+    for parcial in parciales:
+        for columna, (estadisticas, histograma) in parcial.items():
+            if columna not in total:
+                total[columna] = (estadisticas, histograma)
+                continue
+            acumuladas, acumulado = total[columna]
+            total[columna] = (acumuladas.combinar(estadisticas),
+                              _combinar_histogramas(acumulado, histograma))
+    return total
+
+
+def describir(estadisticas):
+    """Convierte estadísticas combinadas en un DataFrame con el formato de describe()
+
+    Con histograma los cuartiles son exactos; sin él (columnas decimales)
+    se calculan sobre la muestra, como en app_03_datos.py.
+    """
+    resumen = {}
+    for columna, (acumuladas, histograma) in estadisticas.items():
+        datos = acumuladas.resumen()
+        if histograma is not None and acumuladas.conteo:
+            for q, valor in zip(CUANTILES, _cuantiles_histograma(histograma)):
+                datos[f'{q:.0%}'] = valor
+        resumen[columna] = datos
+    return pd.DataFrame(resumen)
+
+
+def _tarea_compartida(ruta, inicio, fin, columnas, semilla):
+    """Tarea para un proceso: abre el dataset compartido y agrega su rango de filas"""
+    bloque = abrir(ruta).iloc[inicio:fin]
+    if columnas is None:
+        return construir_cubo(bloque)
+    return estadisticas_bloque(bloque, columnas, semilla)
+
+
+# ------------------------------------
+# Agregador
+# ------------------------------------
+
+class AgregadorParalelo:
+    """Calcula el cubo y describe() repartiendo bloques de filas entre núcleos
+
+    trabajadores es el número de hilos o procesos (por defecto, uno por
+    núcleo). ejecutor puede ser 'hilos' o 'procesos'; los procesos solo se
+    usan cuando se indica la ruta de un dataset compartido, porque enviarles
+    un DataFrame obligaría a copiarlo.
+    """
+
+    def __init__(self, trabajadores=None, ejecutor='hilos', filas_minimas=FILAS_MINIMAS):
+        if ejecutor not in EJECUTORES:
+            raise ValueError(f"Ejecutor desconocido: {ejecutor} (opciones: {EJECUTORES})")
+        self.trabajadores = trabajadores or os.cpu_count() or 1
+        self.ejecutor = ejecutor
+        self.filas_minimas = filas_minimas
+        self._hilos = None
+        self._procesos = None
+        # Varias sesiones pueden pedir el pool a la vez: se crea una sola vez
+        self._cerrojo = threading.Lock()
+
+    def _pool_hilos(self):
+        with self._cerrojo:
+            if self._hilos is None:
+                self._hilos = ThreadPoolExecutor(self.trabajadores,
+                                                 thread_name_prefix='agregacion')
+            return self._hilos
+
+    def _pool_procesos(self):
+        # 'spawn' en lugar de 'fork': el servidor de Streamlit tiene hilos en marcha
+        with self._cerrojo:
+            if self._procesos is None:
+                self._procesos = ProcessPoolExecutor(
+                    self.trabajadores, mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._procesos
+
+    def _mapear(self, df, ruta, funcion, columnas):
+        """Aplica la agregación a cada bloque de filas y devuelve los parciales"""
+        rangos = rangos_filas(len(df), self.trabajadores, self.filas_minimas)
+        if len(rangos) == 1:
+            # Pocos datos: repartir costaría más que calcular directamente
+            return [funcion(df, 0)]
+        if self.ejecutor == 'procesos' and ruta is not None:
+            pool = self._pool_procesos()
+            futuros = [pool.submit(_tarea_compartida, ruta, inicio, fin, columnas, i)
+                       for i, (inicio, fin) in enumerate(rangos)]
+        else:
+            pool = self._pool_hilos()
+            # iloc con un rango de filas devuelve una vista, no una copia
+            futuros = [pool.submit(funcion, df.iloc[inicio:fin], i)
+                       for i, (inicio, fin) in enumerate(rangos)]
+        return [futuro.result() for futuro in futuros]
+
+    def cubo(self, df, ruta=None):
+        """Cubo Producto × Región de df (igual que construir_cubo(df))
+
+        ruta es la carpeta del dataset compartido del que sale df; solo
+        hace falta con ejecutor='procesos'.
+        """
+        parciales = self._mapear(df, ruta, lambda bloque, _: construir_cubo(bloque), None)
+        return parciales[0] if len(parciales) == 1 else combinar_cubos(parciales)
+
+    def _mapear_bloques(self, bloques, funcion):
+        """Aplica funcion(bloque, número) a cada bloque de un iterable en el pool
+
+        Los bloques se leen en el hilo principal y se agregan en el pool
+        mientras se leen los siguientes. Como mucho hay dos bloques por
+        trabajador en espera, así que nunca se tiene todo el dataset en memoria
+        (pool.map() leería todos los bloques antes de empezar).
+        """
+        pool = self._pool_hilos()
+        pendientes, parciales = deque(), []
+        for i, bloque in enumerate(bloques):
+            pendientes.append(pool.submit(funcion, bloque, i))
+            if len(pendientes) >= 2 * self.trabajadores:
+                parciales.append(pendientes.popleft().result())
+        parciales.extend(futuro.result() for futuro in pendientes)
+        return parciales
+
+    def cubo_por_bloques(self, bloques):
+        """Cubo de un iterable de DataFrames (por ejemplo, lotes de Parquet)"""
+        return combinar_cubos(self._mapear_bloques(bloques, lambda bloque, _: construir_cubo(bloque)))
+
+    def describe(self, df, columnas=MEDIDAS, ruta=None):
+        """Estadísticas con el formato de df[columnas].describe()"""
+        parciales = self._mapear(
+            df, ruta, lambda bloque, semilla: estadisticas_bloque(bloque, columnas, semilla),
+            list(columnas),
+        )
+        return describir(combinar_estadisticas(parciales))
+
+    def describe_por_bloques(self, bloques, columnas=MEDIDAS):
+        """describe() de un iterable de DataFrames (por ejemplo, lotes de Parquet)"""
+        parciales = self._mapear_bloques(
+            bloques, lambda bloque, semilla: estadisticas_bloque(bloque, columnas, semilla))
+        if not parciales:
+            # Sin filas: el mismo resultado que describe() de un DataFrame vacío
+            vacio = pd.DataFrame({c: np.empty(0, dtype='int64') for c in columnas})
+            parciales = [estadisticas_bloque(vacio, columnas)]
+        return describir(combinar_estadisticas(parciales))
+
+    def cerrar(self):
+        """Detiene los hilos y procesos del agregador"""
+        with self._cerrojo:
+            for pool in (self._hilos, self._procesos):
+                if pool is not None:
+                    pool.shutdown(wait=False, cancel_futures=True)
+            self._hilos = self._procesos = None
@@ -0,0 +1,232 @@
+# ====================================
+# ALMACÉN DE VENTAS EN PARQUET
+# ====================================
+# Conceptos: almacenamiento columnar, particiones, filtros empujados
+#            a la lectura (predicate pushdown), proyección de columnas
+
+# En un CSV, para quedarte con las ventas de una región tienes que leer
+# TODO el archivo y filtrar después. Parquet guarda los datos por columnas
+# y en "grupos de filas" con estadísticas (mínimo y máximo de cada columna),
+# y pyarrow permite organizar los archivos en carpetas por partición:
+#
+#     ventas/
+#       Región=Norte/parte-0.parquet
+#       Región=Sur/parte-0.parquet
+#       ...
+#
+# Al leer con filtros:
+#   - Las particiones que no coinciden (carpetas de otras regiones) ni se abren.
+#   - Los grupos de filas cuyo mínimo/máximo de Producto no incluye los
+#     productos pedidos se saltan (por eso se escriben ordenados por Producto).
+#   - Solo se leen las columnas pedidas (Producto, Región, Total...).
+# Así, filtrar un histórico de 100 millones de filas lee una pequeña
+# parte de los bytes del disco.
+
+import json
+import os
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from datos_ventas import DIMENSIONES, aplicar_esquema
+
+# Columnas por las que se crean carpetas (deben tener pocos valores distintos)
+PARTICIONES = ['Región']
+
+# Columna por la que se ordena cada bloque antes de escribirlo, para que
+# las estadísticas de los grupos de filas permitan saltárselos al filtrar
+COLUMNA_ORDEN = 'Producto'
+
+# Filas por grupo de filas dentro de cada archivo Parquet
+FILAS_POR_GRUPO = 128 * 1024
+
+# Archivo con los valores de las dimensiones (para los filtros del sidebar)
+ARCHIVO_DIMENSIONES = '_dimensiones.json'
+
+
+def _tabla_arrow(bloque):
+    """Convierte un bloque de pandas a tabla Arrow con las dimensiones como texto
+
+    Las columnas Categorical de pandas se guardan como texto normal:
+    Parquet ya las comprime con diccionario, y así todos los bloques
+    tienen exactamente el mismo esquema.
+    """
+    categoricas = bloque.select_dtypes(include='category').columns
+    bloque = bloque.astype({c: 'str' for c in categoricas})
+    return pa.Table.from_pandas(bloque, preserve_index=False).replace_schema_metadata(None)
+
+
+def escribir_ventas(bloques, directorio, particiones=PARTICIONES,
+                    columna_orden=COLUMNA_ORDEN, filas_por_grupo=FILAS_POR_GRUPO):
+    """Escribe ventas en un dataset Parquet particionado
+
+    bloques puede ser un DataFrame o un iterable de DataFrames (por ejemplo
+    datos_ventas.generar_ventas_por_bloques()), así que se pueden escribir
+    cientos de millones de filas sin tenerlas todas en memoria.
+    Si el directorio ya existe, se reemplaza su contenido.
+    """
+    if hasattr(bloques, 'columns'):
+        bloques = [bloques]
+
+    valores = {dimension: set() for dimension in DIMENSIONES}
+    esquema = {}
+
+    def lotes():
+        for bloque in bloques:
+            if columna_orden in bloque.columns:
+                bloque = bloque.sort_values(columna_orden, kind='stable')
+            for dimension in valores:
+                if dimension in bloque.columns:
+                    valores[dimension].update(bloque[dimension].unique().tolist())
+            tabla = _tabla_arrow(bloque)
+            esquema.setdefault('esquema', tabla.schema)
+            yield from tabla.to_batches()
+
+    iterador = lotes()
+    primero = next(iterador, None)
+    if primero is None:
+        raise ValueError("No hay datos que escribir")
+
+    def todos():
+        yield primero
+        yield from iterador
+
+    particionado = ds.partitioning(
+        pa.schema([esquema['esquema'].field(c) for c in particiones]), flavor='hive'
+    )
+    ds.write_dataset(
+        todos(), directorio, schema=esquema['esquema'], format='parquet',
+        partitioning=particionado, basename_template='parte-{i}.parquet',
+        max_rows_per_group=filas_por_grupo, min_rows_per_group=filas_por_grupo // 2,
+        existing_data_behavior='delete_matching',
+    )
+
+    with open(os.path.join(directorio, ARCHIVO_DIMENSIONES), 'w', encoding='utf-8') as f:
+        json.dump({d: sorted(v) for d, v in valores.items() if v}, f, ensure_ascii=False)
+
+
+class OrigenParquet:
+    """Origen de datos de ventas respaldado por un dataset Parquet particionado
+
+    Es el equivalente a "una base de datos": en lugar de cargar todas las
+    ventas en memoria, cada consulta lee solo las particiones, grupos de
+    filas y columnas que necesita.
+    """
+
+    def __init__(self, directorio):
+        self.directorio = directorio
+        self.dataset = ds.dataset(directorio, format='parquet', partitioning='hive',
+                                  exclude_invalid_files=True)
+
+    def valores(self, dimension):
+        """Valores distintos de una dimensión (sin leer los datos)"""
+        ruta = os.path.join(self.directorio, ARCHIVO_DIMENSIONES)
+        if os.path.exists(ruta):
+            with open(ruta, encoding='utf-8') as f:
+                return json.load(f).get(dimension, [])
+        columna = self.dataset.to_table(columns=[dimension]).column(dimension)
+        return sorted(columna.unique().to_pylist())
+
+    def version(self):
+        """Identificador que cambia cuando cambian los archivos del dataset"""
+        return max((os.path.getmtime(f) for f in self.dataset.files), default=0)
+
+    @staticmethod
+    def filtro(productos=None, regiones=None):
+        """Expresión de filtro de pyarrow para las selecciones del sidebar
+
+        None significa "sin filtrar esa dimensión".
+        """
+        expresion = None
+        for campo, seleccion in (('Producto', productos), ('Región', regiones)):
+            if seleccion is None:
+                continue
+            seleccion = list(seleccion)
+            # isin([]) no sabe el tipo de la columna: nada seleccionado = ninguna fila
+            condicion = ds.field(campo).isin(seleccion) if seleccion else ds.scalar(False)
+            expresion = condicion if expresion is None else expresion & condicion
+        return expresion
+
+    def leer(self, productos=None, regiones=None, columnas=None):
+        """Lee las ventas filtradas como DataFrame (con el esquema de tipos)
+
+        Los filtros se aplican durante la lectura (no después) y columnas
+        limita las columnas que se leen del disco.
+        """
+        tabla = self.dataset.to_table(columns=columnas, filter=self.filtro(productos, regiones))
+        return aplicar_esquema(tabla.to_pandas())
+
+    def leer_por_bloques(self, productos=None, regiones=None, columnas=None):
+        """Igual que leer() pero devuelve un iterador de DataFrames (uno por lote)"""
+        for lote in self.dataset.to_batches(columns=columnas,
+                                            filter=self.filtro(productos, regiones)):
+            if lote.num_rows:
+                yield aplicar_esquema(lote.to_pandas())
+
+    def contar(self, productos=None, regiones=None):
+        """Número de ventas que cumplen los filtros (sin cargar las filas)"""
+        return self.dataset.count_rows(filter=self.filtro(productos, regiones))
+
+    def pagina(self, pagina, tam_pagina, productos=None, regiones=None, orden='Total',
+               ascendente=False, columnas=None):
+        """Una página de las ventas filtradas, ordenadas por la columna orden
+
+        La página se elige mientras se leen los lotes: de cada lote solo se
+        guardan sus filas hasta el final de la página, nunca todas las
+        filas filtradas. La ordenación se hace en Arrow (estable: los empates
+        quedan en el orden de lectura) y solo la página pasa a pandas.
+        columnas limita las columnas que se leen del disco.
+        """
+        fin = pagina * tam_pagina
+        criterio = [(orden, 'ascending' if ascendente else 'descending')]
+        mejores = None
+        for lote in self.dataset.to_batches(columns=columnas,
+                                            filter=self.filtro(productos, regiones)):
+            tabla = pa.Table.from_batches([lote])
+            if mejores is not None:
+                tabla = pa.concat_tables([mejores, tabla])
+            mejores = tabla.take(pc.sort_indices(tabla, sort_keys=criterio)[:fin])
+        if mejores is None:
+            mejores = self.dataset.head(0, columns=columnas)
+        return aplicar_esquema(mejores.slice(fin - tam_pagina).to_pandas())
+
+    def plan_lectura(self, productos=None, regiones=None, columnas=None):
+        """Estima cuánto se leería del disco con unos filtros y columnas
+
+        Devuelve archivos, grupos de filas y bytes (comprimidos) que se leen
+        frente al total del dataset (todas las columnas, como leería un CSV).
+        Sirve para comprobar que el filtrado por particiones, estadísticas
+        y columnas funciona.
+        """
+        filtro = self.filtro(productos, regiones)
+        nombres = set(columnas) if columnas is not None else None
+
+        def bytes_grupo(metadatos, indice, columnas_grupo=None):
+            grupo = metadatos.row_group(indice)
+            return sum(
+                grupo.column(j).total_compressed_size
+                for j in range(grupo.num_columns)
+                if columnas_grupo is None or grupo.column(j).path_in_schema in columnas_grupo
+            )
+
+        plan = {'archivos': 0, 'archivos_total': 0, 'grupos': 0, 'grupos_total': 0,
+                'bytes': 0, 'bytes_total': 0}
+        elegidos = {f.path for f in self.dataset.get_fragments(filter=filtro)} \
+            if filtro is not None else None
+        for fragmento in self.dataset.get_fragments():
+            metadatos = fragmento.metadata
+            plan['archivos_total'] += 1
+            plan['grupos_total'] += metadatos.num_row_groups
+            plan['bytes_total'] += sum(bytes_grupo(metadatos, i)
+                                       for i in range(metadatos.num_row_groups))
+            if elegidos is not None and fragmento.path not in elegidos:
+                continue
+            plan['archivos'] += 1
+            grupos = fragmento.split_by_row_group(filter=filtro, schema=self.dataset.schema)
+            for grupo in grupos:
+                for info in grupo.row_groups:
+                    plan['grupos'] += 1
+                    plan['bytes'] += bytes_grupo(metadatos, info.id, nombres)
+        plan['fraccion'] = plan['bytes'] / plan['bytes_total'] if plan['bytes_total'] else 0.0
+        return plan
@@ -10,9 +10,15 @@
 
 import streamlit as st
 
+from perfilador import iniciar_perfil
+
+# Mide cuánto tarda cada parte de esta ejecución (ver perfilador.py)
+perfil_ejecucion = iniciar_perfil('app_01_fundamentos')
+
 # ====================================
 # PARTE 1: MOSTRAR TEXTO 
 # ====================================
+perfil_ejecucion.marcar("Parte 1: mostrar texto")
 
 # st.title() - Título principal (el más grande)
 # Esta función crea un encabezado grande y prominente en la página web.
@@ -39,6 +45,7 @@ st.write("Estoy aprendiendo a crear apps web con Python")
 # ====================================
 # PARTE 2: MENSAJES DE COLORES 
 # ====================================
+perfil_ejecucion.marcar("Parte 2: mensajes de colores")
 
 st.header("💬 Mensajes Importantes")
 
@@ -60,6 +67,7 @@ st.divider()
 # ====================================
 # PARTE 3: INTERACTIVIDAD BÁSICA
 # ====================================
+perfil_ejecucion.marcar("Parte 3: interactividad básica")
 
 st.header("🎮 Botones Interactivos")
 
@@ -83,6 +91,7 @@ if mostrar_secreto:
 # ====================================
 # PARTE 4: SELECCIÓN DE OPCIONES
 # ====================================
+perfil_ejecucion.marcar("Parte 4: selección de opciones")
 
 st.header("🎯 Elige tus preferencias")
 
@@ -107,6 +116,7 @@ st.write(f"Vives en: {ciudad}")
 # ====================================
 # MINI EJERCICIO: TARJETA DE PRESENTACIÓN
 # ====================================
+perfil_ejecucion.marcar("Mini ejercicio: tarjeta de presentación")
 # Los alumnos deben personalizar esta sección con su información
 # Este es un ejemplo de cómo crear una sección personalizable en la app.
 
@@ -123,3 +133,6 @@ ver_mas = st.checkbox("Ver más información")
 if ver_mas:
     st.info("📧 Email: tu.email@example.com")
     st.info("🔗 LinkedIn: linkedin.com/in/tu-perfil")
+
+# Fin de la ejecución: tiempos por sección y panel del perfilador (si está activo)
+perfil_ejecucion.finalizar()
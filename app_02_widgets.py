@@ -9,11 +9,17 @@
 
 import streamlit as st
 
+from perfilador import iniciar_perfil
+
+# Mide cuánto tarda cada parte de esta ejecución (ver perfilador.py)
+perfil_ejecucion = iniciar_perfil('app_02_widgets')
+
 st.title("🎮 Widgets y Entrada de Datos")
 
 # ====================================
 # PARTE 1: ENTRADA DE TEXTO
 # ====================================
+perfil_ejecucion.marcar("Parte 1: entrada de texto")
 
 st.header("✍️ Entrada de Texto")
 
@@ -31,6 +37,7 @@ if nombre:
 # ====================================
 # PARTE 2: ENTRADA DE NÚMEROS
 # ====================================
+perfil_ejecucion.marcar("Parte 2: entrada de números")
 
 st.header("🔢 Entrada de Números")
 
@@ -50,6 +57,7 @@ st.write(f"Tienes {edad} años")
 # ====================================
 # PARTE 3: SLIDER 
 # ====================================
+perfil_ejecucion.marcar("Parte 3: slider")
 
 st.header("🎚️ Slider (Deslizador)")
 
@@ -79,6 +87,7 @@ st.divider()
 # ====================================
 # EJERCICIO: CALCULADORA SIMPLE
 # ====================================
+perfil_ejecucion.marcar("Ejercicio: calculadora simple")
 # Vamos a construir una calculadora paso a paso
 # Este ejercicio combina varios widgets para crear una aplicación funcional.
 
@@ -127,6 +136,7 @@ if st.button("Calcular", type="primary"):
 # ====================================
 # EXTRA: MÁS WIDGETS ÚTILES
 # ====================================
+perfil_ejecucion.marcar("Extra: más widgets útiles")
 
 st.divider()
 st.header("🎯 Otros Widgets Útiles")
@@ -144,3 +154,6 @@ if hobbies:
     st.write(f"Tienes {len(hobbies)} hobbies seleccionados:")
     for hobby in hobbies:
         st.write(f"- {hobby}")
+
+# Fin de la ejecución: tiempos por sección y panel del perfilador (si está activo)
+perfil_ejecucion.finalizar()
@@ -11,11 +11,22 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 
+from cache_ingesta import CacheIngesta, clave_columnas, hash_contenido
+from ingesta_csv import IngestaIncremental, leer_csv, olfatear_csv, progreso_archivo
+from perfilador import iniciar_perfil
+from reduccion_series import reducir_serie
+from secciones_perezosas import calcular_una_vez, expander_perezoso
+from tabla_paginada import TAMANOS_PAGINA, num_paginas
+
+# Mide cuánto tarda cada parte de esta ejecución (ver perfilador.py)
+perfil_ejecucion = iniciar_perfil('app_03_datos')
+
 st.title("📊 Visualización de Datos")
 
 # ====================================
 # PARTE 1: CREAR Y MOSTRAR DATOS 
 # ====================================
+perfil_ejecucion.marcar("Parte 1: crear y mostrar datos")
 
 st.header("1. Crear un DataFrame")
 
@@ -46,6 +57,7 @@ st.dataframe(df)
 # ====================================
 # PARTE 2: MÉTRICAS 
 # ====================================
+perfil_ejecucion.marcar("Parte 2: métricas")
 
 st.header("2. Métricas Importantes")
 
@@ -69,6 +81,7 @@ with col3:
 # ====================================
 # PARTE 3: GRÁFICOS SIMPLES
 # ====================================
+perfil_ejecucion.marcar("Parte 3: gráficos simples")
 
 st.header("3. Gráficos Básicos")
 
@@ -88,42 +101,159 @@ st.divider()
 # ====================================
 # PARTE 4: CARGAR ARCHIVOS CSV
 # ====================================
+perfil_ejecucion.marcar("Parte 4: cargar archivos CSV")
 
 st.header("4. Cargar tu Propio CSV")
 
+# @st.cache_resource crea la caché una sola vez y la comparte entre sesiones.
+# Guarda el resultado de cada archivo ya procesado, identificado por un hash
+# de su contenido: si se vuelve a subir el mismo archivo no se lee otra vez.
+@st.cache_resource
+def obtener_cache_ingesta():
+    """Devuelve la caché de archivos subidos (ver cache_ingesta.py)"""
+    return CacheIngesta()
+
 # st.file_uploader() - Permite al usuario subir archivos
 # Esto hace que la app sea más flexible, permitiendo datos personalizados.
 archivo = st.file_uploader("Sube un archivo CSV", type=['csv'])
 
 if archivo is not None:
     try:
-        # Leer el archivo CSV
-        # pd.read_csv() lee archivos CSV y los convierte en DataFrames.
-        df_subido = pd.read_csv(archivo)
-        
+        # Buscar el archivo en la caché por el hash de su contenido
+        # El hash se calcula una vez por archivo subido: file_id cambia con
+        # cada subida, así que las re-ejecuciones por otros widgets lo reutilizan
+        cache_ingesta = obtener_cache_ingesta()
+        clave = calcular_una_vez('hash_archivo', (archivo.file_id, archivo.size),
+                                 lambda: hash_contenido(archivo))
+
+        # Olfatear el principio del archivo (64 KB) para detectar el separador,
+        # la codificación, la cabecera y el tipo de cada columna.
+        # Las columnas de texto con pocos valores (como 'Ciudad') se leen
+        # directamente como 'category'.
+        perfil = calcular_una_vez('perfil_archivo', (archivo.file_id, archivo.size),
+                                  lambda: olfatear_csv(archivo))
+        st.caption(
+            f"Separador: `{perfil.separador}` | Codificación: {perfil.codificacion} | "
+            f"Cabecera: {'sí' if perfil.cabecera else 'no'}"
+        )
+
+        # Como las columnas se conocen antes de leer, se pueden cargar solo
+        # algunas (usecols=): con archivos anchos se ahorra tiempo y memoria.
+        # Cada selección de columnas se guarda aparte en la caché.
+        elegidas = st.multiselect("Columnas a cargar:", perfil.columnas, default=perfil.columnas)
+        if not elegidas:
+            st.warning("⚠️ No hay columnas elegidas: se cargan todas")
+        # En el orden del archivo, para que el orden de clic no cambie la clave
+        columnas = [c for c in perfil.columnas if c in elegidas] or perfil.columnas
+        if columnas != perfil.columnas:
+            clave = clave_columnas(clave, columnas)
+        ingesta = cache_ingesta.obtener(clave)
+
+        # st.empty() reserva un hueco que podemos rellenar (y reemplazar)
+        # varias veces mientras llegan los bloques
+        hueco_info = st.empty()
+        hueco_vista = st.empty()
+        hueco_stats = st.empty()
+
+        if ingesta is not None:
+            st.caption("⚡ Archivo ya procesado: resultados recuperados de la caché")
+        else:
+            # Leer el archivo CSV por bloques
+            # En lugar de pd.read_csv(archivo), que carga todo el archivo en memoria,
+            # leemos bloques de filas y vamos actualizando las estadísticas.
+            # Así funciona igual con un CSV pequeño que con uno de varios GB.
+            # Los archivos pequeños se leen de una vez con el motor más rápido
+            # (ver ingesta_csv.leer_csv).
+            ingesta = IngestaIncremental()
+
+            barra = st.progress(0.0, text="Leyendo archivo...")
+            # Los bloques también se guardan en Parquet para la caché en disco
+            escritor = cache_ingesta.escritor_datos(clave)
+
+            # Si el archivo falla a mitad (una fila mal formada, una codificación
+            # que no cuadra...), se descarta el Parquet a medio escribir: así no
+            # queda abierto ni deja su archivo temporal en la caché de disco.
+            try:
+                for bloque in leer_csv(archivo, perfil,
+                                       columnas if columnas != perfil.columnas else None):
+                    ingesta.actualizar(bloque)
+                    escritor.escribir(bloque)
+
+                    # Mostrar información básica
+                    # Las filas se van contando a medida que se leen los bloques.
+                    hueco_info.write(f"**Filas:** {ingesta.filas} | **Columnas:** {len(ingesta.columnas)}")
+
+                    # Mostrar primeras filas (en cuanto llega el primer bloque)
+                    if ingesta.bloques == 1:
+                        with hueco_vista.container():
+                            st.write("Primeras 5 filas:")
+                            st.dataframe(ingesta.vista_previa)
+
+                    # Estadísticas acumuladas hasta ahora
+                    # Tienen el mismo formato que .describe(); los cuartiles son aproximados
+                    if ingesta.columnas_numericas:
+                        with hueco_stats.container():
+                            st.write("Estadísticas:")
+                            st.dataframe(ingesta.describe())
+
+                    barra.progress(progreso_archivo(archivo), text=f"Leyendo archivo... {ingesta.filas:,} filas")
+            except Exception:
+                escritor.descartar()
+                barra.empty()
+                raise
+
+            barra.empty()
+            escritor.cerrar()
+            cache_ingesta.guardar(clave, ingesta)
+
         st.success("✅ Archivo cargado correctamente")
-        
-        # Mostrar información básica
-        # len(df) da el número de filas, len(df.columns) el número de columnas.
-        st.write(f"**Filas:** {len(df_subido)} | **Columnas:** {len(df_subido.columns)}")
-        
-        # Mostrar primeras filas
-        # .head() muestra las primeras 5 filas por defecto.
-        st.write("Primeras 5 filas:")
-        st.dataframe(df_subido.head())
-        
-        # Mostrar estadísticas si hay columnas numéricas
-        # select_dtypes() filtra columnas por tipo de dato.
-        columnas_numericas = df_subido.select_dtypes(include=[np.number]).columns
-        
-        if len(columnas_numericas) > 0:
-            st.write("Estadísticas:")
-            # .describe() calcula estadísticas básicas (media, desviación, etc.)
-            st.dataframe(df_subido[columnas_numericas].describe())
-            
-            # Crear un gráfico simple con la primera columna numérica
+
+        # Resultado final (tanto si se acaba de leer como si viene de la caché)
+        hueco_info.write(f"**Filas:** {ingesta.filas} | **Columnas:** {len(ingesta.columnas)}")
+        if ingesta.vista_previa is None:
+            st.warning("⚠️ El archivo no tiene filas de datos")
+        else:
+            with hueco_vista.container():
+                st.write("Primeras 5 filas:")
+                st.dataframe(ingesta.vista_previa)
+        if ingesta.columnas_numericas:
+            with hueco_stats.container():
+                st.write("Estadísticas:")
+                st.dataframe(ingesta.describe())
+
+        # Crear un gráfico simple con la primera columna numérica
+        # La serie está acotada (mínimos y máximos repartidos por todo el
+        # archivo) y reducir_serie() la deja en ~1000 puntos con LTTB,
+        # así el gráfico no crece con el número de filas.
+        serie = ingesta.serie_grafico()
+        if serie is not None:
             st.write("Gráfico de la primera columna numérica:")
-            st.line_chart(df_subido[columnas_numericas[0]])
+            st.line_chart(reducir_serie(serie, metodo='lttb'))
+
+        # Explorar todas las filas
+        # Se leen del Parquet de la caché (ver cache_ingesta.leer_datos), no
+        # del CSV: solo las columnas elegidas y los grupos de filas de la
+        # página. El expander solo lee algo cuando está abierto.
+        explorar = expander_perezoso("🔎 Explorar los datos", key="expander_datos")
+        if explorar.open and ingesta.vista_previa is not None:
+            with explorar:
+                columnas = st.multiselect("Columnas:", ingesta.columnas, default=ingesta.columnas)
+                col1, col2 = st.columns(2)
+                with col1:
+                    tam_pagina = st.selectbox("Filas por página:", TAMANOS_PAGINA, index=1)
+                with col2:
+                    pagina = st.number_input("Página:", min_value=1,
+                                             max_value=num_paginas(ingesta.filas, tam_pagina), value=1)
+                inicio = (pagina - 1) * tam_pagina
+                datos = (cache_ingesta.leer_datos(clave, columnas, inicio, inicio + tam_pagina)
+                         if columnas else None)
+                if not columnas:
+                    st.info("Elige al menos una columna")
+                elif datos is None:
+                    st.info("Los datos completos de este archivo no están en la caché "
+                            "(no se pudieron guardar o se borraron para dejar sitio)")
+                else:
+                    st.dataframe(datos)
         
     except Exception as e:
         st.error(f"❌ Error al cargar el archivo: {str(e)}")
@@ -135,6 +265,7 @@ else:
 # ====================================
 # EJEMPLO DE CSV PARA PROBAR
 # ====================================
+perfil_ejecucion.marcar("Ejemplo de CSV para probar")
 
 st.divider()
 st.header("💡 Consejo")
@@ -149,3 +280,6 @@ Carlos,35,Sevilla
 """, language="csv")
 
 st.write("Copia esto en un archivo .txt, guárdalo como .csv y súbelo")
+
+# Fin de la ejecución: tiempos por sección y panel del perfilador (si está activo)
+perfil_ejecucion.finalizar()
@@ -1,7 +1,7 @@
 # ====================================
 # APP 04: LAYOUT Y ORGANIZACIÓN
 # ====================================
-# Conceptos: columnas, sidebar, tabs básico
+# Conceptos: columnas, sidebar, tabs básico, fragmentos, tabs perezosas
 
 # El layout se refiere a cómo organizamos visualmente los elementos en la página.
 # Un buen layout hace que la aplicación sea más fácil de usar y entender.
@@ -11,11 +11,19 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 
+from perfilador import iniciar_perfil
+from reduccion_series import reducir_serie
+from secciones_perezosas import calcular_una_vez, pestanas_perezosas
+
+# Mide cuánto tarda cada parte de esta ejecución (ver perfilador.py)
+perfil_ejecucion = iniciar_perfil('app_04_layout')
+
 st.title("🎨 Layout y Organización")
 
 # ====================================
 # PARTE 1: COLUMNAS 
 # ====================================
+perfil_ejecucion.marcar("Parte 1: columnas")
 
 st.header("1. Columnas")
 
@@ -70,6 +78,7 @@ st.divider()
 # ====================================
 # PARTE 2: SIDEBAR (10 min)
 # ====================================
+perfil_ejecucion.marcar("Parte 2: sidebar")
 
 st.header("2. Sidebar (Barra Lateral)")
 
@@ -106,6 +115,7 @@ st.divider()
 # ====================================
 # PARTE 3: TABS
 # ====================================
+perfil_ejecucion.marcar("Parte 3: tabs")
 
 st.header("3. Tabs (Pestañas)")
 
@@ -114,68 +124,95 @@ st.write("Las tabs organizan contenido en pestañas:")
 # Crear 3 pestañas
 # st.tabs() crea pestañas que permiten organizar contenido relacionado
 # sin sobrecargar una sola página.
-tab1, tab2, tab3 = st.tabs(["📊 Gráficos", "📋 Datos", "ℹ️ Info"])
+# Ojo: con st.tabs() normal, el contenido de TODAS las pestañas se calcula
+# en cada ejecución, aunque solo se vea una. pestanas_perezosas() usa
+# on_change="rerun": cada pestaña sabe si está abierta (.open) y solo se
+# calcula la que se muestra (ver secciones_perezosas.py).
+tab1, tab2, tab3 = pestanas_perezosas(["📊 Gráficos", "📋 Datos", "ℹ️ Info"], key="pestanas_ejemplo")
 
 # Contenido de cada tab
 # Cada tab puede tener su propio contenido independiente.
-with tab1:
-    st.subheader("Gráfico de Ejemplo")
-    
-    chart_data = pd.DataFrame(
-        np.random.randn(20, 3),
-        columns=['Serie A', 'Serie B', 'Serie C']
-    )
-    st.line_chart(chart_data)
-
-with tab2:
-    st.subheader("Tabla de Datos")
-    
-    datos_tabla = pd.DataFrame({
-        'Producto': ['A', 'B', 'C', 'D'],
-        'Ventas': [100, 200, 150, 300],
-        'Stock': [50, 30, 40, 20]
-    })
-    st.dataframe(datos_tabla)
-
-with tab3:
-    st.subheader("Información")
-    st.write("Esta es una app de demostración de Streamlit")
-    st.write("Creada en el Bootcamp de Data & IA")
-    st.success("✅ Las tabs ayudan a organizar mucha información")
+if tab1.open:
+    with tab1:
+        st.subheader("Gráfico de Ejemplo")
+
+        # calcular_una_vez() guarda el resultado: los datos aleatorios se
+        # generan la primera vez que se abre la pestaña, no en cada ejecución
+        chart_data = calcular_una_vez('grafico_tabs', (), lambda: pd.DataFrame(
+            np.random.randn(20, 3),
+            columns=['Serie A', 'Serie B', 'Serie C']
+        ))
+        st.line_chart(chart_data)
+
+if tab2.open:
+    with tab2:
+        st.subheader("Tabla de Datos")
+
+        datos_tabla = pd.DataFrame({
+            'Producto': ['A', 'B', 'C', 'D'],
+            'Ventas': [100, 200, 150, 300],
+            'Stock': [50, 30, 40, 20]
+        })
+        st.dataframe(datos_tabla)
+
+if tab3.open:
+    with tab3:
+        st.subheader("Información")
+        st.write("Esta es una app de demostración de Streamlit")
+        st.write("Creada en el Bootcamp de Data & IA")
+        st.success("✅ Las tabs ayudan a organizar mucha información")
 
 st.divider()
 
 # ====================================
 # EJEMPLO COMPLETO: TODO JUNTO
 # ====================================
+perfil_ejecucion.marcar("Ejemplo completo: todo junto")
 
 st.header("4. Ejemplo Completo")
 
 st.write("Combinando sidebar + columnas + contenido:")
 
-# Filtro en el sidebar
-st.sidebar.divider()
-st.sidebar.subheader("Filtros")
-cantidad_datos = st.sidebar.slider("Cantidad de datos a mostrar:", 5, 50, 20)
+# @st.fragment convierte la función en un "fragmento": al mover un widget
+# creado DENTRO de ella, Streamlit vuelve a ejecutar solo la función, no
+# todo el script. Las columnas, las tabs y el gráfico aleatorio de arriba
+# no se recalculan ni se vuelven a enviar al navegador.
+# Un fragmento puede escribir en el sidebar: el slider sigue ahí, pero
+# pertenece al fragmento.
+@st.fragment(key="ejemplo_completo")
+def ejemplo_completo():
+    """Slider del sidebar + gráfico y estadísticas que dependen de él"""
+    # Filtro en el sidebar
+    st.sidebar.divider()
+    st.sidebar.subheader("Filtros")
+    cantidad_datos = st.sidebar.slider("Cantidad de datos a mostrar:", 5, 50, 20)
+
+    # Generar datos según el slider
+    # Los datos se regeneran cada vez que cambia el slider (solo este fragmento).
+    datos_random = pd.DataFrame(
+        np.random.randn(cantidad_datos, 2),
+        columns=['X', 'Y']
+    )
 
-# Generar datos según el slider
-# Los datos se regeneran cada vez que cambia el slider.
-datos_random = pd.DataFrame(
-    np.random.randn(cantidad_datos, 2),
-    columns=['X', 'Y']
-)
+    # Mostrar en columnas
+    col_a, col_b = st.columns([2, 1])
+
+    with col_a:
+        st.subheader("Gráfico")
+        # reducir_serie() limita los puntos que se envían al navegador
+        # (mínimo y máximo por tramo). Con pocos datos no cambia nada, pero
+        # con millones de filas evita mensajes enormes y gráficos lentos.
+        st.line_chart(reducir_serie(datos_random))
 
-# Mostrar en columnas
-col_a, col_b = st.columns([2, 1])
+    with col_b:
+        st.subheader("Estadísticas")
+        st.write(f"Mostrando {cantidad_datos} puntos")
+        st.metric("Media X", f"{datos_random['X'].mean():.2f}")
+        st.metric("Media Y", f"{datos_random['Y'].mean():.2f}")
 
-with col_a:
-    st.subheader("Gráfico")
-    st.line_chart(datos_random)
+    st.info("💡 Cambia el slider en el sidebar: solo se actualiza esta sección")
 
-with col_b:
-    st.subheader("Estadísticas")
-    st.write(f"Mostrando {cantidad_datos} puntos")
-    st.metric("Media X", f"{datos_random['X'].mean():.2f}")
-    st.metric("Media Y", f"{datos_random['Y'].mean():.2f}")
+ejemplo_completo()
 
-st.info("💡 Cambia el slider en el sidebar para ver cómo se actualiza todo")
+# Fin de la ejecución: tiempos por sección y panel del perfilador (si está activo)
+perfil_ejecucion.finalizar()
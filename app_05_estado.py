@@ -1,19 +1,52 @@
 # ====================================
 # APP 05: SESSION STATE
 # ====================================
-# Conceptos: mantener estado entre interacciones
+# Conceptos: mantener estado entre interacciones, memoria del estado en el servidor,
+#            estado que sobrevive a los reinicios, callbacks (on_click),
+#            listas grandes paginadas
 
 # Session State es una de las características más importantes de Streamlit.
 # Permite mantener datos entre diferentes interacciones del usuario,
 # ya que por defecto Streamlit ejecuta todo el script desde cero cada vez.
 
+import pandas as pd
 import streamlit as st
 
+from estado_sesion import AlmacenEstado, estado_sesion
+from lista_tareas import ListaTareas
+from perfilador import iniciar_perfil
+from persistencia_estado import DiarioEstado, id_persistente
+from tabla_paginada import TAMANOS_PAGINA, num_paginas
+
+# Mide cuánto tarda cada parte de esta ejecución (ver perfilador.py)
+perfil_ejecucion = iniciar_perfil('app_05_estado')
+
 st.title("💾 Session State - Mantener Estado")
 
+# ====================================
+# ESTADO GUARDADO EN DISCO
+# ====================================
+# Session State se pierde si el servidor se reinicia. Por eso el contador y
+# las tareas también se guardan en disco (ver persistencia_estado.py).
+# Guardar no hace esperar a la app: los cambios se anotan en memoria y un
+# hilo los escribe por lotes en segundo plano.
+@st.cache_resource
+def obtener_diario():
+    """Diario en disco con el estado de todos los usuarios"""
+    return DiarioEstado()
+
+diario = obtener_diario()
+# Identificador del usuario: sobrevive a los reinicios
+# Sin inicio de sesión va en la URL, y ese enlace da acceso al estado guardado
+usuario = id_persistente()
+if st.query_params.get('usuario') == usuario:
+    st.caption("🔑 Tu estado se guarda con el identificador de la URL: "
+               "no compartas este enlace si no quieres que otros lo vean o lo cambien")
+
 # ====================================
 # EXPLICACIÓN DEL PROBLEMA
 # ====================================
+perfil_ejecucion.marcar("Explicación del problema")
 
 st.header("🤔 ¿Por qué necesitamos Session State?")
 
@@ -31,6 +64,7 @@ st.divider()
 # ====================================
 # EJEMPLO 1: CONTADOR SIMPLE
 # ====================================
+perfil_ejecucion.marcar("Ejemplo 1: contador simple")
 
 st.header("🔢 Ejemplo: Contador")
 
@@ -39,32 +73,39 @@ st.write("Vamos a crear un contador que recuerde su valor:")
 # PASO 1: Inicializar el contador si no existe
 # 'contador' not in st.session_state verifica si la variable ya existe
 # Esto es importante porque el script se ejecuta múltiples veces.
+# Si el servidor se reinició, se recupera el valor guardado en disco (o 0)
 if 'contador' not in st.session_state:
-    st.session_state.contador = 0  # Crear la variable con valor 0
+    st.session_state.contador = diario.cargar(usuario).get('contador', 0)
 
 # PASO 2: Mostrar el valor actual
 # Accedemos al valor guardado en session_state
 st.subheader(f"Valor actual: {st.session_state.contador}")
 
 # PASO 3: Botones para modificar el contador
+# Si el valor se cambiara dentro de "if st.button(...):", el valor de arriba
+# ya estaría escrito y haría falta st.rerun(): el script entero se
+# ejecutaría dos veces por clic. Con on_click, Streamlit llama a la función
+# ANTES de volver a ejecutar el script, así que basta una ejecución y el
+# valor mostrado ya es el nuevo.
+def cambiar_contador(cambio):
+    """Callback de los botones del contador (cambio=None pone el contador a 0)"""
+    # Modificar el valor guardado en session_state
+    # Esto cambia el valor que persiste entre ejecuciones
+    st.session_state.contador = 0 if cambio is None else st.session_state.contador + cambio
+    # Anotar el cambio para guardarlo en disco (no espera a la escritura)
+    diario.fijar(usuario, 'contador', st.session_state.contador)
+
 col1, col2, col3 = st.columns(3)
 
 with col1:
-    if st.button("➕ Incrementar"):
-        # Modificar el valor guardado en session_state
-        # Esto cambia el valor que persiste entre ejecuciones
-        st.session_state.contador += 1
-        st.rerun()  # Forzar recarga para mostrar el nuevo valor
+    # args= son los argumentos con los que se llamará al callback
+    st.button("➕ Incrementar", on_click=cambiar_contador, args=(1,))
 
 with col2:
-    if st.button("➖ Decrementar"):
-        st.session_state.contador -= 1
-        st.rerun()
+    st.button("➖ Decrementar", on_click=cambiar_contador, args=(-1,))
 
 with col3:
-    if st.button("🔄 Resetear"):
-        st.session_state.contador = 0
-        st.rerun()
+    st.button("🔄 Resetear", on_click=cambiar_contador, args=(None,))
 
 # Mostrar el historial (ejemplo avanzado)
 # Podemos usar condicionales para crear lógica basada en el estado
@@ -78,43 +119,134 @@ st.divider()
 # ====================================
 # EJEMPLO 2: LISTA DE TAREAS 
 # ====================================
+perfil_ejecucion.marcar("Ejemplo 2: lista de tareas")
 
 st.header("📝 Ejemplo: Lista de Tareas Simple")
 
-# Inicializar lista de tareas
-# Las listas también se pueden guardar en session_state
-if 'tareas' not in st.session_state:
-    st.session_state.tareas = []
-
-# Input para nueva tarea
-nueva_tarea = st.text_input("Escribe una tarea:")
-
-# Botón para agregar
-if st.button("➕ Agregar tarea") and nueva_tarea:
-    # Agregar la tarea a la lista
-    # .append() añade elementos a la lista guardada en session_state
-    st.session_state.tareas.append(nueva_tarea)
-    st.rerun()
-
-# Mostrar todas las tareas
-if st.session_state.tareas:
-    st.write("**Tus tareas:**")
-    # enumerate() nos da el índice y el valor de cada elemento
-    for i, tarea in enumerate(st.session_state.tareas, 1):
-        st.write(f"{i}. {tarea}")
-    
-    # Botón para limpiar todas
-    if st.button("🗑️ Limpiar todas"):
-        st.session_state.tareas = []
-        st.rerun()
+# Las listas también se pueden guardar en session_state, pero cada sesión
+# abierta las mantiene en la memoria del servidor mientras dure: con muchos
+# usuarios (o listas muy largas) el proceso no para de crecer.
+# Por eso esta lista se guarda en un almacén compartido con un presupuesto de
+# memoria: las listas grandes de las sesiones inactivas se mueven a disco y
+# vuelven solas a memoria cuando se leen (ver estado_sesion.py).
+@st.cache_resource
+def obtener_almacen_estado():
+    """Almacén de estado de todas las sesiones, con memoria acotada"""
+    return AlmacenEstado()
+
+# Se usa como st.session_state, pero solo ve los valores de esta sesión.
+# Las tareas se guardan en una ListaTareas (ver lista_tareas.py): cada tarea
+# tiene un id, y añadir, borrar o buscar no recorre la lista entera.
+estado = estado_sesion(obtener_almacen_estado())
+if 'tareas' not in estado:
+    estado['tareas'] = ListaTareas.desde_guardado(diario.cargar(usuario).get('lista_tareas', {}))
+
+def agregar_tarea():
+    """Callback de "Agregar tarea": añade el texto escrito y vacía el campo"""
+    # El valor de un widget con key= se lee en st.session_state[key]
+    nueva_tarea = st.session_state.nueva_tarea
+    if not nueva_tarea:
+        return
+    # Se vuelve a guardar la lista para que el almacén actualice su tamaño
+    tareas = estado['tareas']
+    id_tarea = tareas.agregar(nueva_tarea)
+    estado['tareas'] = tareas
+    # En disco solo se anota la tarea nueva, no la lista entera
+    diario.poner(usuario, 'lista_tareas', id_tarea, nueva_tarea)
+    # En un callback sí se puede cambiar el valor de un widget
+    st.session_state.nueva_tarea = ""
+
+def borrar_seleccionadas(clave_tabla, ids_pagina):
+    """Callback de "Borrar seleccionadas": borra las filas marcadas en la tabla"""
+    tareas = estado['tareas']
+    for fila in st.session_state[clave_tabla].selection.rows:
+        tareas.eliminar(ids_pagina[fila])
+        diario.quitar(usuario, 'lista_tareas', ids_pagina[fila])
+    estado['tareas'] = tareas
+    # Una tabla con otra key empieza sin filas marcadas
+    st.session_state.version_tabla_tareas += 1
+
+def limpiar_tareas():
+    """Callback de "Limpiar todas": vacía la lista"""
+    estado['tareas'] = ListaTareas()
+    diario.fijar(usuario, 'lista_tareas', {})
+
+# Input para nueva tarea (key= guarda su valor en st.session_state)
+st.text_input("Escribe una tarea:", key="nueva_tarea")
+
+# Botón para agregar: la tarea ya está en la lista cuando se dibuja abajo
+st.button("➕ Agregar tarea", on_click=agregar_tarea)
+
+tareas = estado['tareas']
+
+# Mostrar las tareas
+# Con un st.write() por tarea, mil tareas serían mil elementos enviados al
+# navegador en cada ejecución. Aquí se envía una sola tabla con la página
+# visible, como la tabla de detalle de app_06_dashboard.py.
+if tareas:
+    st.write(f"**Tus tareas:** {len(tareas)}")
+
+    col_buscar, col_tam, col_pagina = st.columns([2, 1, 1])
+    with col_buscar:
+        consulta = st.text_input("🔍 Buscar palabras:", key="buscar_tarea")
+    # buscar() usa un índice de palabras: solo toca las tareas que coinciden
+    ids_encontrados = tareas.buscar(consulta) if consulta else None
+    total = len(tareas) if ids_encontrados is None else len(ids_encontrados)
+    with col_tam:
+        tam_pagina = st.selectbox("Tareas por página:", TAMANOS_PAGINA, index=1)
+    total_paginas = num_paginas(total, tam_pagina)
+    with col_pagina:
+        pagina = st.number_input("Página:", min_value=1, max_value=total_paginas, value=1)
+
+    filas = tareas.pagina(pagina, tam_pagina, ids=ids_encontrados)
+    ids_pagina = [id_tarea for id_tarea, _ in filas]
+    # on_select="rerun" permite marcar filas; la selección queda en
+    # st.session_state[clave_tabla]
+    st.session_state.setdefault('version_tabla_tareas', 0)
+    clave_tabla = f"tabla_tareas_{st.session_state.version_tabla_tareas}"
+    st.dataframe(
+        pd.DataFrame(filas, columns=['Id', 'Tarea']),
+        hide_index=True,
+        key=clave_tabla,
+        on_select="rerun",
+        selection_mode="multi-row",
+    )
+    if consulta:
+        st.caption(f"{total} tareas contienen «{consulta}»")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.button("🗑️ Borrar seleccionadas", on_click=borrar_seleccionadas,
+                  args=(clave_tabla, ids_pagina))
+    with col2:
+        # Botón para limpiar todas
+        st.button("🗑️ Limpiar todas", on_click=limpiar_tareas)
 else:
     st.info("No tienes tareas. ¡Agrega una!")
 
+# Cuánta memoria ocupa el estado de cada sesión en el servidor
+with st.expander("🧠 Memoria del estado en el servidor"):
+    estadisticas = obtener_almacen_estado().estadisticas()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("En memoria", f"{estadisticas['bytes_memoria'] / 1024:.1f} KB")
+    col2.metric("En disco", f"{estadisticas['bytes_disco'] / 1024:.1f} KB")
+    col3.metric("Movidos a disco", estadisticas['desalojos'])
+    col4.metric("Recuperados", estadisticas['recuperaciones'])
+    st.caption(
+        f"Presupuesto: {estadisticas['max_bytes_sesion'] / 2**20:.0f} MB por sesión, "
+        f"{estadisticas['max_bytes_total'] / 2**20:.0f} MB en total"
+    )
+    sesiones = pd.DataFrame(estadisticas['sesiones'])
+    if not sesiones.empty:
+        sesiones['esta sesión'] = sesiones['sesion'] == estado.sesion
+        st.dataframe(sesiones, hide_index=True)
+
 st.divider()
 
 # ====================================
 # RESUMEN
 # ====================================
+perfil_ejecucion.marcar("Resumen")
 
 st.header("📚 Resumen")
 
@@ -132,15 +264,22 @@ st.write("""
    st.write(st.session_state.mi_variable)
    ```
 
-3. Modificar la variable:
+3. Modificar la variable en un callback (on_click / on_change), que se
+   ejecuta antes que el script y así no hace falta st.rerun():
    ```python
-   st.session_state.mi_variable = nuevo_valor
+   def cambiar():
+       st.session_state.mi_variable = nuevo_valor
+
+   st.button("Cambiar", on_click=cambiar)
    ```
 
-4. Forzar recarga si es necesario:
+4. Forzar recarga solo si es necesario (ejecuta el script otra vez):
    ```python
    st.rerun()
    ```
 """)
 
 st.info("💡 Session State es perfecto para: contadores, listas, formularios multi-paso, y cualquier dato que deba persistir")
+
+# Fin de la ejecución: tiempos por sección y panel del perfilador (si está activo)
+perfil_ejecucion.finalizar()
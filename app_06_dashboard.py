@@ -7,9 +7,28 @@
 # Integra todos los conceptos aprendidos: widgets, datos, layout, session state (implícito),
 # y crea un dashboard funcional para análisis de ventas.
 
+import os
+import time
+
 import streamlit as st
-import pandas as pd
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from streamlit.runtime.scriptrunner_utils.script_requests import RerunData
 import numpy as np
+import pandas as pd
+
+from agregacion_paralela import AgregadorParalelo
+from almacen_parquet import OrigenParquet
+from cache_filtros import CacheLRU, clave_filtros
+from cubo_ventas import calcular_kpis, filtrar_cubo, ventas_por
+from dataset_compartido import memoria_proceso, publicar_o_abrir
+from datos_ventas import filtrar_ventas, generar_ventas
+from flujo_ventas import ConsumidorFlujo, SeguidorArchivo, latencias_ms
+from motor_sql import publicar_o_abrir as publicar_o_abrir_sql
+from perfilador import iniciar_perfil
+from ranking import agrupar_otros, top_k
+from secciones_perezosas import calcular_una_vez, expander_perezoso, pestanas_perezosas
+from tabla_paginada import TAMANOS_PAGINA, num_paginas, pagina_ordenada_partes
+from ventas_incrementales import VentasIncrementales
 
 # ====================================
 # CONFIGURACIÓN DE LA PÁGINA
@@ -23,78 +42,357 @@ st.set_page_config(
     layout="wide"  # Usa todo el ancho de la pantalla (en lugar de centrado)
 )
 
+# Mide cuánto tarda cada sección de esta ejecución (ver perfilador.py)
+perfil_ejecucion = iniciar_perfil('app_06_dashboard')
+
 # ====================================
 # GENERAR DATOS DE EJEMPLO
 # ====================================
-
-# @st.cache_data es un decorador que guarda en caché el resultado de la función.
-# Esto significa que los datos se generan solo una vez, no en cada recarga.
-# Es útil para funciones costosas que no cambian frecuentemente.
-@st.cache_data  # Esto hace que los datos se generen solo una vez
-def generar_datos():
+perfil_ejecucion.marcar("Carga de datos")
+
+# Parámetros del conjunto de datos
+# VERSION_DATOS identifica los datos cargados: forma parte de la clave de la
+# caché de filtros, así que si cambian los datos no se reutilizan resultados viejos.
+N_FILAS = 100
+SEMILLA = 42
+VERSION_DATOS = f"{N_FILAS}-{SEMILLA}"
+
+# Origen de datos alternativo: un dataset Parquet particionado
+# Si la variable de entorno VENTAS_PARQUET apunta a una carpeta creada con
+# almacen_parquet.escribir_ventas(), el dashboard lee de ahí en lugar de
+# generar datos. Los filtros del sidebar se aplican durante la lectura.
+RUTA_PARQUET = os.environ.get('VENTAS_PARQUET')
+
+# Motor de consultas opcional: SQL embebido en lugar de pandas
+# Si DASHBOARD_SQL vale 'sqlite', 'duckdb' o 'auto' (DuckDB si está instalado),
+# las ventas se cargan en una base de datos local y los filtros y agregaciones
+# se hacen en SQL: a Streamlit solo llegan los resultados (ver motor_sql.py).
+MOTOR_SQL = os.environ.get('DASHBOARD_SQL')
+DIRECTORIO_SQL = '.cache_sql'
+
+# Carpeta donde se publica el dataset compartido (ver dataset_compartido.py)
+# Todos los procesos del servidor que usen la misma carpeta comparten los datos.
+DIRECTORIO_COMPARTIDO = os.environ.get('DASHBOARD_DATOS_COMPARTIDOS', '.datos_compartidos')
+
+# Agregación en paralelo (ver agregacion_paralela.py)
+# El cubo y describe() se reparten en bloques de filas entre los núcleos.
+# DASHBOARD_TRABAJADORES fija el número de hilos/procesos (por defecto, uno
+# por núcleo) y DASHBOARD_EJECUTOR elige entre 'hilos' y 'procesos'.
+TRABAJADORES = int(os.environ.get('DASHBOARD_TRABAJADORES', 0)) or None
+EJECUTOR = os.environ.get('DASHBOARD_EJECUTOR', 'hilos')
+
+# Presupuesto de memoria de la caché de filtros (compartida por todas las
+# sesiones). Cada entrada puede llevar las filas filtradas, así que además
+# de contar entradas se acota el total en MB (DASHBOARD_MAX_MB_FILTROS).
+MAX_BYTES_FILTROS = int(float(os.environ.get('DASHBOARD_MAX_MB_FILTROS', 256)) * 2**20)
+
+# Filas de cada lote de ventas nuevas que se añade desde el sidebar
+TAM_LOTE_NUEVO = 1_000
+
+# Modo en vivo (ver flujo_ventas.py)
+# Si DASHBOARD_FLUJO apunta a un archivo .jsonl o .csv que otro proceso va
+# ampliando, las ventas nuevas se añaden a los agregados en micro-lotes y
+# cada DASHBOARD_REFRESCO segundos se redibujan los KPIs y gráficos, solo
+# si ha llegado algún lote y sin volver a ejecutar el script entero.
+RUTA_FLUJO = os.environ.get('DASHBOARD_FLUJO')
+REFRESCO = float(os.environ.get('DASHBOARD_REFRESCO', 1.0))
+
+# Latencias recientes (evento → pantalla) que guarda cada sesión
+MAX_LATENCIAS = 5_000
+
+# Columnas que muestra la tabla de detalle y columnas de sus estadísticas
+# (con Parquet, solo estas se leen del disco)
+COLUMNAS_DETALLE = ['Producto', 'Región', 'Cantidad', 'Precio', 'Total']
+COLUMNAS_ESTADISTICAS = ['Cantidad', 'Precio', 'Total']
+
+def generar_datos(n_filas=100, semilla=42):
     """Genera datos de ventas simulados
     
     Esta función crea datos ficticios de ventas para demostrar el dashboard.
     En un caso real, estos datos vendrían de una base de datos o API.
+    La generación está en datos_ventas.py y crea cada columna con una sola
+    llamada vectorizada de NumPy, así que escala a millones de filas.
+    Producto y Región se devuelven como Categorical y las medidas con el
+    entero más pequeño posible (ver aplicar_esquema()).
     """
-    np.random.seed(42)  # Para obtener siempre los mismos datos (reproducibilidad)
-    
-    # Crear 100 registros de ventas
-    productos = ['Laptop', 'Mouse', 'Teclado', 'Monitor', 'Auriculares']
-    regiones = ['Norte', 'Sur', 'Este', 'Oeste']
-    
-    datos = []
-    for _ in range(100):
-        # np.random.choice() selecciona aleatoriamente de una lista
-        # np.random.randint() genera números enteros aleatorios
-        datos.append({
-            'Producto': np.random.choice(productos),
-            'Región': np.random.choice(regiones),
-            'Cantidad': np.random.randint(1, 20),
-            'Precio': np.random.randint(20, 500)
-        })
-    
-    df = pd.DataFrame(datos)
-    df['Total'] = df['Cantidad'] * df['Precio']  # Calcular columna derivada
-    
-    return df
+    return generar_ventas(n_filas=n_filas, semilla=semilla)
+
+# @st.cache_resource guarda un único objeto para todas las sesiones, sin copiarlo.
+# Con @st.cache_data cada sesión recibiría su propia copia de la tabla de ventas;
+# aquí todas comparten el mismo DataFrame de solo lectura, mapeado desde disco,
+# y los demás procesos del servidor mapean los mismos archivos (copia cero).
+@st.cache_resource
+def obtener_datos_compartidos(n_filas=100, semilla=42):
+    """Devuelve el DataFrame de ventas compartido (se genera solo la primera vez)"""
+    return publicar_o_abrir(lambda: generar_datos(n_filas, semilla),
+                            version=f"{n_filas}-{semilla}", directorio=DIRECTORIO_COMPARTIDO)
+
+def ruta_datos_compartidos(n_filas=100, semilla=42):
+    """Carpeta del dataset compartido (los procesos del agregador la abren por su cuenta)"""
+    return os.path.join(DIRECTORIO_COMPARTIDO, f"{n_filas}-{semilla}")
+
+@st.cache_resource
+def obtener_agregador():
+    """Agregador paralelo con sus hilos/procesos, compartido por todas las sesiones"""
+    return AgregadorParalelo(trabajadores=TRABAJADORES, ejecutor=EJECUTOR)
+
+@st.cache_data
+def obtener_cubo(n_filas=100, semilla=42):
+    """Construye el cubo Producto × Región de un conjunto de datos
+
+    Se calcula una sola vez por conjunto de datos (mismos n_filas y semilla).
+    El cubo tiene como mucho productos × regiones filas, así que los KPIs,
+    gráficos y rankings se calculan sobre él sin recorrer todas las ventas.
+    """
+    df = obtener_datos_compartidos(n_filas=n_filas, semilla=semilla)
+    return obtener_agregador().cubo(df, ruta=ruta_datos_compartidos(n_filas, semilla))
+
+@st.cache_resource
+def obtener_origen(ruta):
+    """Abre el dataset Parquet una sola vez para todas las sesiones"""
+    return OrigenParquet(ruta)
+
+@st.cache_data
+def obtener_cubo_parquet(ruta, version):
+    """Construye el cubo de un dataset Parquet leyéndolo por lotes
+
+    Solo se leen las columnas del cubo y nunca se tiene el dataset completo
+    en memoria: se agrega cada lote y se combinan los cubos parciales.
+    version (fecha de modificación de los archivos) invalida la caché
+    cuando cambian los datos.
+    """
+    origen = obtener_origen(ruta)
+    return obtener_agregador().cubo_por_bloques(origen.leer_por_bloques())
+
+@st.cache_resource
+def obtener_ventas_incrementales(n_filas=100, semilla=42):
+    """Agregados que crecen con cada lote de ventas nuevas (ver ventas_incrementales.py)
+
+    Parte del cubo del conjunto inicial; los lotes añadidos después solo
+    actualizan sus celdas, sin volver a recorrer las ventas anteriores.
+    """
+    return VentasIncrementales(cubo=obtener_cubo(n_filas, semilla))
 
 # Cargar datos
-# Como está decorada con @st.cache_data, esto es muy eficiente
-df = generar_datos()
+# Como las funciones están en caché, esto es muy eficiente
+if RUTA_PARQUET:
+    origen = obtener_origen(RUTA_PARQUET)
+    VERSION_DATOS = f"parquet:{RUTA_PARQUET}:{origen.version()}"
+    VERSION_FILAS = f"filas:{VERSION_DATOS}"
+    df = None  # Las filas se leen del disco solo cuando hacen falta
+    cubo = obtener_cubo_parquet(RUTA_PARQUET, origen.version())
+    ventas_nuevas, lotes_nuevos = None, []
+else:
+    origen = None
+    df = obtener_datos_compartidos(N_FILAS, SEMILLA)
+    # Las filas del conjunto inicial no cambian al llegar lotes nuevos: las
+    # filtradas se guardan en la caché con VERSION_FILAS, que no depende de
+    # los lotes (las filas de los lotes recientes van aparte)
+    VERSION_FILAS = f"filas:{VERSION_DATOS}"
+    # El cubo incluye los lotes de ventas añadidos después de cargar los datos.
+    # Su versión forma parte de VERSION_DATOS: cada lote nuevo invalida los
+    # agregados de la caché de filtros sin tener que vaciarla a mano.
+    ventas_nuevas = obtener_ventas_incrementales(N_FILAS, SEMILLA)
+    instantanea = ventas_nuevas.instantanea()
+    VERSION_DATOS = f"{N_FILAS}-{SEMILLA}-v{instantanea['version']}"
+    cubo = instantanea['cubo']
+    lotes_nuevos = instantanea['lotes']
+
+@st.cache_resource
+def obtener_motor_sql(motor, version):
+    """Abre la base de datos local con las ventas de una versión de datos
+
+    Solo la primera vez (entre todos los procesos del servidor) se cargan
+    las ventas; después cada proceso la abre en solo lectura (ver
+    motor_sql.publicar_o_abrir).
+    """
+    def cargar(motor_sql):
+        if RUTA_PARQUET:
+            motor_sql.cargar_parquet(RUTA_PARQUET)
+        else:
+            motor_sql.cargar(obtener_datos_compartidos(N_FILAS, SEMILLA))
+    return publicar_o_abrir_sql(cargar, version, DIRECTORIO_SQL, motor=motor)
+
+motor_sql = obtener_motor_sql(MOTOR_SQL, VERSION_DATOS) if MOTOR_SQL else None
+
+# @st.cache_resource guarda un único objeto compartido por todas las sesiones
+# (a diferencia de @st.cache_data, no lo copia en cada ejecución).
+@st.cache_resource
+def obtener_cache_filtros():
+    """Devuelve la caché LRU de resultados filtrados (ver cache_filtros.py)"""
+    return CacheLRU(max_entradas=32, max_bytes=MAX_BYTES_FILTROS)
+
+def aplicar_filtros(productos, regiones):
+    """Filtra el cubo y calcula todos los agregados que usa el dashboard
+
+    El resultado se guarda en la caché LRU: si el usuario vuelve a una
+    combinación de filtros ya vista, no se recalcula nada.
+    """
+    if motor_sql is not None:
+        return aplicar_filtros_sql(productos, regiones)
+
+    # Aplicar filtros al cubo
+    # Solo recorre las celdas Producto × Región, no todas las ventas
+    cubo_filtrado = filtrar_cubo(cubo, productos, regiones)
+
+    # Filas de los lotes recientes que cumplen los filtros (como mucho
+    # ventas_incrementales.MAX_FILAS_RECIENTES): se añaden a la tabla de detalle
+    df_recientes = (pd.concat([filtrar_ventas(lote, productos, regiones) for lote in lotes_nuevos],
+                              ignore_index=True) if lotes_nuevos else None)
+
+    # Cada dimensión se agrega UNA sola vez: el mismo resultado sirve
+    # para el gráfico de barras y para la pestaña del ranking.
+    # ventas_por() suma las celdas del cubo de cada producto/región
+    # (equivale a df_filtrado.groupby('Producto')['Total'].sum())
+    ventas_producto = ventas_por(cubo_filtrado, 'Producto')
+    ventas_region = ventas_por(cubo_filtrado, 'Región')
+
+    return {
+        'df_recientes': df_recientes,
+        'kpis': calcular_kpis(cubo_filtrado),
+        # agrupar_otros() limita las barras si hay muchos productos (p. ej. SKUs)
+        'ventas_por_producto': agrupar_otros(ventas_producto),
+        'ventas_por_region': agrupar_otros(ventas_region),
+        # Sin agrupar: los rankings se calculan al abrir su pestaña
+        'ventas_producto': ventas_producto,
+        'ventas_region': ventas_region,
+    }
+
+def aplicar_filtros_sql(productos, regiones):
+    """Igual que aplicar_filtros() pero con las consultas hechas en el motor SQL
+
+    No se crea ningún DataFrame con las filas filtradas: la tabla de detalle
+    pide cada página al motor con LIMIT/OFFSET.
+    """
+    ventas_producto = motor_sql.ventas_por('Producto', productos, regiones)
+    ventas_region = motor_sql.ventas_por('Región', productos, regiones)
+    return {
+        'df_recientes': None,
+        'n_filas': motor_sql.contar(productos, regiones),
+        'kpis': motor_sql.kpis(productos, regiones),
+        'ventas_por_producto': agrupar_otros(ventas_producto),
+        'ventas_por_region': agrupar_otros(ventas_region),
+        'ventas_producto': ventas_producto,
+        'ventas_region': ventas_region,
+    }
+
+def filtrar_filas(productos, regiones):
+    """Filas del conjunto de datos que cumplen los filtros (para la tabla de detalle)
+
+    Va aparte de aplicar_filtros() porque su clave de caché usa
+    VERSION_FILAS: un lote nuevo no obliga a volver a filtrar todas las filas.
+    """
+    if origen is not None:
+        # Con Parquet no se cargan las filas: solo se cuentan. La tabla de
+        # detalle pide cada página al origen, que la elige mientras lee
+        return {'df': None, 'n_filas': origen.contar(productos, regiones)}
+    # Usamos operadores booleanos para filtrar el DataFrame
+    # .isin() verifica si los valores están en la lista seleccionada
+    # (ver datos_ventas.filtrar_ventas)
+    df_filas = filtrar_ventas(df, productos, regiones)
+    return {'df': df_filas, 'n_filas': len(df_filas)}
 
 # ====================================
 # SIDEBAR - FILTROS
 # ====================================
+perfil_ejecucion.marcar("Sidebar: filtros")
 
 st.sidebar.title("⚙️ Filtros")
 
+# Valores posibles de cada filtro
+# .unique() obtiene valores únicos (del índice del cubo, no de todas las filas)
+if motor_sql is not None:
+    opciones_productos = motor_sql.valores('Producto')
+    opciones_regiones = motor_sql.valores('Región')
+else:
+    opciones_productos = cubo.index.get_level_values('Producto').unique()
+    opciones_regiones = cubo.index.get_level_values('Región').unique()
+
 # Filtro por producto
 # multiselect permite seleccionar múltiples opciones
 productos_seleccionados = st.sidebar.multiselect(
     "Selecciona productos:",
-    options=df['Producto'].unique(),  # .unique() obtiene valores únicos
-    default=df['Producto'].unique()  # Todos seleccionados por defecto
+    options=opciones_productos,
+    default=opciones_productos  # Todos seleccionados por defecto
 )
 
 # Filtro por región
 regiones_seleccionadas = st.sidebar.multiselect(
     "Selecciona regiones:",
-    options=df['Región'].unique(),
-    default=df['Región'].unique()
+    options=opciones_regiones,
+    default=opciones_regiones
 )
 
-# Aplicar filtros
-# Usamos operadores booleanos para filtrar el DataFrame
-# .isin() verifica si los valores están en la lista seleccionada
-df_filtrado = df[
-    (df['Producto'].isin(productos_seleccionados)) &
-    (df['Región'].isin(regiones_seleccionadas))
-]
+# Aplicar filtros (o recuperarlos de la caché)
+perfil_ejecucion.marcar("Filtrar y agregar")
+# La clave incluye la versión de los datos y las selecciones ordenadas
+cache_filtros = obtener_cache_filtros()
+clave_resultado = clave_filtros(VERSION_DATOS, productos_seleccionados, regiones_seleccionadas)
+resultado = cache_filtros.obtener_o_calcular(
+    clave_resultado,
+    lambda: aplicar_filtros(productos_seleccionados, regiones_seleccionadas)
+)
+df_recientes = resultado['df_recientes']
+clave_filas = clave_filtros(VERSION_FILAS, productos_seleccionados, regiones_seleccionadas)
+if motor_sql is not None:
+    filas_filtradas = {'df': None, 'n_filas': resultado['n_filas']}
+else:
+    filas_filtradas = cache_filtros.obtener_o_calcular(
+        clave_filas, lambda: filtrar_filas(productos_seleccionados, regiones_seleccionadas)
+    )
+df_filtrado = filas_filtradas['df']
+n_filas_filtradas = filas_filtradas['n_filas'] + (
+    len(df_recientes) if df_recientes is not None else 0)
+
+@st.cache_resource
+def obtener_consumidor_flujo(ruta, n_filas=100, semilla=42):
+    """Arranca el hilo que sigue el archivo del flujo (uno para todas las sesiones)"""
+    ventas = obtener_ventas_incrementales(n_filas, semilla)
+    return ConsumidorFlujo(SeguidorArchivo(ruta), ventas).iniciar()
+
+# El flujo en vivo alimenta los mismos agregados que el botón de ventas nuevas
+en_vivo = bool(RUTA_FLUJO) and ventas_nuevas is not None and motor_sql is None
+consumidor_flujo = obtener_consumidor_flujo(RUTA_FLUJO, N_FILAS, SEMILLA) if en_vivo else None
+
+perfil_ejecucion.marcar("Sidebar: paneles")
+
+# Ventas nuevas: simula la llegada de un lote de ventas
+# on_click se ejecuta ANTES de volver a ejecutar el script, así que esta
+# misma ejecución ya muestra los datos con el lote añadido.
+def anexar_ventas_nuevas():
+    """Añade un lote de ventas generadas a los agregados del dashboard"""
+    semilla = SEMILLA + ventas_nuevas.version + 1
+    ventas_nuevas.anexar(generar_ventas(n_filas=TAM_LOTE_NUEVO, semilla=semilla))
+
+if ventas_nuevas is not None and motor_sql is None:
+    with st.sidebar.expander("📥 Ventas nuevas"):
+        st.button(f"➕ Añadir {TAM_LOTE_NUEVO:,} ventas", on_click=anexar_ventas_nuevas)
+        st.caption(f"Versión de los datos: {instantanea['version']} "
+                   f"({instantanea['version']} lotes añadidos; la tabla de detalle incluye "
+                   f"las últimas {sum(len(lote) for lote in lotes_nuevos):,} ventas nuevas)")
+
+# Estadísticas de la caché (aciertos, fallos y desalojos)
+with st.sidebar.expander("🧠 Caché de filtros"):
+    stats = cache_filtros.estadisticas()
+    st.write(f"Entradas: {stats['entradas']}/{stats['max_entradas']}")
+    st.write(f"Memoria: {stats['bytes'] / 2**20:.1f}/{stats['max_bytes'] / 2**20:.0f} MB")
+    st.write(f"Aciertos: {stats['aciertos']} | Fallos: {stats['fallos']} | Desalojos: {stats['desalojos']}")
+    st.write(f"Tasa de aciertos: {stats['tasa_aciertos']:.0%}")
+
+# Memoria residente de este proceso del servidor
+# Con el dataset compartido, abrir más sesiones no debería hacer crecer la
+# memoria privada (anónima): la tabla de ventas está en archivos mapeados.
+with st.sidebar.expander("💾 Memoria del proceso"):
+    memoria = memoria_proceso()
+    st.write(f"RSS: {memoria['rss'] / 2**20:.0f} MB")
+    if memoria['rss_archivos'] is not None:
+        st.write(f"Archivos mapeados (compartida): {memoria['rss_archivos'] / 2**20:.0f} MB")
+        st.write(f"Privada: {memoria['rss_anonima'] / 2**20:.0f} MB")
 
 # ====================================
 # HEADER
 # ====================================
+perfil_ejecucion.marcar("Cabecera")
 
 st.title("📊 Dashboard de Ventas")
 st.markdown("### Panel de análisis de ventas por producto y región")
@@ -104,124 +402,302 @@ st.divider()
 # KPIS PRINCIPALES
 # ====================================
 
-st.header("📈 Indicadores Clave")
-
-# Calcular métricas
-# Estas son las métricas clave (KPIs) que resumen el rendimiento
-total_ventas = df_filtrado['Total'].sum()
-total_productos = len(df_filtrado)
-ticket_promedio = total_ventas / total_productos if total_productos > 0 else 0
-
-# Mostrar en 3 columnas
-col1, col2, col3 = st.columns(3)
-
-with col1:
-    st.metric(
-        "💰 Ventas Totales",
-        f"€{total_ventas:,.0f}"  # Formato con separador de miles
-    )
-
-with col2:
-    st.metric(
-        "🛒 Número de Ventas",
-        f"{total_productos}"
-    )
-
-with col3:
-    st.metric(
-        "💳 Ticket Promedio",
-        f"€{ticket_promedio:.2f}"  # Dos decimales
-    )
-
-st.divider()
-
-# ====================================
-# GRÁFICOS
-# ====================================
-
-st.header("📊 Visualizaciones")
-
-# Crear dos columnas para los gráficos
-col_izq, col_der = st.columns(2)
-
-with col_izq:
-    st.subheader("Ventas por Producto")
-    
-    # Agrupar por producto y sumar ventas
-    # groupby() agrupa los datos, sum() suma los valores
-    ventas_por_producto = df_filtrado.groupby('Producto')['Total'].sum()
-    st.bar_chart(ventas_por_producto)
-
-with col_der:
-    st.subheader("Ventas por Región")
-    
-    # Agrupar por región y sumar ventas
-    ventas_por_region = df_filtrado.groupby('Región')['Total'].sum()
-    st.bar_chart(ventas_por_region)
-
-st.divider()
+def mostrar_kpis(kpis):
+    """Muestra los tres KPIs principales en columnas"""
+    # Calcular métricas
+    # Estas son las métricas clave (KPIs) que resumen el rendimiento
+    # Se calculan sobre el cubo filtrado: sumar unas pocas celdas ya agregadas
+    total_ventas = kpis['total_ventas']
+    total_productos = kpis['numero_ventas']
+    ticket_promedio = kpis['ticket_promedio']
+
+    # Mostrar en 3 columnas
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.metric(
+            "💰 Ventas Totales",
+            f"€{total_ventas:,.0f}"  # Formato con separador de miles
+        )
+
+    with col2:
+        st.metric(
+            "🛒 Número de Ventas",
+            f"{total_productos}"
+        )
+
+    with col3:
+        st.metric(
+            "💳 Ticket Promedio",
+            f"€{ticket_promedio:.2f}"  # Dos decimales
+        )
+
+def mostrar_graficos(ventas_por_producto, ventas_por_region):
+    """Muestra los gráficos de ventas por producto y por región"""
+    # Crear dos columnas para los gráficos
+    col_izq, col_der = st.columns(2)
+
+    with col_izq, perfil_ejecucion.seccion("Gráfico: ventas por producto"):
+        st.subheader("Ventas por Producto")
+
+        # Ventas por producto (ya agregadas desde el cubo)
+        st.bar_chart(ventas_por_producto)
+
+    with col_der, perfil_ejecucion.seccion("Gráfico: ventas por región"):
+        st.subheader("Ventas por Región")
+
+        # Ventas por región (ya agregadas desde el cubo)
+        st.bar_chart(ventas_por_region)
+
+def resultado_en_vivo(instantanea_vivo, productos, regiones):
+    """KPIs y ventas por dimensión con los agregados más recientes del flujo
+
+    Se recalcula solo cuando cambia la versión de los datos o los filtros;
+    si no ha llegado nada nuevo, se reutiliza el resultado anterior.
+    """
+    clave = (instantanea_vivo['version'], tuple(productos), tuple(regiones))
+    if st.session_state.get('clave_en_vivo') != clave:
+        cubo_vivo = filtrar_cubo(instantanea_vivo['cubo'], productos, regiones)
+        st.session_state.resultado_en_vivo = {
+            'kpis': calcular_kpis(cubo_vivo),
+            'ventas_por_producto': agrupar_otros(ventas_por(cubo_vivo, 'Producto')),
+            'ventas_por_region': agrupar_otros(ventas_por(cubo_vivo, 'Región')),
+        }
+        st.session_state.clave_en_vivo = clave
+    return st.session_state.resultado_en_vivo
+
+def medir_latencia(version_mostrada):
+    """Añade las latencias evento → pantalla de los eventos que se muestran por primera vez
+
+    Se miden en el servidor, al enviar el fragmento (no incluyen el dibujo
+    en el navegador). Cada sesión guarda las últimas MAX_LATENCIAS.
+    """
+    anterior = st.session_state.get('version_medida', version_mostrada)
+    nuevas = latencias_ms(consumidor_flujo.marcas_desde(anterior, version_mostrada))
+    st.session_state.version_medida = version_mostrada
+    latencias = np.concatenate([st.session_state.get('latencias', np.empty(0)), nuevas])
+    st.session_state.latencias = latencias[-MAX_LATENCIAS:]
+    return st.session_state.latencias
+
+def redibujar_fragmento(clave):
+    """Pide que se vuelva a ejecutar solo el fragmento @st.fragment(key=clave)
+
+    Es lo que hace st.rerun(scope=clave), que solo se admite en callbacks de
+    widgets; aquí se llama desde el cuerpo de otro fragmento, que termina en
+    ese momento sin dibujar nada más.
+    """
+    ctx = get_script_run_ctx()
+    ctx.script_requests.request_rerun(RerunData(
+        query_string=ctx.query_string,
+        page_script_hash=ctx.page_script_hash,
+        fragment_id_queue=ctx.fragment_storage.resolve_target(clave),
+        is_fragment_scoped_rerun=True,
+        cached_message_hashes=ctx.cached_message_hashes,
+        context_info=ctx.context_info,
+    ))
+    st.empty()  # Punto de control: aquí se atiende la petición
+
+# Cada vez que un fragmento se vuelve a ejecutar, el navegador borra lo que
+# había dibujado y no se ha vuelto a enviar, así que no basta con salir
+# pronto de un fragmento con run_every para no redibujarlo. Por eso hay dos:
+#   - panel_en_vivo dibuja los KPIs y gráficos y no tiene temporizador
+#   - vigilar_flujo se ejecuta cada REFRESCO segundos, no dibuja nada y
+#     solo compara la versión de VentasIncrementales con la del último
+#     dibujo; si ha llegado algún lote, vuelve a ejecutar panel_en_vivo
+# El resto del script no se re-ejecuta, así que las ejecuciones no se
+# acumulan aunque lleguen muchos eventos por segundo, y si no llega nada
+# no se envía ningún gráfico. Los filtros viven en el sidebar: cambiarlos
+# vuelve a ejecutar el script entero, que dibuja el panel de nuevo.
+@st.fragment(key="panel_en_vivo")
+def panel_en_vivo():
+    """KPIs y gráficos con los agregados más recientes del flujo de ventas"""
+    inicio = time.perf_counter()
+    # Versión y cubo leídos a la vez, para que la latencia corresponda a lo dibujado
+    instantanea_vivo = ventas_nuevas.instantanea()
+    st.session_state.version_dibujada = instantanea_vivo['version']
+    resultado_vivo = resultado_en_vivo(instantanea_vivo, productos_seleccionados,
+                                       regiones_seleccionadas)
+
+    st.header("📈 Indicadores Clave")
+    mostrar_kpis(resultado_vivo['kpis'])
+    st.divider()
+    st.header("📊 Visualizaciones")
+    mostrar_graficos(resultado_vivo['ventas_por_producto'], resultado_vivo['ventas_por_region'])
+
+    latencias = medir_latencia(instantanea_vivo['version'])
+    texto_latencia = (f"latencia evento → pantalla p50 {np.percentile(latencias, 50):,.0f} ms, "
+                      f"p95 {np.percentile(latencias, 95):,.0f} ms"
+                      if len(latencias) else "sin eventos todavía")
+    st.caption(f"⚡ En vivo: {consumidor_flujo.rendimiento():,.0f} eventos/s | "
+               f"{consumidor_flujo.eventos:,} eventos | {texto_latencia} | "
+               f"{consumidor_flujo.errores:,} errores "
+               f"({consumidor_flujo.lotes_descartados:,} lotes descartados) | "
+               f"versión {instantanea_vivo['version']} | "
+               f"fragmento {(time.perf_counter() - inicio) * 1000:.0f} ms")
+    st.divider()
+
+@st.fragment(run_every=REFRESCO if en_vivo else None)
+def vigilar_flujo():
+    """Redibuja panel_en_vivo solo cuando ha llegado algún lote nuevo"""
+    if ventas_nuevas.version != st.session_state.get('version_dibujada'):
+        redibujar_fragmento("panel_en_vivo")
+
+if en_vivo:
+    perfil_ejecucion.marcar("Panel en vivo")
+    panel_en_vivo()
+    vigilar_flujo()
+else:
+    perfil_ejecucion.marcar("KPIs")
+    st.header("📈 Indicadores Clave")
+    mostrar_kpis(resultado['kpis'])
+    st.divider()
+
+    # ====================================
+    # GRÁFICOS
+    # ====================================
+
+    perfil_ejecucion.marcar("Gráficos")
+    st.header("📊 Visualizaciones")
+    mostrar_graficos(resultado['ventas_por_producto'], resultado['ventas_por_region'])
+    st.divider()
 
 # ====================================
 # TABLA DE DATOS
 # ====================================
-
-st.header("📋 Datos Detallados")
-
-# Checkbox para mostrar/ocultar tabla
-# Esto permite al usuario controlar qué contenido ver
-mostrar_datos = st.checkbox("Mostrar datos completos", value=True)
-
-if mostrar_datos:
-    st.write(f"Mostrando {len(df_filtrado)} registros:")
-    
-    # Ordenar por ventas totales (de mayor a menor)
-    # sort_values() ordena el DataFrame por una columna
-    df_ordenado = df_filtrado.sort_values('Total', ascending=False)
-    
-    # Mostrar tabla
-    st.dataframe(
-        df_ordenado,
-        use_container_width=True,  # Usa todo el ancho disponible
-        hide_index=True  # Oculta la columna de índices
-    )
-    
-    # Estadísticas rápidas
-    # expander crea una sección plegable
-    with st.expander("Ver estadísticas"):
-        # .describe() calcula estadísticas descriptivas
-        st.write(df_filtrado[['Cantidad', 'Precio', 'Total']].describe())
+perfil_ejecucion.marcar("Tabla de detalle")
+
+def calcular_estadisticas():
+    """describe() de las ventas filtradas"""
+    # .describe() calcula estadísticas descriptivas
+    if motor_sql is not None:
+        return motor_sql.describe(productos_seleccionados, regiones_seleccionadas)
+    if origen is not None:
+        # Con Parquet se leen por lotes solo las columnas de las estadísticas
+        return obtener_agregador().describe_por_bloques(
+            origen.leer_por_bloques(productos_seleccionados, regiones_seleccionadas,
+                                    columnas=COLUMNAS_ESTADISTICAS),
+            COLUMNAS_ESTADISTICAS)
+    # Mismo resultado que df_filtrado[...].describe(), repartido entre núcleos
+    filas = df_filtrado
+    if df_recientes is not None:
+        filas = pd.concat([df_filtrado[COLUMNAS_ESTADISTICAS], df_recientes[COLUMNAS_ESTADISTICAS]],
+                          ignore_index=True)
+    return obtener_agregador().describe(filas, COLUMNAS_ESTADISTICAS)
+
+# Los widgets de la tabla (mostrar/ocultar, página, filas por página) solo
+# afectan a la tabla. @st.fragment hace que al tocarlos se vuelva a ejecutar
+# solo esta función: los KPIs, los gráficos y los rankings no se recalculan
+# ni se vuelven a enviar. Los filtros del sidebar siguen re-ejecutando todo,
+# porque de ellos depende el dashboard entero.
+@st.fragment(key="tabla_detalle")
+def tabla_detalle():
+    """Tabla paginada de las ventas filtradas y sus estadísticas"""
+    st.header("📋 Datos Detallados")
+
+    # Checkbox para mostrar/ocultar tabla
+    # Esto permite al usuario controlar qué contenido ver
+    mostrar_datos = st.checkbox("Mostrar datos completos", value=True)
+
+    if mostrar_datos:
+        # Controles de paginación
+        # Solo se ordena y se envía al navegador la página visible,
+        # no todos los registros (ver tabla_paginada.py)
+        col_pagina, col_tam = st.columns(2)
+        with col_tam:
+            tam_pagina = st.selectbox("Filas por página:", TAMANOS_PAGINA, index=1)
+        total_paginas = num_paginas(n_filas_filtradas, tam_pagina)
+        with col_pagina:
+            pagina = st.number_input("Página:", min_value=1, max_value=total_paginas, value=1)
+
+        inicio = (pagina - 1) * tam_pagina
+        fin = min(inicio + tam_pagina, n_filas_filtradas)
+        st.write(f"Mostrando registros {inicio + 1 if fin else 0}–{fin} de {n_filas_filtradas} "
+                 f"(página {pagina} de {total_paginas}):")
+        if origen is not None:
+            # El plan de lectura solo se calcula cuando se muestra (y una vez por filtros)
+            plan = calcular_una_vez('plan_lectura', clave_filas, lambda: origen.plan_lectura(
+                productos_seleccionados, regiones_seleccionadas, COLUMNAS_DETALLE))
+            st.caption(f"💾 Leídos {plan['bytes'] / 1e6:.1f} MB de {plan['bytes_total'] / 1e6:.1f} MB "
+                       f"({plan['fraccion']:.0%}) · {plan['grupos']}/{plan['grupos_total']} grupos de filas")
+
+        # Ordenar por ventas totales (de mayor a menor)
+        # pagina_ordenada_partes() usa una ordenación parcial: solo ordena las filas
+        # de la página pedida, en lugar de df_filtrado.sort_values('Total')
+        # Con el motor SQL, la página se pide con ORDER BY ... LIMIT/OFFSET
+        # y con Parquet se elige mientras se leen los lotes (solo COLUMNAS_DETALLE)
+        if motor_sql is not None:
+            df_pagina = motor_sql.pagina(pagina, tam_pagina, productos_seleccionados,
+                                         regiones_seleccionadas, orden='Total')
+        elif origen is not None:
+            df_pagina = calcular_una_vez(
+                'pagina_detalle', (clave_filas, pagina, tam_pagina),
+                lambda: origen.pagina(pagina, tam_pagina, productos_seleccionados,
+                                      regiones_seleccionadas, orden='Total',
+                                      columnas=COLUMNAS_DETALLE))
+        else:
+            # Las filas de los lotes recientes se ordenan junto con las demás
+            partes = [df_filtrado] + ([df_recientes] if df_recientes is not None else [])
+            df_pagina = pagina_ordenada_partes(partes, 'Total', pagina, tam_pagina, ascendente=False)
+
+        # Mostrar tabla
+        st.dataframe(
+            df_pagina,
+            use_container_width=True,  # Usa todo el ancho disponible
+            hide_index=True  # Oculta la columna de índices
+        )
+
+        # Estadísticas rápidas
+        # expander crea una sección plegable. Un expander normal calcula su
+        # contenido aunque esté cerrado; este solo calcula describe() al
+        # abrirlo, y lo guarda mientras no cambien los filtros
+        # (ver secciones_perezosas.py)
+        estadisticas = expander_perezoso("Ver estadísticas", key="expander_estadisticas")
+        if estadisticas.open:
+            with estadisticas:
+                st.write(calcular_una_vez('describe', clave_resultado, calcular_estadisticas))
+
+tabla_detalle()
 
 st.divider()
 
 # ====================================
 # ANÁLISIS ADICIONAL
 # ====================================
+perfil_ejecucion.marcar("Análisis: rankings")
 
 st.header("🎯 Análisis")
 
 # tabs organizan contenido relacionado en pestañas
-tab1, tab2 = st.tabs(["Top Productos", "Top Regiones"])
+# Solo se calcula y se envía la pestaña abierta (ver secciones_perezosas.py)
+tab1, tab2 = pestanas_perezosas(["Top Productos", "Top Regiones"], key="pestanas_ranking")
 
-with tab1:
-    st.subheader("Top 5 Productos por Ventas")
-    
-    # groupby + sum + sort_values + head = análisis típico
-    top_productos = df_filtrado.groupby('Producto')['Total'].sum().sort_values(ascending=False).head()
-    
-    for i, (producto, ventas) in enumerate(top_productos.items(), 1):
-        st.write(f"**{i}. {producto}:** €{ventas:,.0f}")
+if tab1.open:
+    with tab1:
+        st.subheader("Top 5 Productos por Ventas")
 
-with tab2:
-    st.subheader("Top 3 Regiones por Ventas")
-    
-    top_regiones = df_filtrado.groupby('Región')['Total'].sum().sort_values(ascending=False).head(3)
-    
-    for i, (region, ventas) in enumerate(top_regiones.items(), 1):
-        st.write(f"**{i}. {region}:** €{ventas:,.0f}")
+        # Los 5 productos con más ventas (calculados desde el cubo)
+        # top_k() elige los mayores sin ordenar toda la serie
+        # (equivale a sort_values(ascending=False).head(k))
+        top_productos = calcular_una_vez('top_productos', clave_resultado,
+                                         lambda: top_k(resultado['ventas_producto'], 5))
+
+        for i, (producto, ventas) in enumerate(top_productos.items(), 1):
+            st.write(f"**{i}. {producto}:** €{ventas:,.0f}")
+
+if tab2.open:
+    with tab2:
+        st.subheader("Top 3 Regiones por Ventas")
+
+        top_regiones = calcular_una_vez('top_regiones', clave_resultado,
+                                        lambda: top_k(resultado['ventas_region'], 3))
+
+        for i, (region, ventas) in enumerate(top_regiones.items(), 1):
+            st.write(f"**{i}. {region}:** €{ventas:,.0f}")
 
 # ====================================
 # FOOTER
 # ====================================
+perfil_ejecucion.marcar("Pie de página")
 
 st.divider()
 st.markdown("""
@@ -229,3 +705,6 @@ st.markdown("""
     <p>Dashboard creado con Streamlit | Bootcamp Data & IA 2025</p>
 </div>
 """, unsafe_allow_html=True)
+
+# Fin de la ejecución: tiempos por sección y panel del perfilador (si está activo)
+perfil_ejecucion.finalizar()
@@ -0,0 +1,78 @@
+# ====================================
+# BENCHMARK: AGREGACIÓN PARALELA
+# ====================================
+# Mide el tiempo de construir el cubo Producto × Región y de describe()
+# con pandas (un núcleo) frente a agregacion_paralela.AgregadorParalelo
+# con distinto número de hilos o procesos.
+#
+# Uso (desde la carpeta del proyecto):
+#     python benchmarks/bench_agregacion_paralela.py
+#     python benchmarks/bench_agregacion_paralela.py --filas 10000000 --trabajadores 1 4 16 32
+#
+# El tiempo debería bajar al aumentar los trabajadores hasta el número de
+# núcleos de la máquina; con más trabajadores que núcleos no mejora.
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agregacion_paralela import EJECUTORES, AgregadorParalelo  # noqa: E402
+from cubo_ventas import construir_cubo  # noqa: E402
+from dataset_compartido import abrir, publicar  # noqa: E402
+from datos_ventas import MEDIDAS, generar_ventas_por_bloques  # noqa: E402
+
+
+def cronometrar(funcion, repeticiones=3):
+    """Mejor tiempo (en ms) de varias ejecuciones"""
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de la agregación paralela')
+    parser.add_argument('--filas', type=int, nargs='+', default=[1_000_000, 10_000_000])
+    parser.add_argument('--trabajadores', type=int, nargs='+',
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument('--ejecutores', nargs='+', default=EJECUTORES)
+    args = parser.parse_args()
+
+    print(f"Núcleos disponibles: {os.cpu_count()}")
+    resultados = []
+    with tempfile.TemporaryDirectory() as directorio:
+        for n in args.filas:
+            ruta = publicar(pd.concat(generar_ventas_por_bloques(n), ignore_index=True),
+                            directorio, n)
+            df = abrir(ruta)
+            resultados.append({
+                'filas': n, 'ejecutor': 'pandas', 'trabajadores': 1,
+                'ms cubo': round(cronometrar(lambda: construir_cubo(df)), 1),
+                'ms describe': round(cronometrar(lambda: df[MEDIDAS].describe()), 1),
+            })
+            for ejecutor in args.ejecutores:
+                for trabajadores in args.trabajadores:
+                    agregador = AgregadorParalelo(trabajadores, ejecutor)
+                    # Primera llamada para arrancar los hilos/procesos
+                    agregador.cubo(df, ruta)
+                    resultados.append({
+                        'filas': n, 'ejecutor': ejecutor, 'trabajadores': trabajadores,
+                        'ms cubo': round(cronometrar(lambda: agregador.cubo(df, ruta)), 1),
+                        'ms describe': round(cronometrar(
+                            lambda: agregador.describe(df, MEDIDAS, ruta)), 1),
+                    })
+                    agregador.cerrar()
+
+    print(pd.DataFrame(resultados).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
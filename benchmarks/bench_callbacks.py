@@ -0,0 +1,123 @@
+# ====================================
+# BENCHMARK: EJECUCIONES DEL SCRIPT POR CLIC
+# ====================================
+# Cuenta cuántas veces se ejecuta el script de app_05_estado.py en cada
+# interacción (incrementar, agregar una tarea, limpiar...) y cuánto tiempo
+# de CPU del servidor cuesta cada clic.
+#
+# Con "if st.button(...): ...; st.rerun()" cada clic ejecuta el script dos
+# veces; con callbacks (on_click) debería ser una sola.
+#
+# Uso (desde la carpeta del proyecto):
+#     python benchmarks/bench_callbacks.py
+#     python benchmarks/bench_callbacks.py --referencia HEAD~1 --repeticiones 50
+#
+# Con --referencia se mide también la versión de la app de ese commit de git,
+# para comparar antes y después. Las apps se ejecutan sin servidor con
+# streamlit.testing (AppTest); el tiempo de CPU incluye el de AppTest, que es
+# el mismo en las dos versiones.
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1 import app_test as modulo_app_test
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+CARPETA = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = 'app_05_estado.py'
+
+# (nombre, etiqueta del botón, texto a escribir antes en "Escribe una tarea:")
+INTERACCIONES = [
+    ('incrementar', '➕ Incrementar', None),
+    ('decrementar', '➖ Decrementar', None),
+    ('resetear', '🔄 Resetear', None),
+    ('agregar tarea', '➕ Agregar tarea', 'Comprar pan'),
+    ('limpiar tareas', '🗑️ Limpiar todas', None),
+]
+
+
+class EjecutorContado(LocalScriptRunner):
+    """LocalScriptRunner que cuenta las ejecuciones del script (incluidas las de st.rerun)"""
+
+    ejecuciones = 0
+
+    def _on_script_finished(self, ctx, event, premature_stop):
+        EjecutorContado.ejecuciones += 1
+        super()._on_script_finished(ctx, event, premature_stop)
+
+
+def boton(at, etiqueta):
+    return next(b for b in at.button if b.label == etiqueta)
+
+
+def medir(ruta, repeticiones):
+    """Ejecuciones y tiempos por clic de cada interacción (medianas)"""
+    at = AppTest.from_file(ruta, default_timeout=60)
+    at.run()
+    resultados = []
+    for nombre, etiqueta, texto in INTERACCIONES:
+        medidas = []
+        for _ in range(repeticiones):
+            if nombre == 'limpiar tareas':
+                # Necesita tareas en la lista para que aparezca el botón
+                next(t for t in at.text_input if t.label == "Escribe una tarea:").set_value('x')
+                boton(at, '➕ Agregar tarea').click()
+                at.run()
+            if texto is not None:
+                next(t for t in at.text_input if t.label == "Escribe una tarea:").set_value(texto)
+            boton(at, etiqueta).click()
+            EjecutorContado.ejecuciones = 0
+            cpu, reloj = time.process_time(), time.perf_counter()
+            at.run()
+            medidas.append({
+                'ejecuciones': EjecutorContado.ejecuciones,
+                'ms CPU': (time.process_time() - cpu) * 1000,
+                'ms': (time.perf_counter() - reloj) * 1000,
+            })
+            if at.exception:
+                raise RuntimeError(at.exception[0].message)
+        resultados.append({'interacción': nombre,
+                           **{campo: float(np.median([m[campo] for m in medidas]))
+                              for campo in ('ejecuciones', 'ms CPU', 'ms')}})
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de ejecuciones del script por clic')
+    parser.add_argument('--referencia', help='commit de git con la versión anterior de la app')
+    parser.add_argument('--repeticiones', type=int, default=20)
+    args = parser.parse_args()
+
+    sys.path.insert(0, CARPETA)
+    os.chdir(CARPETA)
+
+    with tempfile.TemporaryDirectory() as directorio:
+        # El estado guardado por la app (ver estado_sesion.py) va a una carpeta temporal
+        os.environ['ESTADO_DIRECTORIO'] = directorio
+        versiones = [('actual', os.path.join(CARPETA, APP))]
+        if args.referencia:
+            ruta = os.path.join(directorio, f'anterior_{APP}')
+            with open(ruta, 'w') as f:
+                f.write(subprocess.run(['git', 'show', f'{args.referencia}:{APP}'], check=True,
+                                       capture_output=True, text=True).stdout)
+            versiones.insert(0, (args.referencia, ruta))
+
+        resultados = []
+        with mock.patch.object(modulo_app_test, 'LocalScriptRunner', EjecutorContado):
+            for version, ruta in versiones:
+                resultados += [{'versión': version, **fila} for fila in medir(ruta, args.repeticiones)]
+
+    print(f"Mediana de {args.repeticiones} clics por interacción")
+    print(pd.DataFrame(resultados).round(2).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
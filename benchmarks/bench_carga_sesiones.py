@@ -0,0 +1,414 @@
+# ====================================
+# BENCHMARK: CARGA CON VARIAS SESIONES A LA VEZ
+# ====================================
+# ¿Cuántos usuarios a la vez aguanta un servidor con app_06_dashboard.py?
+#
+# Este script arranca un servidor de Streamlit local (streamlit run) y abre
+# N sesiones simuladas contra él. Cada sesión habla con el servidor por el
+# mismo websocket que usa el navegador (/_stcore/stream): envía los valores
+# de los widgets, espera a que termine la re-ejecución y mide cuánto ha
+# tardado. No hace falta ningún servicio externo ni un navegador.
+#
+# Cada app tiene un guion de interacciones (ESCENARIOS): cambiar filtros,
+# marcar y desmarcar casillas, pasar de página, cambiar de pestaña o subir
+# un CSV a app_03_datos.py. Entre paso y paso la sesión "piensa" un tiempo
+# aleatorio (--pausa), como haría una persona.
+#
+# Uso (desde la carpeta del proyecto):
+#     python benchmarks/bench_carga_sesiones.py
+#     python benchmarks/bench_carga_sesiones.py --sesiones 1 10 50 --rondas 5
+#     python benchmarks/bench_carga_sesiones.py --app app_03_datos.py
+#     python benchmarks/bench_carga_sesiones.py --url http://localhost:8501 --pid 1234
+#
+# Se informa, para cada número de sesiones:
+#   - Percentiles de la latencia de re-ejecución (envío → fin del script).
+#   - Rendimiento: re-ejecuciones por segundo que atiende el servidor.
+#   - Memoria del proceso del servidor por sesión (ver
+#     dataset_compartido.memoria_proceso): lo que crece tras abrir las
+#     sesiones, dividido entre ellas. Antes se hace una sesión de
+#     calentamiento para que los datos y las cachés ya estén cargados.
+#   - Errores: excepciones que muestra la app y sesiones que fallan (se
+#     desconectan, no responden a tiempo...). Una sesión que falla termina
+#     y se cuenta, pero no detiene a las demás.
+#
+# Las sesiones simuladas corren en este proceso y comparten la máquina con
+# el servidor: con pocos núcleos, las cifras son una cota pesimista.
+
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.request
+import uuid
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.Common_pb2 import FileURLs, UploadedFileInfo
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+CARPETA = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, CARPETA)
+
+from dataset_compartido import memoria_proceso  # noqa: E402
+
+# Guion de cada app: (nombre del paso, tipo de widget, etiqueta, argumento)
+# Para 'file_uploader' el argumento es el archivo que se sube.
+ESCENARIOS = {
+    'app_06_dashboard.py': [
+        ('filtro de productos', 'multiselect', 'Selecciona productos:', None),
+        ('filtro de regiones', 'multiselect', 'Selecciona regiones:', None),
+        ('ocultar tabla', 'checkbox', 'Mostrar datos completos', None),
+        ('mostrar tabla', 'checkbox', 'Mostrar datos completos', None),
+        ('filas por página', 'selectbox', 'Filas por página:', None),
+        ('página', 'number_input', 'Página:', None),
+        ('pestaña', 'tab', 'Top Regiones', None),
+    ],
+    'app_04_layout.py': [
+        ('slider', 'slider', 'Cantidad de datos a mostrar:', None),
+        ('navegación', 'radio', 'Navega a:', None),
+        ('pestaña', 'tab', '📋 Datos', None),
+    ],
+    'app_03_datos.py': [
+        ('subir CSV', 'file_uploader', 'Sube un archivo CSV', 'datos_ejemplo.csv'),
+    ],
+}
+
+# Segundos máximos de espera a una respuesta del servidor
+TIEMPO_MAXIMO = 120
+
+# Estados de fin de ejecución que cuentan como terminada (no interrumpida)
+FINALES = (ForwardMsg.FINISHED_SUCCESSFULLY, ForwardMsg.FINISHED_WITH_COMPILE_ERROR,
+           ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY)
+
+
+class SesionSimulada:
+    """Una pestaña del navegador: un websocket y los valores de sus widgets
+
+    Igual que el navegador, recuerda los widgets que ha dibujado el servidor
+    (por etiqueta) y en cada re-ejecución envía el valor de todos los que ha
+    cambiado. Si el widget está dentro de un fragmento, pide re-ejecutar
+    solo ese fragmento.
+    """
+
+    def __init__(self, url, rng):
+        self.url = url
+        self.rng = rng
+        self.ws = None
+        self.id_sesion = None
+        self.widgets = {}     # etiqueta -> (tipo, proto del elemento, id del fragmento)
+        self.estados = {}     # id del widget -> WidgetState enviado
+        self.latencias = []   # (paso, ms)
+        self.errores = 0
+        self.fallo = None     # error que terminó la sesión (si lo hubo)
+        self.sin_reejecucion = 0
+        self._contenedor_tabs = None
+
+    async def conectar(self):
+        """Abre el websocket y hace la primera ejecución (la carga de la página)"""
+        url_ws = self.url.replace('http', 'ws', 1).rstrip('/') + '/_stcore/stream'
+        self.ws = await websockets.connect(url_ws, subprotocols=['streamlit'], max_size=None)
+        await self._reejecutar('carga inicial')
+
+    async def cerrar(self):
+        if self.ws is not None:
+            await self.ws.close()
+
+    # ------------------------------------
+    # Mensajes
+    # ------------------------------------
+
+    async def _recibir(self):
+        mensaje = ForwardMsg()
+        mensaje.ParseFromString(await asyncio.wait_for(self.ws.recv(), TIEMPO_MAXIMO))
+        tipo = mensaje.WhichOneof('type')
+        if tipo == 'new_session':
+            self.id_sesion = mensaje.new_session.initialize.session_id
+        elif tipo == 'delta':
+            self._anotar_delta(mensaje.delta)
+        return mensaje, tipo
+
+    def _anotar_delta(self, delta):
+        """Guarda los widgets y pestañas dibujados (y cuenta las excepciones)"""
+        tipo = delta.WhichOneof('type')
+        if tipo == 'new_element':
+            tipo_elemento = delta.new_element.WhichOneof('type')
+            if tipo_elemento == 'exception':
+                self.errores += 1
+                return
+            elemento = getattr(delta.new_element, tipo_elemento)
+            if getattr(elemento, 'id', '') and getattr(elemento, 'label', ''):
+                self.widgets[elemento.label] = (tipo_elemento, elemento, delta.fragment_id)
+        elif tipo == 'add_block':
+            bloque = delta.add_block
+            if bloque.WhichOneof('type') == 'tab_container':
+                self._contenedor_tabs = (bloque.tab_container, delta.fragment_id)
+            elif bloque.WhichOneof('type') == 'tab' and self._contenedor_tabs:
+                contenedor, fragmento = self._contenedor_tabs
+                self.widgets[bloque.tab.label] = ('tab', contenedor, fragmento)
+
+    async def _reejecutar(self, paso, fragmento='', inicio=None):
+        """Envía los widgets y espera al final de la ejecución; guarda la latencia"""
+        peticion = BackMsg()
+        peticion.rerun_script.widget_states.widgets.extend(self.estados.values())
+        if fragmento:
+            peticion.rerun_script.fragment_id = fragmento
+        inicio = time.perf_counter() if inicio is None else inicio
+        await self.ws.send(peticion.SerializeToString())
+        while True:
+            mensaje, tipo = await self._recibir()
+            if tipo == 'script_finished' and mensaje.script_finished in FINALES:
+                break
+        self.latencias.append((paso, (time.perf_counter() - inicio) * 1000))
+
+    # ------------------------------------
+    # Interacciones
+    # ------------------------------------
+
+    def _nuevo_valor(self, tipo, elemento, estado):
+        """WidgetState con un valor nuevo al azar para el widget
+
+        Devuelve None si no hay nada que elegir (un multiselect o selectbox
+        sin opciones).
+        """
+        anterior = self.estados.get(elemento.id)
+        if tipo in ('multiselect', 'selectbox', 'radio') and not elemento.options:
+            return None
+        if tipo == 'multiselect':
+            opciones = list(elemento.options)
+            elegidas = self.rng.sample(opciones, self.rng.randint(1, len(opciones)))
+            estado.string_array_value.data.extend(sorted(elegidas, key=opciones.index))
+        elif tipo == 'checkbox':
+            actual = anterior.bool_value if anterior is not None else elemento.default
+            estado.bool_value = not actual
+        elif tipo in ('selectbox', 'radio'):
+            estado.string_value = self.rng.choice(list(elemento.options))
+        elif tipo == 'number_input':
+            maximo = int(elemento.max) if elemento.has_max else int(elemento.min) + 10
+            estado.double_value = self.rng.randint(int(elemento.min), max(int(elemento.min), maximo))
+        elif tipo == 'slider':
+            estado.double_array_value.data.append(self.rng.randint(int(elemento.min), int(elemento.max)))
+        else:
+            raise ValueError(f"Tipo de widget no soportado: {tipo}")
+        return estado
+
+    async def paso(self, nombre, tipo, etiqueta, argumento):
+        """Ejecuta un paso del guion (si el widget está en la página)"""
+        if etiqueta not in self.widgets:
+            return  # Todavía no se ha dibujado (por ejemplo, la tabla oculta)
+        tipo_widget, elemento, fragmento = self.widgets[etiqueta]
+        if tipo == 'tab':
+            if not elemento.id:
+                # Pestañas sin on_change: el navegador cambia de pestaña sin
+                # avisar al servidor, así que no hay nada que medir
+                self.sin_reejecucion += 1
+                return
+            estado = WidgetState(id=elemento.id, string_value=etiqueta)
+        elif tipo == 'file_uploader':
+            inicio = time.perf_counter()
+            estado = await self._subir_archivo(elemento, os.path.join(CARPETA, argumento))
+            self.estados[estado.id] = estado
+            await self._reejecutar(nombre, fragmento, inicio)
+            return
+        else:
+            estado = self._nuevo_valor(tipo_widget, elemento, WidgetState(id=elemento.id))
+            if estado is None:
+                return
+        self.estados[estado.id] = estado
+        await self._reejecutar(nombre, fragmento)
+
+    async def _subir_archivo(self, elemento, ruta):
+        """Sube un archivo como lo hace st.file_uploader y devuelve el estado del widget
+
+        1. Pide al servidor una URL de subida (file_urls_request).
+        2. Envía el archivo con un PUT multipart a esa URL.
+        """
+        nombre = os.path.basename(ruta)
+        peticion = BackMsg()
+        peticion.file_urls_request.request_id = uuid.uuid4().hex
+        peticion.file_urls_request.file_names.append(nombre)
+        peticion.file_urls_request.session_id = self.id_sesion
+        await self.ws.send(peticion.SerializeToString())
+        while True:
+            mensaje, tipo = await self._recibir()
+            if (tipo == 'file_urls_response'
+                    and mensaje.file_urls_response.response_id == peticion.file_urls_request.request_id):
+                urls = mensaje.file_urls_response.file_urls[0]
+                break
+
+        with open(ruta, 'rb') as f:
+            datos = f.read()
+        await asyncio.to_thread(_enviar_archivo, self.url.rstrip('/') + urls.upload_url, nombre, datos)
+
+        estado = WidgetState(id=elemento.id)
+        estado.file_uploader_state_value.uploaded_file_info.append(UploadedFileInfo(
+            file_id=urls.file_id, name=nombre, size=len(datos),
+            file_urls=FileURLs(file_id=urls.file_id, upload_url=urls.upload_url,
+                               delete_url=urls.delete_url),
+        ))
+        return estado
+
+
+def _enviar_archivo(url, nombre, datos):
+    """PUT multipart/form-data con un único archivo (lo que envía el navegador)"""
+    separador = uuid.uuid4().hex
+    cuerpo = (f'--{separador}\r\nContent-Disposition: form-data; name="file"; '
+              f'filename="{nombre}"\r\nContent-Type: application/octet-stream\r\n\r\n').encode()
+    cuerpo += datos + f'\r\n--{separador}--\r\n'.encode()
+    peticion = urllib.request.Request(url, data=cuerpo, method='PUT', headers={
+        'Content-Type': f'multipart/form-data; boundary={separador}'})
+    with urllib.request.urlopen(peticion, timeout=TIEMPO_MAXIMO) as respuesta:
+        respuesta.read()
+
+
+# ------------------------------------
+# Servidor
+# ------------------------------------
+
+def lanzar_servidor(app, puerto):
+    """Arranca 'streamlit run app' en segundo plano y espera a que responda
+
+    Se desactiva la protección XSRF para poder subir archivos sin la cookie
+    del navegador. Las variables de entorno (DASHBOARD_*, ...) se heredan.
+    """
+    servidor = subprocess.Popen(
+        [sys.executable, '-m', 'streamlit', 'run', app, '--server.headless', 'true',
+         '--server.port', str(puerto), '--server.enableXsrfProtection', 'false',
+         '--browser.gatherUsageStats', 'false'],
+        cwd=CARPETA, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f'http://localhost:{puerto}'
+    limite = time.time() + TIEMPO_MAXIMO
+    while time.time() < limite:
+        if servidor.poll() is not None:
+            raise RuntimeError(f"El servidor terminó al arrancar (código {servidor.returncode})")
+        try:
+            with urllib.request.urlopen(url + '/_stcore/health', timeout=1):
+                return servidor, url
+        except OSError:
+            time.sleep(0.2)
+    servidor.terminate()
+    raise RuntimeError(f"El servidor no respondió en {TIEMPO_MAXIMO} s")
+
+
+# ------------------------------------
+# Carga
+# ------------------------------------
+
+async def recorrer(sesion, escenario, rondas, pausa):
+    """Conecta la sesión y repite el guion 'rondas' veces, con pausas entre pasos
+
+    Si la sesión falla, el error se cuenta y se guarda en sesion.fallo en
+    lugar de propagarse: así no interrumpe a las demás sesiones.
+    """
+    try:
+        await sesion.conectar()
+        for _ in range(rondas):
+            for paso in escenario:
+                await asyncio.sleep(sesion.rng.uniform(0, 2 * pausa))
+                await sesion.paso(*paso)
+    except Exception as error:
+        sesion.errores += 1
+        sesion.fallo = f"{type(error).__name__}: {error}"
+
+
+async def medir_carga(url, pid, escenario, n_sesiones, rondas, pausa, semilla):
+    """Lanza n_sesiones a la vez y devuelve el resumen y las latencias por paso"""
+    # Calentamiento: carga los datos y las cachés del servidor
+    calentamiento = SesionSimulada(url, random.Random(semilla))
+    await recorrer(calentamiento, escenario, 1, 0)
+    await calentamiento.cerrar()
+    if calentamiento.fallo is not None:
+        raise RuntimeError(f"Falló la sesión de calentamiento: {calentamiento.fallo}")
+    memoria_inicial = memoria_proceso(pid) if pid else None
+
+    sesiones = [SesionSimulada(url, random.Random(semilla + 1 + i)) for i in range(n_sesiones)]
+    inicio = time.perf_counter()
+    try:
+        await asyncio.gather(*(recorrer(s, escenario, rondas, pausa) for s in sesiones))
+        duracion = time.perf_counter() - inicio
+        # Memoria con todas las sesiones todavía abiertas
+        memoria_final = memoria_proceso(pid) if pid else None
+    finally:
+        await asyncio.gather(*(s.cerrar() for s in sesiones), return_exceptions=True)
+
+    latencias = pd.DataFrame([lat for s in sesiones for lat in s.latencias], columns=['paso', 'ms'])
+    p50, p95, p99 = (np.percentile(latencias['ms'], [50, 95, 99]) if len(latencias)
+                     else [np.nan] * 3)
+    fallos = [s.fallo for s in sesiones if s.fallo is not None]
+    resumen = {
+        'sesiones': n_sesiones,
+        're-ejecuciones': len(latencias),
+        'errores': sum(s.errores for s in sesiones),
+        'sesiones fallidas': len(fallos),
+        're-ejecuciones/s': round(len(latencias) / duracion, 1),
+        'ms p50': round(p50, 1),
+        'ms p95': round(p95, 1),
+        'ms p99': round(p99, 1),
+        'ms máx': round(latencias['ms'].max(), 1),
+    }
+    if memoria_inicial is not None and memoria_final['rss'] is not None:
+        resumen['MB servidor'] = round(memoria_final['rss'] / 2**20)
+        resumen['MB por sesión'] = round((memoria_final['rss'] - memoria_inicial['rss'])
+                                         / n_sesiones / 2**20, 2)
+        if memoria_final['rss_anonima'] is not None:
+            resumen['MB privada por sesión'] = round(
+                (memoria_final['rss_anonima'] - memoria_inicial['rss_anonima']) / n_sesiones / 2**20, 2)
+    por_paso = latencias.groupby('paso', sort=False)['ms'].describe(percentiles=[0.5, 0.95])
+    pestanas = sum(s.sin_reejecucion for s in sesiones)
+    return resumen, por_paso, pestanas, fallos
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prueba de carga con sesiones simuladas')
+    parser.add_argument('--app', choices=list(ESCENARIOS), default='app_06_dashboard.py')
+    parser.add_argument('--sesiones', type=int, nargs='+', default=[1, 5, 20])
+    parser.add_argument('--rondas', type=int, default=3, help='veces que cada sesión repite el guion')
+    parser.add_argument('--pausa', type=float, default=0.5, help='pausa media entre pasos (s)')
+    parser.add_argument('--puerto', type=int, default=8599)
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--url', help='usar un servidor ya en marcha (no se arranca ninguno)')
+    parser.add_argument('--pid', type=int, help='pid del servidor de --url (para medir su memoria)')
+    args = parser.parse_args()
+
+    escenario = ESCENARIOS[args.app]
+    resultados, fallos = [], Counter()
+    for n_sesiones in args.sesiones:
+        # Un servidor nuevo para cada nivel de carga: la memoria no arrastra
+        # las sesiones del nivel anterior
+        if args.url:
+            servidor, url, pid = None, args.url, args.pid
+        else:
+            servidor, url = lanzar_servidor(args.app, args.puerto)
+            pid = servidor.pid
+        try:
+            resumen, por_paso, pestanas, fallos_nivel = asyncio.run(medir_carga(
+                url, pid, escenario, n_sesiones, args.rondas, args.pausa, args.semilla))
+            fallos.update(fallos_nivel)
+        finally:
+            if servidor is not None:
+                servidor.terminate()
+                servidor.wait()
+        resultados.append(resumen)
+
+    print(f"{args.app}: {args.rondas} rondas del guion por sesión, pausa media {args.pausa} s")
+    print(pd.DataFrame(resultados).to_string(index=False))
+    print(f"\nLatencia por paso con {args.sesiones[-1]} sesiones (ms):")
+    print(por_paso[['count', '50%', '95%', 'max']].round(1).to_string())
+    if pestanas:
+        print(f"\n{pestanas} cambios de pestaña sin re-ejecución (st.tabs sin on_change: "
+              f"el navegador cambia de pestaña sin avisar al servidor)")
+    if fallos:
+        print("\nSesiones fallidas:")
+        for fallo, veces in fallos.most_common():
+            print(f"  {veces} × {fallo}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+# ====================================
+# BENCHMARK: MEMORIA CON EL DATASET COMPARTIDO
+# ====================================
+# Lanza varios procesos que leen la misma tabla de ventas, como harían los
+# procesos de un servidor con muchas sesiones, y mide su memoria:
+#   - copia: cada proceso deserializa su propia copia (lo que hace @st.cache_data).
+#   - mmap:  cada proceso mapea los archivos de dataset_compartido.py.
+#
+# Uso (desde la carpeta del proyecto):
+#     python benchmarks/bench_dataset_compartido.py
+#     python benchmarks/bench_dataset_compartido.py --filas 10000000 --procesos 1 2 4 8
+#
+# Con copias, la memoria total (suma de PSS) crece con cada proceso; con
+# mmap se mantiene casi constante porque las páginas de los datos son las
+# mismas para todos. PSS reparte las páginas compartidas entre los procesos
+# que las usan, así que su suma es la memoria real ocupada. Necesita Linux (/proc).
+
+import argparse
+import multiprocessing
+import os
+import pickle
+import sys
+import tempfile
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dataset_compartido import abrir, memoria_proceso, publicar  # noqa: E402
+from datos_ventas import generar_ventas  # noqa: E402
+
+
+def trabajador(modo, ruta, barrera, cola):
+    """Carga los datos, los recorre enteros y envía su memoria a la cola"""
+    if modo == 'copia':
+        with open(ruta, 'rb') as f:
+            df = pickle.load(f)
+    else:
+        df = abrir(ruta)
+    # Recorrer todas las columnas para que sus páginas estén en memoria
+    df.groupby(['Producto', 'Región'], observed=True)[['Cantidad', 'Precio', 'Total']].sum()
+    # Esperar a que todos los procesos tengan los datos cargados antes de medir
+    barrera.wait()
+    cola.put(memoria_proceso())
+    barrera.wait()
+
+
+def medir(modo, ruta, n_procesos):
+    """Lanza n_procesos trabajadores a la vez y devuelve la memoria de cada uno"""
+    contexto = multiprocessing.get_context('spawn')
+    barrera = contexto.Barrier(n_procesos)
+    cola = contexto.Queue()
+    procesos = [contexto.Process(target=trabajador, args=(modo, ruta, barrera, cola))
+                for _ in range(n_procesos)]
+    for proceso in procesos:
+        proceso.start()
+    memorias = [cola.get() for _ in procesos]
+    for proceso in procesos:
+        proceso.join()
+    return memorias
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Memoria de varios procesos con copias frente a mmap')
+    parser.add_argument('--filas', type=int, default=5_000_000)
+    parser.add_argument('--procesos', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as directorio:
+        df = generar_ventas(args.filas)
+        ruta_pickle = os.path.join(directorio, 'ventas.pkl')
+        with open(ruta_pickle, 'wb') as f:
+            pickle.dump(df, f)
+        ruta_mmap = publicar(df, directorio, 'ventas')
+        mb_datos = df.memory_usage(deep=True).sum() / 2**20
+        del df
+
+        for n in args.procesos:
+            for modo, ruta in (('copia', ruta_pickle), ('mmap', ruta_mmap)):
+                memorias = medir(modo, ruta, n)
+                resultados.append({
+                    'procesos': n,
+                    'modo': modo,
+                    'MB privada (media)': round(sum(m['rss_anonima'] for m in memorias) / n / 2**20),
+                    'MB RSS (suma)': round(sum(m['rss'] for m in memorias) / 2**20),
+                    'MB PSS (suma)': round(sum(m['pss'] for m in memorias) / 2**20),
+                })
+
+    print(f"Tabla de ventas: {args.filas:,} filas, {mb_datos:.0f} MB en memoria")
+    print(pd.DataFrame(resultados).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# ====================================
+# BENCHMARK: MEMORIA DEL ESQUEMA DE TIPOS DE VENTAS
+# ====================================
+# Compara un CSV de ventas leído con pd.read_csv() tal cual (Producto y
+# Región como strings de Python, medidas en int64) frente a
+# datos_ventas.leer_ventas_csv(), que aplica el esquema de tipos
+# (Categorical y el entero más pequeño posible).
+#
+# Uso (desde la carpeta del proyecto):
+#     python benchmarks/bench_esquema_memoria.py
+#     python benchmarks/bench_esquema_memoria.py --filas 1000000 5000000
+#     python benchmarks/bench_esquema_memoria.py --csv extracto_ventas.csv
+#
+# Sin --csv se generan ventas sintéticas y se escriben en un CSV temporal.
+# Con --csv se mide un extracto real. Para cada tamaño se muestran los MB
+# antes y después (memory_usage(deep=True), ver datos_ventas.uso_memoria),
+# el tiempo de lectura y el de un filtro .isin() y un groupby(). Al final
+# se muestra el detalle por columna del último caso
+# (datos_ventas.comparar_memoria).
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datos_ventas import (PRODUCTOS, REGIONES, comparar_memoria, generar_ventas,  # noqa: E402
+                          leer_ventas_csv, uso_memoria)
+
+
+def cronometrar(funcion):
+    """Resultado de funcion() y su tiempo en ms"""
+    inicio = time.perf_counter()
+    resultado = funcion()
+    return resultado, (time.perf_counter() - inicio) * 1000
+
+
+def medir(ruta, etiqueta):
+    """Lee el CSV con y sin esquema y mide memoria y tiempos"""
+    antes, ms_antes = cronometrar(lambda: pd.read_csv(ruta))
+    despues, ms_despues = cronometrar(lambda: leer_ventas_csv(ruta))
+
+    filas = []
+    for version, df, ms_lectura in (('sin esquema', antes, ms_antes),
+                                    ('con esquema', despues, ms_despues)):
+        _, ms_filtro = cronometrar(
+            lambda: df[df['Producto'].isin(PRODUCTOS[:2]) & df['Región'].isin(REGIONES[:2])])
+        _, ms_groupby = cronometrar(
+            lambda: df.groupby('Producto', observed=True)['Total'].sum())
+        filas.append({
+            'datos': etiqueta,
+            'versión': version,
+            'MB': round(uso_memoria(df)['total'] / 2**20, 1),
+            'ms lectura': round(ms_lectura),
+            'ms filtro': round(ms_filtro, 1),
+            'ms groupby': round(ms_groupby, 1),
+        })
+    return filas, comparar_memoria(antes, despues)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de memoria del esquema de ventas')
+    parser.add_argument('--filas', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--csv', help='CSV de ventas real en lugar de datos generados')
+    args = parser.parse_args()
+
+    resultados = []
+    if args.csv:
+        filas, informe = medir(args.csv, os.path.basename(args.csv))
+        resultados += filas
+    else:
+        with tempfile.TemporaryDirectory() as directorio:
+            for n in args.filas:
+                ruta = os.path.join(directorio, f'ventas_{n}.csv')
+                generar_ventas(n_filas=n).to_csv(ruta, index=False)
+                filas, informe = medir(ruta, f'{n:,} filas')
+                resultados += filas
+
+    print(pd.DataFrame(resultados).to_string(index=False))
+    print(f"\nDetalle por columna ({resultados[-1]['datos']}):")
+    print(informe.to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+# ====================================
+# BENCHMARK: MEMORIA DEL ESTADO CON MUCHAS SESIONES
+# ====================================
+# Simula N sesiones que guardan en su estado una lista de tareas y un
+# DataFrame filtrado (lo que hacen app_05_estado.py y una app real con
+# filtros), y compara:
+#   - dict: un diccionario por sesión, como st.session_state; la memoria
+#     crece con cada sesión
+#   - almacen: estado_sesion.AlmacenEstado con presupuestos de memoria; los
+#     valores grandes de las sesiones frías se mueven a disco
+#
+# Uso (desde la carpeta del proyecto):
+#     python benchmarks/bench_estado_sesion.py
+#     python benchmarks/bench_estado_sesion.py --sesiones 100 500 --mb-total 64
+#
+# Cada modo se mide en un proceso aparte (la memoria liberada no siempre se
+# devuelve al sistema). Se informa la memoria privada del proceso tras crear
+# las sesiones y lo que tarda leer un valor que está en memoria (sesión
+# activa) o en disco (sesión fría, hay que cargarlo).
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+CARPETA = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, CARPETA)
+
+from dataset_compartido import memoria_proceso  # noqa: E402
+from datos_ventas import PRODUCTOS, REGIONES, filtrar_ventas, generar_ventas  # noqa: E402
+from estado_sesion import AlmacenEstado  # noqa: E402
+
+
+def valores_sesion(ventas, i, n_tareas):
+    """Lo que guarda una sesión: su lista de tareas y su selección filtrada"""
+    tareas = [f"Tarea {j} de la sesión {i}" for j in range(n_tareas)]
+    filtrado = filtrar_ventas(ventas, [PRODUCTOS[i % len(PRODUCTOS)]], REGIONES)
+    return tareas, filtrado
+
+
+def medir_modo(modo, n_sesiones, n_filas, n_tareas, mb_sesion, mb_total):
+    """Crea las sesiones en este proceso y devuelve las medidas"""
+    ventas = generar_ventas(n_filas=n_filas, semilla=42)
+    base = memoria_proceso()['rss_anonima'] or memoria_proceso()['rss']
+
+    with tempfile.TemporaryDirectory() as directorio:
+        if modo == 'dict':
+            sesiones = {}
+            guardar = lambda s, c, v: sesiones.setdefault(s, {}).__setitem__(c, v)  # noqa: E731
+            obtener = lambda s, c: sesiones[s][c]  # noqa: E731
+        else:
+            almacen = AlmacenEstado(directorio=directorio, max_bytes_sesion=int(mb_sesion * 2**20),
+                                    max_bytes_total=int(mb_total * 2**20))
+            guardar, obtener = almacen.guardar, almacen.obtener
+
+        for i in range(n_sesiones):
+            tareas, filtrado = valores_sesion(ventas, i, n_tareas)
+            guardar(f"s{i}", 'tareas', tareas)
+            guardar(f"s{i}", 'filtrado', filtrado)
+            del tareas, filtrado
+
+        memoria = (memoria_proceso()['rss_anonima'] or memoria_proceso()['rss']) - base
+
+        def ms_lectura(sesion):
+            inicio = time.perf_counter()
+            obtener(sesion, 'filtrado')
+            return (time.perf_counter() - inicio) * 1000
+
+        # La última sesión es la activa; la primera lleva más tiempo sin usarse
+        caliente = float(np.median([ms_lectura(f"s{n_sesiones - 1}") for _ in range(20)]))
+        fria = ms_lectura("s0")
+        resultado = {
+            'modo': modo,
+            'sesiones': n_sesiones,
+            'MB memoria': round(memoria / 2**20, 1),
+            'KB por sesión': round(memoria / 1024 / n_sesiones, 1),
+            'ms lectura activa': round(caliente, 3),
+            'ms lectura fría': round(fria, 3),
+        }
+        if modo == 'almacen':
+            estadisticas = almacen.estadisticas()
+            resultado['MB en disco'] = round(estadisticas['bytes_disco'] / 2**20, 1)
+            resultado['desalojos'] = estadisticas['desalojos']
+            almacen.cerrar()
+        return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de memoria del estado de sesión')
+    parser.add_argument('--sesiones', type=int, nargs='+', default=[50, 200, 800])
+    parser.add_argument('--filas', type=int, default=50_000,
+                        help='filas de la tabla de ventas que filtra cada sesión')
+    parser.add_argument('--tareas', type=int, default=1_000, help='tareas por sesión')
+    parser.add_argument('--mb-sesion', type=float, default=8)
+    parser.add_argument('--mb-total', type=float, default=32)
+    parser.add_argument('--modo', choices=['dict', 'almacen'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.modo:
+        # Proceso hijo: mide un solo modo y devuelve el resultado en JSON
+        print(json.dumps(medir_modo(args.modo, args.sesiones[0], args.filas, args.tareas,
+                                    args.mb_sesion, args.mb_total)))
+        return
+
+    resultados = []
+    for n_sesiones in args.sesiones:
+        for modo in ('dict', 'almacen'):
+            salida = subprocess.run(
+                [sys.executable, __file__, '--modo', modo, '--sesiones', str(n_sesiones),
+                 '--filas', str(args.filas), '--tareas', str(args.tareas),
+                 '--mb-sesion', str(args.mb_sesion), '--mb-total', str(args.mb_total)],
+                capture_output=True, text=True, check=True,
+            )
+            resultados.append(json.loads(salida.stdout.strip().splitlines()[-1]))
+
+    print(f"Presupuesto del almacén: {args.mb_sesion:g} MB por sesión, {args.mb_total:g} MB en total")
+    print(pd.DataFrame(resultados).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+# ====================================
+# BENCHMARK: FLUJO DE VENTAS EN VIVO
+# ====================================
+# Mide el rendimiento (eventos/s) y la latencia evento → pantalla del modo
+# en vivo para varias tasas de eventos.
+#
+# Uso (desde la carpeta del proyecto):
+#     python benchmarks/bench_flujo_ventas.py
+#     python benchmarks/bench_flujo_ventas.py --tasas 1000 10000 100000 --segundos 10
+#
+# Un proceso aparte escribe las ventas en un archivo JSONL (como el
+# simulador de flujo_ventas.py). En este proceso, el ConsumidorFlujo las
+# añade en micro-lotes y un bucle imita al fragmento del dashboard: cada
+# 'refresco' segundos filtra el cubo, calcula los KPIs y las ventas por
+# dimensión y mide la latencia de los eventos que aparecen por primera vez.
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cubo_ventas import calcular_kpis, filtrar_cubo, ventas_por  # noqa: E402
+from datos_ventas import PRODUCTOS, REGIONES  # noqa: E402
+from flujo_ventas import (INTERVALO, ConsumidorFlujo, SeguidorArchivo, latencias_ms,  # noqa: E402
+                          producir_eventos)
+from ventas_incrementales import VentasIncrementales  # noqa: E402
+
+
+def medir(ruta, tasa, segundos, refresco, intervalo):
+    """Ejecuta productor, consumidor y "fragmento" durante 'segundos' y devuelve métricas"""
+    productor = multiprocessing.get_context('spawn').Process(
+        target=producir_eventos, args=(ruta, tasa, segundos))
+    ventas = VentasIncrementales()
+    consumidor = ConsumidorFlujo(SeguidorArchivo(ruta), ventas, intervalo).iniciar()
+    productor.start()
+
+    latencias, tiempos_fragmento = [], []
+    version_vista = 0
+    inicio = time.time()
+    while time.time() - inicio < segundos + 1.0:
+        time.sleep(refresco)
+        comienzo = time.perf_counter()
+        instantanea = ventas.instantanea()
+        cubo = filtrar_cubo(instantanea['cubo'], PRODUCTOS[:3], REGIONES[:2])
+        calcular_kpis(cubo)
+        ventas_por(cubo, 'Producto')
+        ventas_por(cubo, 'Región')
+        tiempos_fragmento.append((time.perf_counter() - comienzo) * 1000)
+        latencias.append(latencias_ms(consumidor.marcas_desde(version_vista,
+                                                              instantanea['version'])))
+        version_vista = instantanea['version']
+
+    productor.join()
+    consumidor.detener()
+    latencias = np.concatenate(latencias) if latencias else np.empty(0)
+    p50, p95, p99 = np.percentile(latencias, [50, 95, 99]) if len(latencias) else [np.nan] * 3
+    return {
+        'eventos/s pedidos': tasa,
+        'eventos/s ingeridos': round(consumidor.eventos / segundos),
+        'lotes': ventas.version,
+        'ms latencia p50': round(p50),
+        'ms latencia p95': round(p95),
+        'ms latencia p99': round(p99),
+        'ms fragmento máx': round(max(tiempos_fragmento), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del modo en vivo del dashboard')
+    parser.add_argument('--tasas', type=int, nargs='+', default=[100, 1_000, 10_000])
+    parser.add_argument('--segundos', type=float, default=5)
+    parser.add_argument('--refresco', type=float, default=1.0)
+    parser.add_argument('--intervalo', type=float, default=INTERVALO)
+    args = parser.parse_args()
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as directorio:
+        for tasa in args.tasas:
+            ruta = os.path.join(directorio, f'ventas_{tasa}.jsonl')
+            resultados.append(medir(ruta, tasa, args.segundos, args.refresco, args.intervalo))
+
+    print(f"Refresco del fragmento: {args.refresco} s | lectura del archivo cada {args.intervalo} s")
+    print(pd.DataFrame(resultados).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+# ====================================
+# BENCHMARK: RE-EJECUCIÓN COMPLETA VS FRAGMENTO
+# ====================================
+# Mide cuánto tarda en responder la app al tocar un widget:
+#   - antes: el widget re-ejecuta el script entero (lo que pasaba sin
+#     fragmentos, y lo que sigue pasando con los filtros del sidebar)
+#   - después: el widget está dentro de un @st.fragment y solo se
+#     re-ejecuta esa función
+#
+# Uso (desde la carpeta del proyecto):
+#     python benchmarks/bench_fragmentos.py
+#     python benchmarks/bench_fragmentos.py --repeticiones 20
+#
+# Las apps se ejecutan sin servidor con streamlit.testing (AppTest). AppTest
+# siempre re-ejecuta el script entero, así que para el caso "después" se le
+# pide al ScriptRunner la misma re-ejecución de un fragmento que pediría el
+# navegador. El tiempo se mide desde la petición hasta que termina la
+# ejecución (sin la preparación de AppTest) y se cuentan los elementos y
+# bytes enviados al navegador.
+
+import argparse
+import os
+import sys
+import time
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from streamlit.runtime.scriptrunner_utils.script_requests import RerunData, ScriptRequests
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1 import app_test as modulo_app_test
+from streamlit.testing.v1.element_tree import parse_tree_from_messages
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner, require_widgets_deltas
+
+CARPETA = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (app, tipo de widget, etiqueta, valores que se alternan, clave del fragmento)
+CASOS = [
+    ('app_04_layout.py', 'slider', 'Cantidad de datos a mostrar:', [10, 40], 'ejemplo_completo'),
+    ('app_06_dashboard.py', 'checkbox', 'Mostrar datos completos', [False, True], 'tabla_detalle'),
+    ('app_06_dashboard.py', 'number_input', 'Página:', [2, 1], 'tabla_detalle'),
+]
+
+
+class EjecutorMedido(LocalScriptRunner):
+    """LocalScriptRunner que mide cada ejecución y puede re-ejecutar solo un fragmento"""
+
+    fragmento = None   # id del fragmento a re-ejecutar (None = script entero)
+    ultima = {}        # medidas de la última ejecución
+
+    def run(self, widget_state=None, query_params=None, timeout=3, page_hash=""):
+        inicio = time.perf_counter()
+        if EjecutorMedido.fragmento is None:
+            arbol = super().run(widget_state, query_params, timeout, page_hash)
+        else:
+            # Lo mismo que envía el navegador al tocar un widget de un fragmento.
+            # LocalScriptRunner ya trae pedida una ejecución completa: se descarta.
+            self._requests = ScriptRequests()
+            self.request_rerun(RerunData(widget_states=widget_state, page_script_hash=page_hash,
+                                         fragment_id=EjecutorMedido.fragmento))
+            try:
+                self.start()
+                require_widgets_deltas(self, timeout)
+            finally:
+                self.join()
+            arbol = parse_tree_from_messages(self.forward_msgs())
+        deltas = [m for m in self.forward_msgs() if m.WhichOneof('type') == 'delta']
+        EjecutorMedido.ultima = {
+            'ms': (time.perf_counter() - inicio) * 1000,
+            'elementos': len(deltas),
+            'bytes': sum(m.ByteSize() for m in deltas),
+        }
+        return arbol
+
+
+def widget(at, tipo, etiqueta):
+    """Busca un widget por tipo y etiqueta (en la página o en el sidebar)"""
+    return next(w for w in getattr(at, tipo) if w.label == etiqueta)
+
+
+def ejecutar(at, fragmento=None):
+    """Ejecuta la app (entera o solo un fragmento) y devuelve las medidas"""
+    EjecutorMedido.fragmento = fragmento
+    try:
+        at.run()
+    finally:
+        EjecutorMedido.fragmento = None
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    return EjecutorMedido.ultima
+
+
+def medir(app, tipo, etiqueta, valores, clave, repeticiones):
+    """Mediana de las re-ejecuciones completas y de fragmento al cambiar un widget"""
+    at = AppTest.from_file(os.path.join(CARPETA, app), default_timeout=120)
+    ejecutar(at)  # primera ejecución: rellena las cachés
+    (id_fragmento,) = at._fragment_storage._ids_by_target_key[clave]
+
+    completas, fragmentos = [], []
+    for i in range(repeticiones):
+        valor = valores[i % len(valores)]
+        # Antes: el cambio del widget re-ejecuta el script entero
+        widget(at, tipo, etiqueta).set_value(valor)
+        completas.append(ejecutar(at))
+        # Después: el mismo cambio re-ejecuta solo el fragmento
+        # (primero se vuelve al valor anterior con una ejecución completa,
+        # para que el árbol de elementos esté entero y el cambio sea el mismo)
+        widget(at, tipo, etiqueta).set_value(valores[(i - 1) % len(valores)])
+        ejecutar(at)
+        widget(at, tipo, etiqueta).set_value(valor)
+        fragmentos.append(ejecutar(at, fragmento=id_fragmento))
+
+    def mediana(medidas, campo):
+        return float(np.median([m[campo] for m in medidas]))
+
+    antes, despues = mediana(completas, 'ms'), mediana(fragmentos, 'ms')
+    return {
+        'app': app,
+        'widget': etiqueta,
+        'ms antes': round(antes, 1),
+        'ms después': round(despues, 1),
+        'aceleración': f"{antes / despues:.1f}x",
+        'elementos antes': int(mediana(completas, 'elementos')),
+        'elementos después': int(mediana(fragmentos, 'elementos')),
+        'KB antes': round(mediana(completas, 'bytes') / 1024, 1),
+        'KB después': round(mediana(fragmentos, 'bytes') / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de re-ejecuciones con fragmentos')
+    parser.add_argument('--repeticiones', type=int, default=10)
+    args = parser.parse_args()
+
+    # Las apps importan los módulos del proyecto con rutas relativas
+    sys.path.insert(0, CARPETA)
+    os.chdir(CARPETA)
+
+    resultados = []
+    with mock.patch.object(modulo_app_test, 'LocalScriptRunner', EjecutorMedido):
+        for app, tipo, etiqueta, valores, clave in CASOS:
+            resultados.append(medir(app, tipo, etiqueta, valores, clave, args.repeticiones))
+
+    print(f"Mediana de {args.repeticiones} re-ejecuciones por caso")
+    print(pd.DataFrame(resultados).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+# ====================================
+# BENCHMARK: EJECUCIÓN DE APP_05 CON LISTAS DE TAREAS GRANDES
+# ====================================
+# Mide cuánto tarda una ejecución de app_05_estado.py y cuántos elementos
+# envía al navegador según el número de tareas de la lista (10 a 100 000).
+#
+# Con un st.write() por tarea, el tiempo y los elementos crecen con la
+# lista; con la tabla paginada y lista_tareas.ListaTareas deberían quedarse
+# planos.
+#
+# Uso (desde la carpeta del proyecto):
+#     python benchmarks/bench_lista_tareas.py
+#     python benchmarks/bench_lista_tareas.py --tareas 10 1000 10000 --referencia HEAD~1
+#
+# Las tareas se cargan como si el servidor se hubiera reiniciado: se
+# escriben en el diario de persistencia_estado.py y la app las recupera en
+# su primera ejecución (que no se mide). Después se mide, para cada caso,
+# la mediana de varias ejecuciones tras pulsar "Incrementar" (una
+# interacción que no toca la lista) y tras agregar una tarea.
+# Con --referencia se mide también la versión de la app de ese commit.
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1 import app_test as modulo_app_test
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+CARPETA = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = 'app_05_estado.py'
+
+
+class EjecutorMedido(LocalScriptRunner):
+    """LocalScriptRunner que mide cada ejecución y los elementos enviados"""
+
+    ultima = {}
+
+    def run(self, widget_state=None, query_params=None, timeout=3, page_hash=""):
+        inicio = time.perf_counter()
+        arbol = super().run(widget_state, query_params, timeout, page_hash)
+        deltas = [m for m in self.forward_msgs() if m.WhichOneof('type') == 'delta']
+        EjecutorMedido.ultima = {
+            'ms': (time.perf_counter() - inicio) * 1000,
+            'elementos': len(deltas),
+            'KB': sum(m.ByteSize() for m in deltas) / 1024,
+        }
+        return arbol
+
+
+def guardar_tareas(usuario, n_tareas):
+    """Escribe n_tareas en el diario, en el formato de las dos versiones de la app"""
+    from persistencia_estado import DiarioEstado
+
+    textos = [f"Tarea número {i}: revisar el informe de ventas" for i in range(1, n_tareas + 1)]
+    diario = DiarioEstado()
+    diario.fijar(usuario, 'tareas', textos)                                   # lista
+    diario.fijar(usuario, 'lista_tareas', dict(enumerate(textos, start=1)))  # {id: texto}
+    diario.cerrar()
+
+
+def ejecutar(at):
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    return EjecutorMedido.ultima
+
+
+def medir(ruta, usuario, n_tareas, repeticiones):
+    # AppTest usa siempre el mismo id de sesión: sin vaciar las cachés, la
+    # app vería las tareas del caso anterior en estado_sesion.AlmacenEstado
+    st.cache_resource.clear()
+    guardar_tareas(usuario, n_tareas)
+    at = AppTest.from_file(ruta, default_timeout=300)
+    at.query_params['usuario'] = usuario
+    ejecutar(at)
+
+    resultados = []
+    for interaccion in ('incrementar', 'agregar tarea'):
+        medidas = []
+        for i in range(repeticiones):
+            if interaccion == 'incrementar':
+                next(b for b in at.button if b.label == '➕ Incrementar').click()
+            else:
+                next(t for t in at.text_input if t.label == "Escribe una tarea:").set_value(f"Nueva {i}")
+                next(b for b in at.button if b.label == '➕ Agregar tarea').click()
+            medidas.append(ejecutar(at))
+        resultados.append({'tareas': n_tareas, 'interacción': interaccion,
+                           **{campo: float(np.median([m[campo] for m in medidas]))
+                              for campo in ('ms', 'elementos', 'KB')}})
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de app_05 con listas de tareas grandes')
+    parser.add_argument('--tareas', type=int, nargs='+', default=[10, 1_000, 10_000, 100_000])
+    parser.add_argument('--referencia', help='commit de git con la versión anterior de la app')
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    sys.path.insert(0, CARPETA)
+    os.chdir(CARPETA)
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as directorio:
+        # El estado guardado por la app va a una carpeta temporal; cada caso
+        # usa su propio usuario (ver persistencia_estado.py)
+        os.environ['ESTADO_DIRECTORIO'] = directorio
+        versiones = [('actual', os.path.join(CARPETA, APP))]
+        if args.referencia:
+            ruta = os.path.join(directorio, f'anterior_{APP}')
+            with open(ruta, 'w') as f:
+                f.write(subprocess.run(['git', 'show', f'{args.referencia}:{APP}'], check=True,
+                                       capture_output=True, text=True).stdout)
+            versiones.insert(0, (args.referencia, ruta))
+
+        with mock.patch.object(modulo_app_test, 'LocalScriptRunner', EjecutorMedido):
+            for version, ruta in versiones:
+                for n_tareas in args.tareas:
+                    # Con el formato de los identificadores de la URL (ver id_persistente)
+                    usuario = uuid.uuid5(uuid.NAMESPACE_URL, f"benchmark_{version}_{n_tareas}").hex
+                    resultados += [{'versión': version, **fila}
+                                   for fila in medir(ruta, usuario, n_tareas, args.repeticiones)]
+
+    print(f"Mediana de {args.repeticiones} ejecuciones por caso")
+    print(pd.DataFrame(resultados).round(1).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+# ====================================
+# BENCHMARK: PANDAS FRENTE A SQL EMBEBIDO
+# ====================================
+# Compara el tiempo de las consultas del dashboard (filtrar, KPIs, ventas
+# por producto y región, describe y una página de detalle) hechas con
+# pandas sobre el DataFrame en memoria frente a SQLite y DuckDB.
+#
+# Uso (desde la carpeta del proyecto):
+#     python benchmarks/bench_motor_sql.py
+#     python benchmarks/bench_motor_sql.py --filas 1000000 10000000 100000000
+#
+# Las filas se generan y se cargan por bloques, así que la carga en SQL no
+# necesita tener todas las ventas en memoria. Con 100 millones de filas la
+# columna de pandas se omite con --sin-pandas (necesitaría varios GB de RAM).
+# El tiempo de carga se muestra aparte: se paga una vez, no en cada ejecución.
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datos_ventas import generar_ventas, generar_ventas_por_bloques  # noqa: E402
+from motor_sql import MotorSQL, motor_disponible  # noqa: E402
+from tabla_paginada import pagina_ordenada  # noqa: E402
+
+# Selección de ejemplo en el sidebar (tres productos y dos regiones)
+PRODUCTOS = ['Laptop', 'Mouse', 'Monitor']
+REGIONES = ['Norte', 'Sur']
+
+
+def cronometrar(funcion, repeticiones=3):
+    """Mejor tiempo (en ms) de varias ejecuciones"""
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor * 1000
+
+
+def consultas_pandas(df):
+    """Lo que hacía el dashboard con pandas: máscara .isin() y groupby"""
+    mascara = df['Producto'].isin(PRODUCTOS) & df['Región'].isin(REGIONES)
+    filtrado = df[mascara]
+    filtrado['Total'].sum()
+    filtrado.groupby('Producto', observed=True)['Total'].sum()
+    filtrado.groupby('Región', observed=True)['Total'].sum()
+    filtrado[['Cantidad', 'Precio', 'Total']].describe()
+    pagina_ordenada(filtrado, 'Total', 1, 50)
+
+
+def consultas_sql(motor):
+    """Las mismas consultas en el motor SQL"""
+    motor.kpis(PRODUCTOS, REGIONES)
+    motor.ventas_por('Producto', PRODUCTOS, REGIONES)
+    motor.ventas_por('Región', PRODUCTOS, REGIONES)
+    motor.describe(PRODUCTOS, REGIONES)
+    motor.pagina(1, 50, PRODUCTOS, REGIONES)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de pandas frente a SQLite/DuckDB')
+    parser.add_argument('--filas', type=int, nargs='+', default=[1_000_000, 10_000_000])
+    parser.add_argument('--motores', nargs='+', default=sorted({'sqlite', motor_disponible()}))
+    parser.add_argument('--sin-pandas', action='store_true',
+                        help='no medir pandas (para tamaños que no caben en memoria)')
+    args = parser.parse_args()
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as directorio:
+        for n in args.filas:
+            if not args.sin_pandas:
+                df = generar_ventas(n)
+                resultados.append({
+                    'filas': n, 'motor': 'pandas', 's carga': 0.0,
+                    'ms consultas': round(cronometrar(lambda: consultas_pandas(df)), 1),
+                })
+                del df
+            for nombre in args.motores:
+                motor = MotorSQL(os.path.join(directorio, f'{nombre}_{n}.db'), motor=nombre)
+                inicio = time.perf_counter()
+                motor.cargar(generar_ventas_por_bloques(n))
+                segundos_carga = time.perf_counter() - inicio
+                resultados.append({
+                    'filas': n, 'motor': nombre, 's carga': round(segundos_carga, 1),
+                    'ms consultas': round(cronometrar(lambda: consultas_sql(motor)), 1),
+                })
+                motor.cerrar()
+
+    print(pd.DataFrame(resultados).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
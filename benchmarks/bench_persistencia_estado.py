@@ -0,0 +1,126 @@
+# ====================================
+# BENCHMARK: GUARDAR EL ESTADO EN DISCO SIN FRENAR LA APP
+# ====================================
+# Compara dos formas de guardar en disco cada cambio del estado de
+# app_05_estado.py (incrementar el contador, agregar una tarea):
+#   - síncrona: una transacción de SQLite por cambio, dentro de la
+#     re-ejecución (la app espera a que termine)
+#   - diferida: persistencia_estado.DiarioEstado; la re-ejecución solo anota
+#     el cambio y un hilo lo escribe por lotes
+#
+# También mide cuánto tarda en recuperarse el estado de un usuario al
+# arrancar de nuevo el servidor, con el diario sin compactar y compactado.
+#
+# Uso (desde la carpeta del proyecto):
+#     python benchmarks/bench_persistencia_estado.py
+#     python benchmarks/bench_persistencia_estado.py --usuarios 1000 --cambios 20
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from persistencia_estado import DiarioEstado  # noqa: E402
+
+
+def cambios(n_usuarios, n_cambios):
+    """Cambios intercalados de varios usuarios: (usuario, operación, clave, dato)"""
+    for i in range(n_cambios):
+        for u in range(n_usuarios):
+            if i % 2:
+                yield f"u{u}", 'agregar', 'tareas', f"Tarea {i}"
+            else:
+                yield f"u{u}", 'fijar', 'contador', i
+
+
+def medir_sincrona(ruta, lista_cambios):
+    """ms por cambio con una transacción por cambio (la forma ingenua)"""
+    conexion = sqlite3.connect(ruta)
+    conexion.execute('PRAGMA journal_mode=WAL')
+    conexion.execute('CREATE TABLE diario (usuario TEXT, clave TEXT, operacion TEXT, dato TEXT)')
+    tiempos = []
+    for usuario, operacion, clave, dato in lista_cambios:
+        inicio = time.perf_counter()
+        with conexion:
+            conexion.execute('INSERT INTO diario VALUES (?, ?, ?, ?)',
+                             (usuario, clave, operacion, json.dumps(dato)))
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    conexion.close()
+    return tiempos
+
+
+def medir_diferida(ruta, lista_cambios):
+    """ms por cambio con DiarioEstado (lo que espera la re-ejecución)"""
+    diario = DiarioEstado(ruta=ruta, operaciones_compactacion=float('inf'),
+                          intervalo_compactacion=float('inf'))
+    tiempos = []
+    for usuario, operacion, clave, dato in lista_cambios:
+        inicio = time.perf_counter()
+        getattr(diario, operacion)(usuario, clave, dato)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    diario.vaciar()
+    lotes = diario.estadisticas()['lotes']
+    # Se cierra sin compactar, como si el servidor se hubiera caído
+    diario._cerrado = True
+    with diario._condicion:
+        diario._condicion.notify_all()
+    diario._hilo.join()
+    diario._conexion.close()
+    diario._lectura.close()
+    return tiempos, lotes
+
+
+def medir_carga(ruta, n_usuarios, repeticiones=50):
+    """ms en recuperar el estado de un usuario al arrancar"""
+    diario = DiarioEstado(ruta=ruta)
+    tiempos = []
+    for i in range(repeticiones):
+        inicio = time.perf_counter()
+        diario.cargar(f"u{i % n_usuarios}")
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    diario.compactar()
+    compactado = []
+    for i in range(repeticiones):
+        inicio = time.perf_counter()
+        diario.cargar(f"u{i % n_usuarios}")
+        compactado.append((time.perf_counter() - inicio) * 1000)
+    diario.cerrar()
+    return tiempos, compactado
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de persistencia del estado de sesión')
+    parser.add_argument('--usuarios', type=int, default=200)
+    parser.add_argument('--cambios', type=int, default=10, help='cambios por usuario')
+    args = parser.parse_args()
+
+    lista_cambios = list(cambios(args.usuarios, args.cambios))
+    with tempfile.TemporaryDirectory() as directorio:
+        sincrona = medir_sincrona(os.path.join(directorio, 'sincrona.db'), lista_cambios)
+        ruta = os.path.join(directorio, 'diferida.db')
+        diferida, lotes = medir_diferida(ruta, lista_cambios)
+        carga, carga_compactada = medir_carga(ruta, args.usuarios)
+
+    def fila(nombre, tiempos, **extra):
+        return {'medida': nombre, 'ms mediana': round(float(np.median(tiempos)), 4),
+                'ms p99': round(float(np.percentile(tiempos, 99)), 4), **extra}
+
+    print(f"{len(lista_cambios)} cambios de {args.usuarios} usuarios")
+    print(pd.DataFrame([
+        fila('cambio, síncrona', sincrona, transacciones=len(sincrona)),
+        fila('cambio, diferida', diferida, transacciones=lotes),
+        fila('cargar usuario, diario sin compactar', carga),
+        fila('cargar usuario, compactado', carga_compactada),
+    ]).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
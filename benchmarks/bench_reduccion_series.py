@@ -0,0 +1,88 @@
+# ====================================
+# BENCHMARK: REDUCCIÓN DE SERIES PARA GRÁFICOS
+# ====================================
+# Compara el tamaño del mensaje y el tiempo de st.line_chart() con la serie
+# completa frente a la serie reducida (minmax y LTTB) para varios tamaños.
+#
+# Uso (desde la carpeta del proyecto):
+#     python benchmarks/bench_reduccion_series.py
+#     python benchmarks/bench_reduccion_series.py --filas 1000 100000 1000000
+#
+# El tamaño del mensaje se mide serializando los datos a Arrow IPC, que es
+# el formato en el que Streamlit envía los DataFrames al navegador.
+# El tiempo de st.line_chart() se mide en modo "bare" (sin servidor):
+# incluye preparar los datos y serializarlos, no el dibujo en el navegador,
+# que crece todavía más con el número de puntos.
+
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reduccion_series import MAX_PUNTOS, reducir_serie  # noqa: E402
+
+
+def bytes_arrow(df):
+    """Bytes del DataFrame serializado como Arrow IPC (como lo envía Streamlit)"""
+    tabla = pa.Table.from_pandas(df)
+    sumidero = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sumidero, tabla.schema) as escritor:
+        escritor.write_table(tabla)
+    return sumidero.getvalue().size
+
+
+def cronometrar(funcion, repeticiones=3):
+    """Mejor tiempo (en ms) de varias ejecuciones"""
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de reducción de series para st.line_chart()')
+    parser.add_argument('--filas', type=int, nargs='+',
+                        default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument('--puntos', type=int, default=MAX_PUNTOS)
+    args = parser.parse_args()
+
+    import streamlit as st
+    warnings.filterwarnings('ignore')
+
+    # Primera llamada para que la carga inicial de Streamlit no cuente en el tiempo
+    st.line_chart(pd.DataFrame({'Y': [0.0, 1.0]}))
+
+    rng = np.random.default_rng(0)
+    resultados = []
+    for n in args.filas:
+        datos = pd.DataFrame({'Y': np.cumsum(rng.standard_normal(n))})
+        for metodo in ['completa', 'minmax', 'lttb']:
+            if metodo == 'completa':
+                ms_reducir, reducida = 0.0, datos
+            else:
+                ms_reducir = cronometrar(lambda: reducir_serie(datos, args.puntos, metodo))
+                reducida = reducir_serie(datos, args.puntos, metodo)
+            ms_grafico = cronometrar(lambda: st.line_chart(reducida))
+            resultados.append({
+                'filas': n,
+                'método': metodo,
+                'puntos enviados': len(reducida),
+                'KB enviados': round(bytes_arrow(reducida) / 1024, 1),
+                'ms reducir': round(ms_reducir, 2),
+                'ms line_chart': round(ms_grafico, 2),
+            })
+
+    print(pd.DataFrame(resultados).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
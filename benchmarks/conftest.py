@@ -0,0 +1,57 @@
+# ====================================
+# CONFIGURACIÓN DE LA SUITE DE BENCHMARKS
+# ====================================
+# Escalas de datos y datos compartidos por suite_rutas_calientes.py.
+#
+# Cada benchmark que recibe 'n_filas' se ejecuta una vez por escala.
+# Los datos de cada escala se generan una sola vez (fixtures de sesión) y
+# pytest agrupa los benchmarks por escala, así que solo hay una escala en
+# memoria a la vez.
+
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agregacion_paralela import AgregadorParalelo  # noqa: E402
+from datos_ventas import generar_ventas  # noqa: E402
+
+# Número de filas de cada escala (10², 10⁴, 10⁶ y 10⁷)
+ESCALAS = [10**2, 10**4, 10**6, 10**7]
+
+
+def pytest_addoption(parser):
+    parser.addoption('--escalas', default=','.join(str(n) for n in ESCALAS),
+                     help='filas de cada escala separadas por comas (por ejemplo 100,10000)')
+
+
+def pytest_generate_tests(metafunc):
+    if 'n_filas' in metafunc.fixturenames:
+        escalas = [int(float(n)) for n in metafunc.config.getoption('escalas').split(',')]
+        metafunc.parametrize('n_filas', escalas, ids=[f'{n}_filas' for n in escalas],
+                             scope='session')
+
+
+@pytest.fixture(scope='session')
+def ventas(n_filas):
+    """DataFrame de ventas con n_filas filas (como generar_datos() del dashboard)"""
+    return generar_ventas(n_filas=n_filas, semilla=42)
+
+
+@pytest.fixture(scope='session')
+def csv_ventas(ventas):
+    """Las mismas ventas como los bytes de un CSV subido con st.file_uploader()"""
+    buffer = io.BytesIO()
+    ventas.to_csv(buffer, index=False)
+    return buffer.getvalue()
+
+
+@pytest.fixture(scope='session')
+def agregador():
+    """Agregador paralelo del dashboard (sus hilos se crean una sola vez)"""
+    agregador = AgregadorParalelo()
+    yield agregador
+    agregador.cerrar()
@@ -0,0 +1,114 @@
+# ====================================
+# SUITE DE BENCHMARKS: RUTAS CALIENTES DE LOS DATOS
+# ====================================
+# Mide con pytest-benchmark la lógica de datos que ejecutan las apps en
+# cada interacción, a varias escalas (10², 10⁴, 10⁶ y 10⁷ filas):
+#   - generar_datos() del dashboard (datos_ventas.generar_ventas)
+#   - la máscara .isin() de los filtros (datos_ventas.mascara_filtros)
+#   - los groupby: el cubo Producto × Región y las ventas por dimensión
+#   - la ordenación de la tabla de detalle (tabla_paginada.pagina_ordenada)
+#   - describe() de la tabla de detalle (agregacion_paralela)
+#   - la lectura de un CSV subido en app_03_datos.py (ingesta_csv)
+#
+# Requiere pytest-benchmark (pip install pytest-benchmark).
+#
+# Uso (desde la carpeta del proyecto):
+#     pytest benchmarks                              # todas las escalas
+#     pytest benchmarks --escalas 100,10000          # solo las pequeñas
+#     pytest benchmarks -k cubo                      # solo algunos benchmarks
+#
+# Cada ejecución se guarda en benchmarks/.resultados (ver pytest.ini).
+# Para comparar con la última ejecución guardada y fallar si algo se ha
+# vuelto más de un 20 % más lento:
+#     pytest benchmarks --benchmark-compare --benchmark-compare-fail=median:20%
+# Con --benchmark-compare=0001 se compara con una ejecución concreta (la
+# línea base) en lugar de con la última.
+
+import io
+
+import pytest
+
+from cubo_ventas import construir_cubo, ventas_por
+from datos_ventas import MEDIDAS, PRODUCTOS, REGIONES, filtrar_ventas, generar_ventas, mascara_filtros
+from ingesta_csv import IngestaIncremental, leer_csv_por_bloques, olfatear_csv
+from tabla_paginada import pagina_ordenada
+
+# A partir de estas filas cada ronda tarda segundos: se hacen pocas rondas
+FILAS_POCAS_RONDAS = 10**6
+RONDAS_ESCALA_GRANDE = 3
+
+# Selección de filtros típica: 3 de 5 productos y 2 de 4 regiones
+PRODUCTOS_FILTRO = PRODUCTOS[:3]
+REGIONES_FILTRO = REGIONES[:2]
+
+# Tamaño de página por defecto de la tabla de detalle
+TAM_PAGINA = 50
+
+
+def medir(benchmark, n_filas, funcion, *args, **kwargs):
+    """Mide funcion(*args, **kwargs); con escalas grandes fija pocas rondas"""
+    if n_filas >= FILAS_POCAS_RONDAS:
+        return benchmark.pedantic(funcion, args, kwargs, rounds=RONDAS_ESCALA_GRANDE,
+                                  iterations=1)
+    return benchmark(funcion, *args, **kwargs)
+
+
+def procesar_csv(datos):
+    """Lo que hace app_03_datos.py con un CSV subido: olfatear y leer por bloques"""
+    archivo = io.BytesIO(datos)
+    perfil = olfatear_csv(archivo)
+    ingesta = IngestaIncremental()
+    for bloque in leer_csv_por_bloques(archivo, perfil=perfil):
+        ingesta.actualizar(bloque)
+    return ingesta
+
+
+@pytest.mark.benchmark(group='generar_datos')
+def bench_generar_datos(benchmark, n_filas):
+    df = medir(benchmark, n_filas, generar_ventas, n_filas, semilla=42)
+    assert len(df) == n_filas
+
+
+@pytest.mark.benchmark(group='filtro_isin')
+def bench_mascara_filtros(benchmark, n_filas, ventas):
+    mascara = medir(benchmark, n_filas, mascara_filtros, ventas, PRODUCTOS_FILTRO, REGIONES_FILTRO)
+    assert len(mascara) == n_filas
+
+
+@pytest.mark.benchmark(group='filtro_filas')
+def bench_filtrar_ventas(benchmark, n_filas, ventas):
+    filtrado = medir(benchmark, n_filas, filtrar_ventas, ventas, PRODUCTOS_FILTRO, REGIONES_FILTRO)
+    assert len(filtrado) <= n_filas
+
+
+@pytest.mark.benchmark(group='groupby_cubo')
+def bench_construir_cubo(benchmark, n_filas, ventas):
+    cubo = medir(benchmark, n_filas, construir_cubo, ventas)
+    assert cubo['Filas'].sum() == n_filas
+
+
+@pytest.mark.benchmark(group='groupby_dimension')
+def bench_ventas_por_producto(benchmark, n_filas, ventas):
+    # Sobre el cubo ya construido: no debería depender del número de filas
+    cubo = construir_cubo(ventas)
+    serie = medir(benchmark, n_filas, ventas_por, cubo, 'Producto')
+    assert serie.sum() == ventas['Total'].sum()
+
+
+@pytest.mark.benchmark(group='orden_tabla')
+def bench_pagina_ordenada(benchmark, n_filas, ventas):
+    pagina = medir(benchmark, n_filas, pagina_ordenada, ventas, 'Total', 1, TAM_PAGINA,
+                   ascendente=False)
+    assert len(pagina) == min(TAM_PAGINA, n_filas)
+
+
+@pytest.mark.benchmark(group='describe')
+def bench_describe(benchmark, n_filas, ventas, agregador):
+    resumen = medir(benchmark, n_filas, agregador.describe, ventas, MEDIDAS)
+    assert resumen.loc['count', 'Total'] == n_filas
+
+
+@pytest.mark.benchmark(group='leer_csv')
+def bench_leer_csv(benchmark, n_filas, csv_ventas):
+    ingesta = medir(benchmark, n_filas, procesar_csv, csv_ventas)
+    assert ingesta.filas == n_filas
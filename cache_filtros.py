@@ -0,0 +1,152 @@
+# ====================================
+# CACHÉ LRU DE RESULTADOS FILTRADOS
+# ====================================
+# Conceptos: memoización, caché LRU, OrderedDict, claves normalizadas
+
+# Streamlit vuelve a ejecutar el script con cualquier interacción, aunque
+# el widget que cambió no tenga nada que ver con los filtros (un checkbox,
+# cambiar de pestaña...). Sin caché, el DataFrame filtrado se recalcula
+# cada vez.
+#
+# Esta caché guarda los resultados ya calculados para cada combinación de
+# filtros. La clave se normaliza (selecciones ordenadas) para que elegir
+# ['Sur', 'Norte'] o ['Norte', 'Sur'] sea la misma entrada. Volver a una
+# combinación anterior cuesta solo una búsqueda en un diccionario.
+#
+# LRU ("Least Recently Used"): cuando la caché está llena se descarta la
+# entrada que lleva más tiempo sin usarse, así la memoria está acotada.
+#
+# Contar entradas no basta: con filtros amplios, una entrada puede llevar
+# casi todas las filas del conjunto de datos. Con max_bytes la caché
+# también se acota por tamaño, medido con tamano_memoria.tamano_valor()
+# (memory_usage(deep=True) en los DataFrames).
+
+import threading
+from collections import OrderedDict
+
+from tamano_memoria import tamano_valor
+
+
+def clave_filtros(version, productos, regiones):
+    """Construye la clave normalizada de una combinación de filtros
+
+    version identifica el conjunto de datos: si los datos cambian, la
+    versión cambia y las entradas antiguas dejan de coincidir.
+    Las selecciones se ordenan para que el orden de clic no importe.
+    """
+    return (version, tuple(sorted(productos)), tuple(sorted(regiones)))
+
+
+class CacheLRU:
+    """Caché LRU acotada por número de entradas (y opcionalmente por bytes)
+
+    Es segura entre hilos: Streamlit atiende cada sesión en un hilo, y
+    con st.cache_resource todas las sesiones comparten la misma instancia.
+    Los valores guardados se comparten entre sesiones, así que no deben
+    modificarse después de guardarlos.
+
+    Con max_bytes, los valores se miden al guardarlos y se descartan los
+    menos usados hasta que el total cabe; un valor que por sí solo supera
+    max_bytes no se guarda.
+    """
+
+    def __init__(self, max_entradas=32, max_bytes=None):
+        if max_entradas <= 0:
+            raise ValueError("max_entradas debe ser mayor que 0")
+        if max_bytes is not None and max_bytes <= 0:
+            raise ValueError("max_bytes debe ser mayor que 0")
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self._entradas = OrderedDict()
+        self._bytes = {}      # clave -> bytes del valor (solo con max_bytes)
+        self.bytes = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def __contains__(self, clave):
+        with self._lock:
+            return clave in self._entradas
+
+    def obtener(self, clave, por_defecto=None):
+        """Devuelve el valor guardado y lo marca como usado recientemente"""
+        with self._lock:
+            if clave in self._entradas:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return self._entradas[clave]
+            self.fallos += 1
+            return por_defecto
+
+    def guardar(self, clave, valor):
+        """Guarda un valor y descarta las entradas más antiguas si sobra alguna"""
+        # Medir un DataFrame grande lleva su tiempo: se hace fuera del lock
+        tamano = tamano_valor(valor) if self.max_bytes is not None else 0
+        with self._lock:
+            self._quitar(clave)
+            self._entradas[clave] = valor
+            self._bytes[clave] = tamano
+            self.bytes += tamano
+            while self._entradas and (
+                    len(self._entradas) > self.max_entradas
+                    or (self.max_bytes is not None and self.bytes > self.max_bytes)):
+                self._quitar(next(iter(self._entradas)))
+                self.desalojos += 1
+
+    def _quitar(self, clave):
+        """Elimina una entrada y descuenta sus bytes (con el lock tomado)"""
+        self._entradas.pop(clave, None)
+        self.bytes -= self._bytes.pop(clave, 0)
+
+    def obtener_o_calcular(self, clave, calcular):
+        """Devuelve el valor de la caché o lo calcula con calcular() y lo guarda
+
+        El cálculo se hace fuera del lock para no bloquear a otras sesiones;
+        si dos sesiones calculan la misma clave a la vez, gana la última.
+        """
+        with self._lock:
+            if clave in self._entradas:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return self._entradas[clave]
+            self.fallos += 1
+
+        valor = calcular()
+        self.guardar(clave, valor)
+        return valor
+
+    def invalidar_clave(self, clave):
+        """Elimina una sola entrada si existe"""
+        with self._lock:
+            self._quitar(clave)
+
+    def invalidar(self, version=None):
+        """Vacía la caché, o solo las entradas de una versión de datos"""
+        with self._lock:
+            if version is None:
+                self._entradas.clear()
+                self._bytes.clear()
+                self.bytes = 0
+            else:
+                for clave in [c for c in self._entradas if c[0] == version]:
+                    self._quitar(clave)
+
+    def estadisticas(self):
+        """Devuelve un diccionario con los contadores de la caché"""
+        # Con el lock, todos los contadores son de la misma foto de la caché
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'entradas': len(self._entradas),
+                'max_entradas': self.max_entradas,
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'desalojos': self.desalojos,
+                'tasa_aciertos': self.aciertos / consultas if consultas else 0.0,
+            }
@@ -0,0 +1,254 @@
+# ====================================
+# CACHÉ DE ARCHIVOS SUBIDOS
+# ====================================
+# Conceptos: hash de contenido, caché en dos niveles (memoria + disco),
+#            Parquet, límite de tamaño
+
+# Mientras un archivo sigue subido, cada interacción vuelve a ejecutar el
+# script y el CSV se volvería a leer desde cero. Además, si el usuario
+# sube el mismo archivo otro día, también se leería otra vez.
+#
+# Esta caché identifica cada archivo por un hash de su contenido (no por
+# su nombre): mismo contenido = misma clave. Guarda el resultado de la
+# ingesta (vista previa, estadísticas, serie del gráfico) en dos niveles:
+#   1. Memoria: una caché LRU pequeña (ver cache_filtros.py), acceso inmediato.
+#   2. Disco: los datos en Parquet y el resumen en un archivo pickle.
+#      Sobrevive a reinicios del servidor y tiene un tamaño máximo; cuando
+#      se supera se borran los archivos usados hace más tiempo.
+#
+# Las filas del archivo se consultan desde el Parquet (ver leer_datos()):
+# se leen solo las columnas y los grupos de filas que se van a mostrar, y
+# el CSV no se vuelve a leer nunca.
+
+import hashlib
+import os
+import pickle
+import threading
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pandas as pd
+
+from cache_filtros import CacheLRU
+
+# Carpeta por defecto de la caché en disco
+DIRECTORIO_CACHE = '.cache_ingesta'
+
+# Tamaño máximo de la caché en disco (bytes)
+MAX_BYTES_DISCO = 2 * 1024 ** 3  # 2 GB
+
+# Bytes que se leen de cada vez al calcular el hash
+TAM_LECTURA_HASH = 1024 * 1024
+
+
+def hash_contenido(archivo):
+    """Calcula un hash BLAKE2b del contenido de un archivo subido o una ruta
+
+    Lee el archivo en trozos de 1 MB, así no hace falta tenerlo entero en
+    memoria. Deja el cursor del archivo donde estaba.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    if isinstance(archivo, (str, bytes)) or hasattr(archivo, '__fspath__'):
+        with open(archivo, 'rb') as f:
+            for trozo in iter(lambda: f.read(TAM_LECTURA_HASH), b''):
+                h.update(trozo)
+        return h.hexdigest()
+
+    posicion = archivo.tell()
+    archivo.seek(0)
+    for trozo in iter(lambda: archivo.read(TAM_LECTURA_HASH), b''):
+        h.update(trozo)
+    archivo.seek(posicion)
+    return h.hexdigest()
+
+
+def clave_columnas(clave, columnas):
+    """Clave de la ingesta de solo algunas columnas de un archivo
+
+    Cada selección de columnas es una entrada distinta de la caché: se
+    añade a la clave del contenido un hash corto de los nombres.
+    """
+    h = hashlib.blake2b('\x1f'.join(columnas).encode('utf-8'), digest_size=8)
+    return f'{clave}-{h.hexdigest()}'
+
+
+class EscritorParquet:
+    """Escribe en un Parquet los bloques de un CSV a medida que se leen
+
+    Las columnas 'category' se guardan como texto: cada bloque puede tener
+    categorías distintas y Parquet ya comprime el texto repetido con un
+    diccionario. Se escribe en un archivo temporal que solo se renombra al
+    final, así nunca queda un Parquet a medias en la caché.
+    Si un bloque no encaja con el esquema del primero, se deja de escribir
+    (la ingesta sigue funcionando, solo que ese archivo no se guarda).
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._temporal = ruta + '.tmp'
+        self._escritor = None
+        self.valido = True
+
+    def escribir(self, bloque):
+        """Añade un bloque al Parquet"""
+        if not self.valido:
+            return
+        categoricas = bloque.select_dtypes(include='category').columns
+        bloque = bloque.astype({c: 'str' for c in categoricas})
+        try:
+            if self._escritor is None:
+                tabla = pa.Table.from_pandas(bloque, preserve_index=False)
+                self._escritor = pq.ParquetWriter(self._temporal, tabla.schema)
+            else:
+                tabla = pa.Table.from_pandas(bloque, schema=self._escritor.schema,
+                                             preserve_index=False)
+            self._escritor.write_table(tabla)
+        except (pa.ArrowException, ValueError):
+            self.descartar()
+
+    def cerrar(self):
+        """Cierra el archivo y lo mueve a su ruta definitiva; devuelve si se guardó"""
+        if self._escritor is None or not self.valido:
+            self.descartar()
+            return False
+        self._escritor.close()
+        os.replace(self._temporal, self.ruta)
+        return True
+
+    def descartar(self):
+        """Abandona la escritura y borra el archivo temporal"""
+        self.valido = False
+        if self._escritor is not None:
+            self._escritor.close()
+            self._escritor = None
+        if os.path.exists(self._temporal):
+            os.remove(self._temporal)
+
+
+class CacheIngesta:
+    """Caché de ingestas de CSV con un nivel en memoria y otro en disco
+
+    La clave es el hash del contenido (ver hash_contenido()). El valor es
+    cualquier objeto serializable con pickle, normalmente una
+    IngestaIncremental (ver ingesta_csv.py). Los datos completos, si se
+    escribieron con escritor_datos(), se leen con leer_datos().
+    """
+
+    def __init__(self, directorio=DIRECTORIO_CACHE, max_bytes_disco=MAX_BYTES_DISCO,
+                 max_entradas_memoria=8):
+        self.directorio = directorio
+        self.max_bytes_disco = max_bytes_disco
+        self.memoria = CacheLRU(max_entradas=max_entradas_memoria)
+        self._lock = threading.Lock()
+        self.aciertos_disco = 0
+        os.makedirs(directorio, exist_ok=True)
+
+    def _ruta(self, clave, extension):
+        return os.path.join(self.directorio, f'{clave}.{extension}')
+
+    def ruta_datos(self, clave):
+        """Ruta del Parquet con los datos de una clave"""
+        return self._ruta(clave, 'parquet')
+
+    def obtener(self, clave):
+        """Devuelve el resumen guardado, buscando primero en memoria y luego en disco
+
+        Devuelve None si la clave no está en ningún nivel.
+        """
+        valor = self.memoria.obtener(clave)
+        if valor is not None:
+            return valor
+
+        ruta = self._ruta(clave, 'pkl')
+        try:
+            with open(ruta, 'rb') as f:
+                valor = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+        # Marcar como usado recientemente (para el orden de borrado) y subir a memoria
+        os.utime(ruta)
+        if os.path.exists(self.ruta_datos(clave)):
+            os.utime(self.ruta_datos(clave))
+        with self._lock:
+            self.aciertos_disco += 1
+        self.memoria.guardar(clave, valor)
+        return valor
+
+    def guardar(self, clave, valor):
+        """Guarda un resumen en memoria y en disco, y recorta el disco si hace falta"""
+        self.memoria.guardar(clave, valor)
+        ruta = self._ruta(clave, 'pkl')
+        with open(ruta + '.tmp', 'wb') as f:
+            pickle.dump(valor, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(ruta + '.tmp', ruta)
+        self.recortar_disco()
+
+    def escritor_datos(self, clave):
+        """Devuelve un EscritorParquet para guardar los bloques de una clave"""
+        return EscritorParquet(self.ruta_datos(clave))
+
+    def leer_datos(self, clave, columnas=None, inicio=0, fin=None):
+        """Lee los datos de una clave desde el Parquet (o None si no están)
+
+        columnas limita las columnas leídas: Parquet es columnar, así que
+        solo se leen del disco las columnas pedidas. inicio y fin limitan
+        las filas: cada bloque del CSV es un grupo de filas del Parquet y
+        solo se leen los grupos que tocan el rango [inicio, fin).
+        """
+        try:
+            archivo = pq.ParquetFile(self.ruta_datos(clave))
+        except (OSError, pa.ArrowException):
+            # No se guardó, o recortar_disco() lo acaba de borrar
+            return None
+        with archivo:
+            grupos, primera, fila = [], 0, 0
+            for grupo in range(archivo.num_row_groups):
+                n_filas = archivo.metadata.row_group(grupo).num_rows
+                if fila + n_filas > inicio and (fin is None or fila < fin):
+                    if not grupos:
+                        primera = fila
+                    grupos.append(grupo)
+                fila += n_filas
+            tabla = archivo.read_row_groups(grupos, columns=columnas)
+        largo = None if fin is None else max(fin - inicio, 0)
+        return tabla.slice(max(inicio - primera, 0), largo).to_pandas()
+
+    def bytes_disco(self):
+        """Bytes ocupados por la caché en disco"""
+        return sum(
+            entrada.stat().st_size
+            for entrada in os.scandir(self.directorio)
+            if entrada.is_file()
+        )
+
+    def recortar_disco(self):
+        """Borra las claves usadas hace más tiempo hasta quedar bajo el límite"""
+        with self._lock:
+            claves = {}
+            for entrada in os.scandir(self.directorio):
+                if not entrada.is_file() or entrada.name.endswith('.tmp'):
+                    continue
+                clave = entrada.name.split('.', 1)[0]
+                info = entrada.stat()
+                tamano, usado = claves.get(clave, (0, 0))
+                claves[clave] = (tamano + info.st_size, max(usado, info.st_mtime))
+
+            total = sum(tamano for tamano, _ in claves.values())
+            for clave, (tamano, _) in sorted(claves.items(), key=lambda kv: kv[1][1]):
+                if total <= self.max_bytes_disco:
+                    break
+                for extension in ('pkl', 'parquet'):
+                    ruta = self._ruta(clave, extension)
+                    if os.path.exists(ruta):
+                        os.remove(ruta)
+                self.memoria.invalidar_clave(clave)
+                total -= tamano
+
+    def estadisticas(self):
+        """Contadores de la caché en memoria más los de disco"""
+        stats = self.memoria.estadisticas()
+        stats['aciertos_disco'] = self.aciertos_disco
+        stats['bytes_disco'] = self.bytes_disco()
+        stats['max_bytes_disco'] = self.max_bytes_disco
+        return stats
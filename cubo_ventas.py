@@ -0,0 +1,163 @@
+# ====================================
+# CUBO DE VENTAS PRE-AGREGADO
+# ====================================
+# Conceptos: pre-agregación, groupby con varias claves, MultiIndex
+
+# Cada vez que cambia un filtro, Streamlit vuelve a ejecutar el script.
+# Si en cada ejecución filtramos todas las filas y hacemos varios groupby,
+# el coste crece con el número de ventas (millones de filas = lento).
+#
+# La idea del "cubo" es agregar UNA sola vez por conjunto de datos:
+# una fila por cada combinación Producto × Región con la suma, el número
+# de ventas, el mínimo y el máximo de cada medida. Después, los KPIs, los
+# gráficos y los rankings se calculan sobre el cubo, que tiene como mucho
+# (productos × regiones) filas, sin volver a recorrer la tabla de ventas.
+
+import numpy as np
+import pandas as pd
+
+from datos_ventas import MEDIDAS
+from ranking import top_k
+
+# Dimensiones del cubo (en este orden forman el índice)
+DIMENSIONES_CUBO = ['Producto', 'Región']
+
+# Nombre de la columna con el número de ventas de cada celda
+COLUMNA_FILAS = 'Filas'
+
+
+def construir_cubo(df, medidas=MEDIDAS):
+    """Agrega el DataFrame de ventas en un cubo Producto × Región
+
+    Devuelve un DataFrame con índice (Producto, Región) y columnas
+    '<medida>_suma', '<medida>_min', '<medida>_max' para cada medida,
+    más la columna 'Filas' con el número de ventas de la celda.
+    Las sumas se guardan en int64/float64 para que no se desborden.
+    """
+    agrupado = df.groupby(DIMENSIONES_CUBO, observed=True)
+
+    columnas = {COLUMNA_FILAS: agrupado.size()}
+    for medida in medidas:
+        grupo = agrupado[medida]
+        suma = grupo.sum()
+        columnas[f'{medida}_suma'] = suma.astype('int64' if suma.dtype.kind in 'iu' else 'float64')
+        columnas[f'{medida}_min'] = grupo.min()
+        columnas[f'{medida}_max'] = grupo.max()
+
+    return pd.DataFrame(columnas)
+
+
+def combinar_cubos(cubos):
+    """Une varios cubos (por ejemplo, uno por bloque de datos) en uno solo
+
+    Las sumas y los conteos se suman; el mínimo es el menor de los mínimos
+    y el máximo el mayor de los máximos. Así se puede construir el cubo de
+    un conjunto de datos enorme bloque a bloque, sin cargarlo entero.
+    """
+    cubos = [cubo for cubo in cubos if len(cubo)]
+    if not cubos:
+        return construir_cubo(pd.DataFrame(
+            {c: pd.Series(dtype='object') for c in DIMENSIONES_CUBO} |
+            {m: pd.Series(dtype='int64') for m in MEDIDAS}
+        ))
+    juntos = pd.concat(cubos)
+    operaciones = {
+        columna: 'min' if columna.endswith('_min') else 'max' if columna.endswith('_max') else 'sum'
+        for columna in juntos.columns
+    }
+    return juntos.groupby(level=DIMENSIONES_CUBO, observed=True).agg(operaciones)
+
+
+def actualizar_cubo(cubo, parcial):
+    """Suma al cubo el cubo parcial de un lote de ventas nuevas
+
+    A diferencia de combinar_cubos(), solo se tocan las celdas que aparecen
+    en el lote: se buscan sus posiciones en el índice (tabla hash) y se
+    actualizan en su sitio. El coste depende del tamaño del lote, no del
+    cubo. Si el lote trae combinaciones Producto × Región nuevas, se añaden
+    al final. Devuelve el cubo actualizado.
+    """
+    if len(parcial) == 0:
+        return cubo
+    if len(cubo) == 0:
+        return parcial.copy()
+    posiciones = cubo.index.get_indexer(parcial.index)
+    existentes = posiciones >= 0
+
+    if existentes.any():
+        filas = posiciones[existentes]
+        for j, columna in enumerate(cubo.columns):
+            actual = cubo[columna].to_numpy()[filas]
+            nuevo = parcial[columna].to_numpy()[existentes]
+            if columna.endswith('_min'):
+                valores = np.minimum(actual, nuevo)
+            elif columna.endswith('_max'):
+                valores = np.maximum(actual, nuevo)
+            else:
+                valores = actual + nuevo
+            # Si el lote trae valores que no caben en el tipo actual, se amplía
+            if valores.dtype != cubo[columna].dtype:
+                cubo[columna] = cubo[columna].astype(valores.dtype)
+            cubo.iloc[filas, j] = valores
+
+    if not existentes.all():
+        cubo = pd.concat([cubo, parcial[~existentes]])
+    return cubo
+
+
+def filtrar_cubo(cubo, productos, regiones):
+    """Devuelve las celdas del cubo de los productos y regiones seleccionados
+
+    Es el equivalente de filtrar la tabla de ventas con .isin(), pero
+    sobre unas pocas filas en lugar de millones.
+    """
+    productos_cubo = cubo.index.get_level_values('Producto')
+    regiones_cubo = cubo.index.get_level_values('Región')
+    return cubo[productos_cubo.isin(productos) & regiones_cubo.isin(regiones)]
+
+
+def calcular_kpis(cubo):
+    """Calcula los KPIs del dashboard a partir de un cubo (ya filtrado)
+
+    Devuelve un diccionario con total_ventas, numero_ventas y ticket_promedio.
+    """
+    total_ventas = cubo['Total_suma'].sum()
+    numero_ventas = cubo[COLUMNA_FILAS].sum()
+    ticket_promedio = total_ventas / numero_ventas if numero_ventas > 0 else 0
+    return {
+        'total_ventas': total_ventas,
+        'numero_ventas': int(numero_ventas),
+        'ticket_promedio': ticket_promedio,
+    }
+
+
+def ventas_por(cubo, dimension, medida='Total'):
+    """Suma una medida del cubo por una sola dimensión (Producto o Región)
+
+    Equivale a df.groupby(dimension)[medida].sum() sobre las filas originales.
+    """
+    return cubo.groupby(level=dimension, observed=True)[f'{medida}_suma'].sum().rename(medida)
+
+
+def top_por(cubo, dimension, n=5, medida='Total'):
+    """Devuelve las n mejores categorías de una dimensión, de mayor a menor
+
+    Si ya se tiene el resultado de ventas_por(), es mejor llamar a
+    ranking.top_k() sobre él para no volver a agregar el cubo.
+    """
+    return top_k(ventas_por(cubo, dimension, medida), n)
+
+
+def resumen_por(cubo, dimension, medida='Total'):
+    """Devuelve suma, número de ventas, mínimo y máximo por dimensión
+
+    Las celdas del cubo se combinan así: las sumas y los conteos se suman,
+    el mínimo es el menor de los mínimos y el máximo el mayor de los máximos.
+    """
+    agrupado = cubo.groupby(level=dimension, observed=True)
+    return pd.DataFrame({
+        'Suma': agrupado[f'{medida}_suma'].sum(),
+        COLUMNA_FILAS: agrupado[COLUMNA_FILAS].sum(),
+        'Mínimo': agrupado[f'{medida}_min'].min(),
+        'Máximo': agrupado[f'{medida}_max'].max(),
+    })
@@ -0,0 +1,143 @@
+# ====================================
+# DATASET COMPARTIDO EN MEMORIA (MEMORY-MAP)
+# ====================================
+# Conceptos: memory-map (mmap), copia cero, memoria residente (RSS),
+#            memoria compartida entre sesiones y procesos
+
+# @st.cache_data guarda el resultado serializado (pickle) y entrega una
+# COPIA nueva a cada sesión que lo lee. Con 200 analistas en un servidor
+# eso son 200 copias de la misma tabla de ventas en memoria.
+#
+# Aquí el dataset se publica UNA vez en disco, una columna por archivo .npy
+# (las dimensiones Categorical se guardan como sus códigos enteros). Al
+# abrirlo con np.load(mmap_mode='r') el sistema operativo "mapea" el
+# archivo en memoria: las páginas se cargan al leerlas y son las mismas
+# para todas las sesiones del proceso y para todos los procesos del
+# servidor (están en la caché de páginas del sistema, no en cada proceso).
+# El DataFrame resultante es de solo lectura: filtrar o agrupar crea
+# resultados nuevos, pero la tabla base nunca se copia.
+#
+#     .datos_compartidos/
+#       100-42/
+#         esquema.json
+#         0.npy  1.npy  ...   (una columna por archivo)
+
+import json
+import os
+import shutil
+import uuid
+
+import numpy as np
+import pandas as pd
+
+# Carpeta por defecto donde se publican los datasets
+DIRECTORIO = '.datos_compartidos'
+
+# Archivo con el nombre, el tipo y las categorías de cada columna
+ARCHIVO_ESQUEMA = 'esquema.json'
+
+
+def publicar(df, directorio, version):
+    """Guarda df como columnas .npy en directorio/version y devuelve esa ruta
+
+    Se escribe primero en una carpeta temporal y después se renombra, así
+    ningún lector ve un dataset a medio escribir. Si otro proceso ya ha
+    publicado la misma versión, se descarta la copia temporal y se usa la suya.
+    """
+    destino = os.path.join(directorio, str(version))
+    if os.path.exists(os.path.join(destino, ARCHIVO_ESQUEMA)):
+        return destino
+    os.makedirs(directorio, exist_ok=True)
+    temporal = os.path.join(directorio, f'.{version}.{uuid.uuid4().hex}.tmp')
+    os.makedirs(temporal)
+
+    columnas = []
+    for i, (nombre, serie) in enumerate(df.items()):
+        archivo = f'{i}.npy'
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            valores = serie.cat.codes.to_numpy()
+            categorias = serie.cat.categories.tolist()
+        else:
+            valores = serie.to_numpy()
+            categorias = None
+        np.save(os.path.join(temporal, archivo), np.ascontiguousarray(valores))
+        columnas.append({'nombre': nombre, 'archivo': archivo, 'categorias': categorias})
+
+    # El esquema se escribe al final: su presencia indica que el dataset está completo
+    with open(os.path.join(temporal, ARCHIVO_ESQUEMA), 'w', encoding='utf-8') as f:
+        json.dump({'filas': len(df), 'columnas': columnas}, f, ensure_ascii=False)
+
+    try:
+        os.rename(temporal, destino)
+    except OSError:
+        # Otro proceso lo publicó mientras tanto: nos quedamos con el suyo
+        shutil.rmtree(temporal, ignore_errors=True)
+    return destino
+
+
+def abrir(ruta):
+    """Abre un dataset publicado como DataFrame de solo lectura sin copiarlo
+
+    Cada columna es una vista de su archivo mapeado en memoria. Las
+    Categorical se construyen sobre los códigos mapeados con validate=False,
+    porque validar los códigos obligaría a leer (y copiar) la columna entera.
+    """
+    with open(os.path.join(ruta, ARCHIVO_ESQUEMA), encoding='utf-8') as f:
+        esquema = json.load(f)
+
+    columnas = {}
+    for columna in esquema['columnas']:
+        valores = np.load(os.path.join(ruta, columna['archivo']), mmap_mode='r')
+        if columna['categorias'] is not None:
+            tipo = pd.CategoricalDtype(columna['categorias'])
+            valores = pd.Categorical.from_codes(valores, dtype=tipo, validate=False)
+        columnas[columna['nombre']] = valores
+    return pd.DataFrame(columnas, copy=False)
+
+
+def publicar_o_abrir(crear, version, directorio=DIRECTORIO):
+    """Abre el dataset de una versión; si no existe, lo crea con crear() y lo publica
+
+    crear es una función sin argumentos que devuelve el DataFrame. Solo se
+    llama la primera vez: los demás procesos abren directamente los archivos.
+    """
+    ruta = os.path.join(directorio, str(version))
+    if not os.path.exists(os.path.join(ruta, ARCHIVO_ESQUEMA)):
+        ruta = publicar(crear(), directorio, version)
+    return abrir(ruta)
+
+
+def memoria_proceso(pid=None):
+    """Memoria residente del proceso actual (o del proceso pid), en bytes
+
+    Devuelve un diccionario con:
+      - rss: memoria residente total (lo que muestra top/ps).
+      - rss_archivos: parte de rss que son archivos mapeados (compartida
+        con otros procesos que mapeen los mismos archivos).
+      - rss_anonima: memoria privada del proceso (copias, resultados...).
+      - pss: memoria "proporcional" (las páginas compartidas se reparten
+        entre los procesos que las usan); sumando pss de todos los
+        procesos se obtiene la memoria real que usa el servidor.
+    Solo Linux tiene /proc; en otros sistemas se devuelve el pico de rss
+    (solo del proceso actual) y el resto de valores como None.
+    """
+    memoria = {'rss': None, 'rss_archivos': None, 'rss_anonima': None, 'pss': None}
+    campos = {'VmRSS': 'rss', 'RssFile': 'rss_archivos', 'RssAnon': 'rss_anonima', 'Pss': 'pss'}
+    proceso = 'self' if pid is None else str(pid)
+    for archivo in (f'/proc/{proceso}/status', f'/proc/{proceso}/smaps_rollup'):
+        try:
+            with open(archivo) as f:
+                for linea in f:
+                    clave, _, resto = linea.partition(':')
+                    if clave in campos and memoria[campos[clave]] is None:
+                        memoria[campos[clave]] = int(resto.split()[0]) * 1024  # kB
+        except OSError:
+            continue
+
+    if memoria['rss'] is None and pid is None:
+        import resource
+        import sys
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS lo da en bytes y Linux/BSD en kB
+        memoria['rss'] = pico if sys.platform == 'darwin' else pico * 1024
+    return memoria
@@ -0,0 +1,225 @@
+# ====================================
+# DATOS DE VENTAS: GENERADOR VECTORIZADO
+# ====================================
+# Conceptos: numpy vectorizado, generadores, datos sintéticos a gran escala,
+#            tipos de datos compactos (categorical, enteros pequeños)
+
+# Este módulo genera los datos de ventas simulados que usa app_06_dashboard.py.
+# En lugar de crear las filas una a una con un bucle de Python, genera cada
+# columna completa con una sola llamada a NumPy. Así se pueden crear millones
+# de filas en segundos para hacer pruebas de carga del dashboard.
+#
+# Además define un esquema de tipos: las dimensiones (Producto, Región) se
+# guardan como pandas Categorical y las medidas como el entero más pequeño
+# que admite sus valores. Con millones de filas esto reduce mucho la memoria
+# y acelera los filtros con .isin() y los groupby().
+
+import numpy as np
+import pandas as pd
+
+# Valores posibles de las dimensiones
+PRODUCTOS = ['Laptop', 'Mouse', 'Teclado', 'Monitor', 'Auriculares']
+REGIONES = ['Norte', 'Sur', 'Este', 'Oeste']
+
+# Rangos de las medidas (el límite superior es exclusivo, como en randint)
+RANGO_CANTIDAD = (1, 20)
+RANGO_PRECIO = (20, 500)
+
+# Tamaño por defecto de cada bloque en el modo por bloques
+TAM_BLOQUE = 1_000_000
+
+# Esquema de tipos del DataFrame de ventas
+# Las dimensiones tienen categorías conocidas; las medidas se reducen
+# al entero más pequeño posible según sus valores reales.
+DIMENSIONES = {
+    'Producto': PRODUCTOS,
+    'Región': REGIONES,
+}
+MEDIDAS = ['Cantidad', 'Precio', 'Total']
+
+
+# ====================================
+# ESQUEMA DE TIPOS
+# ====================================
+
+def _tipo_categorico(serie, categorias):
+    """Devuelve el CategoricalDtype para una columna de dimensión
+
+    Si todos los valores están en las categorías conocidas se usan esas
+    (en ese orden); si aparecen valores nuevos se añaden al final para
+    no perder datos al cargar archivos externos.
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        valores = serie.cat.categories
+    else:
+        valores = pd.unique(serie.dropna())
+    conocidas = set(categorias)
+    nuevas = [v for v in valores if v not in conocidas]
+    return pd.CategoricalDtype(list(categorias) + sorted(nuevas))
+
+
+def _reducir_entero(serie):
+    """Convierte una columna numérica al entero más pequeño que la admite
+
+    pd.to_numeric(downcast=...) elige el tipo según el mínimo y el máximo
+    reales, así que nunca hay desbordamiento. Si la columna tiene decimales
+    o valores nulos se deja como está.
+    """
+    if serie.isna().any() or not pd.api.types.is_integer_dtype(serie):
+        return serie
+    if len(serie) and serie.min() >= 0:
+        return pd.to_numeric(serie, downcast='unsigned')
+    return pd.to_numeric(serie, downcast='integer')
+
+
+def aplicar_esquema(df):
+    """Aplica el esquema de ventas a un DataFrame y devuelve una copia
+
+    Sirve tanto para los datos generados como para cualquier cargador
+    (CSV, base de datos...). Las columnas que no existan se ignoran.
+    """
+    df = df.copy()
+    for columna, categorias in DIMENSIONES.items():
+        if columna in df.columns:
+            df[columna] = df[columna].astype(_tipo_categorico(df[columna], categorias))
+    for columna in MEDIDAS:
+        if columna in df.columns:
+            df[columna] = _reducir_entero(df[columna])
+    return df
+
+
+def uso_memoria(df):
+    """Devuelve los bytes que ocupa cada columna y el total
+
+    deep=True cuenta también el contenido de los strings de Python,
+    que es donde está la mayor parte del gasto de las columnas object.
+    """
+    por_columna = df.memory_usage(deep=True, index=False)
+    return {
+        'columnas': por_columna.to_dict(),
+        'total': int(por_columna.sum()),
+    }
+
+
+def comparar_memoria(antes, despues):
+    """Compara el uso de memoria de dos DataFrames (antes/después del esquema)
+
+    Devuelve un DataFrame con los bytes por columna y el ahorro,
+    listo para mostrarlo con st.dataframe().
+    """
+    mem_antes = antes.memory_usage(deep=True, index=False)
+    mem_despues = despues.memory_usage(deep=True, index=False)
+    informe = pd.DataFrame({
+        'Tipo antes': antes.dtypes.astype(str),
+        'Tipo después': despues.dtypes.astype(str),
+        'Bytes antes': mem_antes,
+        'Bytes después': mem_despues,
+    })
+    informe.loc['TOTAL'] = ['', '', mem_antes.sum(), mem_despues.sum()]
+    informe['Ahorro %'] = (
+        100 * (1 - informe['Bytes después'] / informe['Bytes antes'])
+    ).round(1)
+    return informe
+
+
+def leer_ventas_csv(ruta, **kwargs):
+    """Lee un CSV de ventas y le aplica el esquema de tipos
+
+    Las dimensiones se leen directamente como 'category' para no crear
+    nunca la columna de strings completa; las medidas se reducen después.
+    """
+    tipos = {columna: 'category' for columna in DIMENSIONES}
+    tipos.update(kwargs.pop('dtype', {}))
+    df = pd.read_csv(ruta, dtype=tipos, **kwargs)
+    return aplicar_esquema(df)
+
+
+# ====================================
+# GENERADOR
+# ====================================
+
+def productos_sku(n_productos):
+    """Lista de n_productos códigos tipo 'SKU-000001'
+
+    Sirve para simular catálogos grandes (alta cardinalidad) y probar
+    que rankings y gráficos siguen funcionando con 100.000 productos.
+    """
+    return [f'SKU-{i:06d}' for i in range(1, n_productos + 1)]
+
+
+def _generar_bloque(rng, n_filas, productos=PRODUCTOS):
+    """Genera un bloque de n_filas usando el generador aleatorio rng
+
+    Cada columna se crea con una única llamada vectorizada:
+    rng.integers() devuelve un array completo de n_filas números.
+    Las dimensiones se generan como índices y se convierten directamente
+    en Categorical con from_codes(), sin crear ningún string por fila.
+    El Total se calcula en int64 y después se aplica el esquema, así que
+    nunca se desborda aunque las medidas se guarden en tipos pequeños.
+    """
+    idx_producto = rng.integers(0, len(productos), size=n_filas)
+    idx_region = rng.integers(0, len(REGIONES), size=n_filas)
+    cantidad = rng.integers(*RANGO_CANTIDAD, size=n_filas)
+    precio = rng.integers(*RANGO_PRECIO, size=n_filas)
+
+    df = pd.DataFrame({
+        'Producto': pd.Categorical.from_codes(idx_producto, categories=productos),
+        'Región': pd.Categorical.from_codes(idx_region, categories=REGIONES),
+        'Cantidad': cantidad,
+        'Precio': precio,
+    })
+    df['Total'] = df['Cantidad'] * df['Precio']  # Columna derivada
+    return aplicar_esquema(df)
+
+
+def generar_ventas(n_filas=100, semilla=42, productos=None):
+    """Genera un DataFrame de ventas simuladas con n_filas registros
+
+    La semilla hace que los datos sean reproducibles: con la misma
+    semilla y el mismo número de filas se obtiene siempre el mismo resultado.
+    productos permite usar otro catálogo (por ejemplo productos_sku(100_000)).
+    """
+    rng = np.random.default_rng(semilla)
+    return _generar_bloque(rng, n_filas, PRODUCTOS if productos is None else list(productos))
+
+
+def generar_ventas_por_bloques(n_filas, tam_bloque=TAM_BLOQUE, semilla=42, productos=None):
+    """Genera las ventas en bloques de como máximo tam_bloque filas
+
+    Es un generador (usa yield): cada iteración devuelve un DataFrame
+    y solo hay un bloque en memoria a la vez. Sirve para crear decenas
+    de millones de filas y escribirlas a disco o agregarlas sin cargar
+    todo el conjunto de datos.
+
+    Ejemplo:
+        for bloque in generar_ventas_por_bloques(50_000_000):
+            bloque.to_csv('ventas.csv', mode='a', header=False, index=False)
+    """
+    if tam_bloque <= 0:
+        raise ValueError("tam_bloque debe ser mayor que 0")
+
+    productos = PRODUCTOS if productos is None else list(productos)
+    rng = np.random.default_rng(semilla)
+    restantes = n_filas
+    while restantes > 0:
+        n = min(tam_bloque, restantes)
+        yield _generar_bloque(rng, n, productos)
+        restantes -= n
+
+
+# ====================================
+# FILTROS
+# ====================================
+
+def mascara_filtros(df, productos, regiones):
+    """Máscara booleana de las filas con producto y región seleccionados
+
+    .isin() sobre una columna Categorical compara códigos enteros,
+    no strings, así que es rápido incluso con millones de filas.
+    """
+    return df['Producto'].isin(productos) & df['Región'].isin(regiones)
+
+
+def filtrar_ventas(df, productos, regiones):
+    """Filas de df de los productos y regiones seleccionados"""
+    return df[mascara_filtros(df, productos, regiones)]
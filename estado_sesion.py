@@ -0,0 +1,311 @@
+# ====================================
+# ESTADO DE SESIÓN CON MEMORIA ACOTADA
+# ====================================
+# Conceptos: presupuesto de memoria, desalojo a disco (spill), carga
+#            perezosa (fault-in), SQLite, medir el tamaño de los objetos
+
+# st.session_state vive en la memoria del servidor mientras dure la sesión
+# (ver app_05_estado.py). Con una lista de tareas o un DataFrame filtrado
+# por usuario, cada sesión nueva hace crecer la memoria del proceso, y las
+# pestañas olvidadas abiertas siguen ocupándola.
+#
+# AlmacenEstado guarda los valores de todas las sesiones con dos límites:
+#   - Por sesión: si una sesión supera su presupuesto, sus valores grandes
+#     menos usados se mueven a disco.
+#   - Global: si entre todas superan el presupuesto del servidor, se mueven
+#     a disco los valores grandes de las sesiones que llevan más tiempo sin
+#     actividad (las "frías").
+# Los valores movidos se guardan con pickle en una base de datos SQLite
+# local y se vuelven a cargar en memoria la próxima vez que se leen, sin
+# que la app lo note. Los valores pequeños (contadores, textos cortos) no
+# se mueven: no compensa.
+#
+# Además, las sesiones sin actividad durante INACTIVIDAD segundos se pasan
+# enteras a disco, y las que superan CADUCIDAD se borran.
+#
+# Los valores hay que volver a guardarlos después de modificarlos
+# (estado['tareas'] = tareas): así se mide su nuevo tamaño y la copia de
+# disco, si la hay, deja de ser válida.
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from tamano_memoria import tamano_valor
+
+# Presupuestos de memoria (se pueden cambiar con variables de entorno)
+MAX_BYTES_SESION = int(float(os.environ.get('ESTADO_MAX_MB_SESION', 8)) * 2**20)
+MAX_BYTES_TOTAL = int(float(os.environ.get('ESTADO_MAX_MB_TOTAL', 256)) * 2**20)
+
+# Valores más pequeños que esto nunca se mueven a disco
+BYTES_MINIMOS_DESALOJO = 4 * 1024
+
+# Carpeta de la base de datos con los valores desalojados
+DIRECTORIO_ESTADO = os.environ.get('ESTADO_DIRECTORIO', '.estado_sesiones')
+
+# Segundos sin actividad tras los que una sesión se pasa entera a disco,
+# y tras los que se borra (memoria y disco)
+INACTIVIDAD = 15 * 60
+CADUCIDAD = 24 * 60 * 60
+
+# Cada cuántos segundos se buscan sesiones inactivas
+INTERVALO_REVISION = 60
+
+
+def id_sesion():
+    """Identificador de la sesión de Streamlit actual ('local' fuera del servidor)"""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        contexto = get_script_run_ctx(suppress_warning=True)
+    except Exception:
+        contexto = None
+    return contexto.session_id if contexto is not None else 'local'
+
+
+class AlmacenEstado:
+    """Valores de estado de todas las sesiones, con presupuestos de memoria
+
+    Es seguro entre hilos: se comparte entre sesiones con @st.cache_resource.
+    Cada proceso del servidor usa su propia base de datos en disco.
+    """
+
+    def __init__(self, directorio=DIRECTORIO_ESTADO, max_bytes_sesion=MAX_BYTES_SESION,
+                 max_bytes_total=MAX_BYTES_TOTAL, bytes_minimos=BYTES_MINIMOS_DESALOJO,
+                 inactividad=INACTIVIDAD, caducidad=CADUCIDAD):
+        self.max_bytes_sesion = max_bytes_sesion
+        self.max_bytes_total = max_bytes_total
+        self.bytes_minimos = bytes_minimos
+        self.inactividad = inactividad
+        self.caducidad = caducidad
+        # sesión -> {'valores': OrderedDict(clave -> entrada), 'uso': hora, 'bytes': residentes}
+        # entrada: {'valor', 'bytes', 'en_disco', 'sucio'}; el orden es de menos a más usada
+        self._sesiones = {}
+        self._bytes_residentes = 0
+        self._ultima_revision = time.time()
+        self._cerrojo = threading.RLock()
+        self.desalojos = 0
+        self.recuperaciones = 0
+
+        os.makedirs(directorio, exist_ok=True)
+        self.ruta = os.path.join(directorio, f'estado_{os.getpid()}.db')
+        self._conexion = sqlite3.connect(self.ruta, check_same_thread=False)
+        self._conexion.execute('PRAGMA journal_mode=WAL')
+        self._conexion.execute('DROP TABLE IF EXISTS valores')
+        self._conexion.execute(
+            'CREATE TABLE valores (sesion TEXT, clave TEXT, datos BLOB, PRIMARY KEY (sesion, clave))'
+        )
+
+    # ------------------------------------
+    # Lectura y escritura
+    # ------------------------------------
+
+    def _sesion(self, sesion):
+        datos = self._sesiones.get(sesion)
+        if datos is None:
+            datos = self._sesiones[sesion] = {'valores': OrderedDict(), 'uso': 0.0, 'bytes': 0}
+        datos['uso'] = time.time()
+        return datos
+
+    def guardar(self, sesion, clave, valor):
+        """Guarda (o reemplaza) un valor de la sesión y aplica los presupuestos"""
+        tamano = tamano_valor(valor)
+        with self._cerrojo:
+            datos = self._sesion(sesion)
+            anterior = datos['valores'].pop(clave, None)
+            if anterior is not None and not anterior['en_disco']:
+                self._sumar(datos, -anterior['bytes'])
+            # La copia en disco (si la hay) ya no vale: se reescribe al desalojar
+            datos['valores'][clave] = {'valor': valor, 'bytes': tamano,
+                                       'en_disco': False, 'sucio': True}
+            self._sumar(datos, tamano)
+            self._aplicar_presupuestos(sesion, clave)
+
+    def obtener(self, sesion, clave, por_defecto=None):
+        """Devuelve un valor de la sesión; si estaba en disco, lo vuelve a cargar"""
+        with self._cerrojo:
+            datos = self._sesion(sesion)
+            entrada = datos['valores'].get(clave)
+            if entrada is None:
+                return por_defecto
+            datos['valores'].move_to_end(clave)
+            if entrada['en_disco']:
+                fila = self._conexion.execute(
+                    'SELECT datos FROM valores WHERE sesion = ? AND clave = ?', (sesion, clave)
+                ).fetchone()
+                entrada['valor'] = pickle.loads(fila[0])
+                # La copia de disco sigue siendo válida mientras no se vuelva a guardar
+                entrada['en_disco'], entrada['sucio'] = False, False
+                self._sumar(datos, entrada['bytes'])
+                self.recuperaciones += 1
+                self._aplicar_presupuestos(sesion, clave)
+            return entrada['valor']
+
+    def contiene(self, sesion, clave):
+        with self._cerrojo:
+            return clave in self._sesiones.get(sesion, {}).get('valores', {})
+
+    def eliminar(self, sesion, clave):
+        """Borra un valor de la sesión (de memoria y de disco)"""
+        with self._cerrojo:
+            datos = self._sesiones.get(sesion)
+            entrada = datos['valores'].pop(clave, None) if datos else None
+            if entrada is None:
+                return
+            if not entrada['en_disco']:
+                self._sumar(datos, -entrada['bytes'])
+            self._conexion.execute('DELETE FROM valores WHERE sesion = ? AND clave = ?',
+                                   (sesion, clave))
+
+    def eliminar_sesion(self, sesion):
+        """Borra todos los valores de una sesión"""
+        with self._cerrojo:
+            datos = self._sesiones.pop(sesion, None)
+            if datos is not None:
+                self._bytes_residentes -= datos['bytes']
+                self._conexion.execute('DELETE FROM valores WHERE sesion = ?', (sesion,))
+
+    # ------------------------------------
+    # Presupuestos y desalojo
+    # ------------------------------------
+
+    def _sumar(self, datos, n_bytes):
+        datos['bytes'] += n_bytes
+        self._bytes_residentes += n_bytes
+
+    def _desalojar(self, sesion, clave):
+        """Mueve un valor a disco y suelta la referencia en memoria"""
+        datos = self._sesiones[sesion]
+        entrada = datos['valores'][clave]
+        if entrada['sucio']:
+            self._conexion.execute(
+                'INSERT OR REPLACE INTO valores VALUES (?, ?, ?)',
+                (sesion, clave, pickle.dumps(entrada['valor'], protocol=pickle.HIGHEST_PROTOCOL)),
+            )
+        entrada['valor'], entrada['en_disco'], entrada['sucio'] = None, True, False
+        self._sumar(datos, -entrada['bytes'])
+        self.desalojos += 1
+
+    def _candidatos(self, sesion, protegida=None, todos=False):
+        """Claves residentes que se pueden desalojar, de la menos a la más usada"""
+        return [clave for clave, entrada in self._sesiones[sesion]['valores'].items()
+                if not entrada['en_disco'] and clave != protegida
+                and (todos or entrada['bytes'] >= self.bytes_minimos)]
+
+    def _aplicar_presupuestos(self, sesion, protegida):
+        """Desaloja valores hasta cumplir los presupuestos
+
+        protegida es la clave que se acaba de usar en esta sesión: nunca se
+        desaloja (la app la va a usar ahora mismo).
+        """
+        self._revisar_inactivas()
+
+        # 1. Presupuesto de la sesión: primero los valores menos usados
+        datos = self._sesiones[sesion]
+        for clave in self._candidatos(sesion, protegida):
+            if datos['bytes'] <= self.max_bytes_sesion:
+                break
+            self._desalojar(sesion, clave)
+
+        # 2. Presupuesto global: primero las sesiones más frías y, en cada
+        #    una, los valores más grandes
+        if self._bytes_residentes <= self.max_bytes_total:
+            return
+        frias = sorted(self._sesiones, key=lambda s: self._sesiones[s]['uso'])
+        for fria in frias:
+            claves = self._candidatos(fria, protegida if fria == sesion else None)
+            claves.sort(key=lambda c: self._sesiones[fria]['valores'][c]['bytes'], reverse=True)
+            for clave in claves:
+                if self._bytes_residentes <= self.max_bytes_total:
+                    return
+                self._desalojar(fria, clave)
+
+    def _revisar_inactivas(self):
+        """Pasa a disco las sesiones inactivas y borra las caducadas (cada cierto tiempo)"""
+        ahora = time.time()
+        if ahora - self._ultima_revision < INTERVALO_REVISION:
+            return
+        self._ultima_revision = ahora
+        for sesion, datos in list(self._sesiones.items()):
+            inactiva = ahora - datos['uso']
+            if inactiva > self.caducidad:
+                self.eliminar_sesion(sesion)
+            elif inactiva > self.inactividad:
+                for clave in self._candidatos(sesion, todos=True):
+                    self._desalojar(sesion, clave)
+
+    # ------------------------------------
+    # Estadísticas
+    # ------------------------------------
+
+    def estadisticas(self):
+        """Bytes en memoria y en disco, en total y por sesión"""
+        ahora = time.time()
+        with self._cerrojo:
+            sesiones = []
+            for sesion, datos in self._sesiones.items():
+                entradas = datos['valores'].values()
+                sesiones.append({
+                    'sesion': sesion,
+                    'valores': len(datos['valores']),
+                    'bytes_memoria': datos['bytes'],
+                    'bytes_disco': sum(e['bytes'] for e in entradas if e['en_disco']),
+                    'segundos_inactiva': ahora - datos['uso'],
+                })
+            return {
+                'sesiones': sesiones,
+                'bytes_memoria': self._bytes_residentes,
+                'bytes_disco': sum(s['bytes_disco'] for s in sesiones),
+                'max_bytes_sesion': self.max_bytes_sesion,
+                'max_bytes_total': self.max_bytes_total,
+                'desalojos': self.desalojos,
+                'recuperaciones': self.recuperaciones,
+            }
+
+    def cerrar(self):
+        """Cierra la base de datos y borra su archivo"""
+        with self._cerrojo:
+            self._conexion.close()
+            for sufijo in ('', '-wal', '-shm'):
+                try:
+                    os.remove(self.ruta + sufijo)
+                except OSError:
+                    pass
+
+
+class EstadoSesion:
+    """Vista tipo diccionario del almacén para una sola sesión
+
+    Se usa como st.session_state:
+        estado = estado_sesion(almacen)
+        tareas = estado.get('tareas', [])
+        estado['tareas'] = tareas + ['nueva']
+    """
+
+    def __init__(self, almacen, sesion):
+        self.almacen = almacen
+        self.sesion = sesion
+
+    def __getitem__(self, clave):
+        if not self.almacen.contiene(self.sesion, clave):
+            raise KeyError(clave)
+        return self.almacen.obtener(self.sesion, clave)
+
+    def __setitem__(self, clave, valor):
+        self.almacen.guardar(self.sesion, clave, valor)
+
+    def __delitem__(self, clave):
+        self.almacen.eliminar(self.sesion, clave)
+
+    def __contains__(self, clave):
+        return self.almacen.contiene(self.sesion, clave)
+
+    def get(self, clave, por_defecto=None):
+        return self.almacen.obtener(self.sesion, clave, por_defecto)
+
+
+def estado_sesion(almacen):
+    """EstadoSesion de la sesión actual de Streamlit"""
+    return EstadoSesion(almacen, id_sesion())
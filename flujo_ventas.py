@@ -0,0 +1,278 @@
+# ====================================
+# FLUJO DE VENTAS EN VIVO
+# ====================================
+# Conceptos: seguir un archivo que crece (tail -f), micro-lotes,
+#            hilo en segundo plano, latencia y rendimiento (throughput)
+
+# Las ventas llegan como eventos: un proceso externo va añadiendo líneas
+# a un archivo CSV o JSONL (una venta por línea). El dashboard no debe
+# re-ejecutar el script entero por cada evento: con cientos de eventos por
+# segundo las ejecuciones se acumularían y el servidor se quedaría atrás.
+#
+# En su lugar:
+#   1. Un único hilo en segundo plano (compartido por todas las sesiones)
+#      lee cada cierto intervalo las líneas nuevas del archivo, desde el
+#      último byte leído, y las añade de una vez como un micro-lote a los
+#      agregados (ver ventas_incrementales.py). Si llegan más eventos, el
+#      lote es más grande, pero sigue habiendo un lote por intervalo.
+#   2. El dashboard solo redibuja los KPIs y los gráficos (un fragmento con
+#      st.fragment(run_every=...)), leyendo los agregados ya actualizados.
+#
+# Cada evento lleva la hora a la que se produjo (columna 'Marca', segundos
+# desde 1970). Al dibujarlo se calcula la latencia evento → pantalla.
+#
+# La posición leída del archivo solo avanza cuando el micro-lote se ha
+# añadido a los agregados: si falla, se vuelve a leer en el siguiente
+# intervalo. Un lote que falla MAX_REINTENTOS veces seguidas (por ejemplo,
+# una línea corrupta) se salta para que no detenga el flujo.
+#
+# Para simular el flujo desde otra terminal:
+#     python flujo_ventas.py ventas_vivo.jsonl --tasa 500
+# y arrancar el dashboard con:
+#     DASHBOARD_FLUJO=ventas_vivo.jsonl streamlit run app_06_dashboard.py
+
+import argparse
+import io
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from datos_ventas import generar_ventas
+
+logger = logging.getLogger(__name__)
+
+# Columna con la hora del evento (segundos desde 1970, como time.time())
+COLUMNA_MARCA = 'Marca'
+
+# Cada cuánto lee el hilo las líneas nuevas (segundos)
+INTERVALO = 0.2
+
+# Máximo de bytes leídos en cada micro-lote (el resto queda para el siguiente)
+MAX_BYTES_LOTE = 16 * 1024 * 1024
+
+# Lotes recientes que se recuerdan para medir latencia y rendimiento
+LOTES_HISTORIAL = 1_000
+
+# Ventana (segundos) para calcular los eventos por segundo
+VENTANA_RENDIMIENTO = 10.0
+
+# Intentos seguidos de un micro-lote que falla antes de saltárselo
+MAX_REINTENTOS = 5
+
+
+class SeguidorArchivo:
+    """Lee las líneas que se van añadiendo a un archivo CSV o JSONL
+
+    Guarda la posición (en bytes) hasta la que ha leído. Una línea a medio
+    escribir (sin salto de línea final) se deja para la siguiente lectura.
+    Si el archivo se trunca o se reemplaza por uno más corto, se vuelve a
+    leer desde el principio.
+
+    leer_nuevas() no avanza la posición: hasta llamar a confirmar(), la
+    siguiente lectura devuelve otra vez las mismas filas.
+    """
+
+    def __init__(self, ruta, formato=None):
+        self.ruta = ruta
+        self.formato = formato or ('jsonl' if ruta.endswith(('.jsonl', '.json')) else 'csv')
+        self.posicion = 0
+        self._cabecera = None
+        self._pendiente = None  # (posición, cabecera) tras la última lectura
+
+    def leer_nuevas(self, max_bytes=MAX_BYTES_LOTE):
+        """Devuelve un DataFrame con las filas nuevas completas (o None si no hay)"""
+        self._pendiente = None
+        try:
+            tamano = os.path.getsize(self.ruta)
+        except OSError:
+            return None  # Todavía no existe
+        if tamano < self.posicion:
+            self.posicion, self._cabecera = 0, None
+        if tamano == self.posicion:
+            return None
+
+        with open(self.ruta, 'rb') as f:
+            f.seek(self.posicion)
+            datos = f.read(max_bytes)
+        # Solo se procesan líneas completas
+        fin = datos.rfind(b'\n') + 1
+        if fin == 0:
+            return None
+        texto = datos[:fin].decode('utf-8', errors='replace')
+
+        cabecera = self._cabecera
+        if self.formato == 'csv' and cabecera is None:
+            cabecera, _, texto = texto.partition('\n')
+        self._pendiente = (self.posicion + fin, cabecera)
+        if not texto.strip():
+            self.confirmar()  # Solo la cabecera o líneas vacías
+            return None
+        if self.formato == 'jsonl':
+            return pd.read_json(io.StringIO(texto), lines=True)
+        return pd.read_csv(io.StringIO(cabecera + '\n' + texto))
+
+    def confirmar(self):
+        """Da por procesadas las filas de la última lectura (avanza la posición)"""
+        if self._pendiente is not None:
+            self.posicion, self._cabecera = self._pendiente
+            self._pendiente = None
+
+
+class ConsumidorFlujo:
+    """Hilo que pasa las filas nuevas de un archivo a unos agregados de ventas
+
+    ventas es un ventas_incrementales.VentasIncrementales. Cada intervalo
+    se lee todo lo nuevo y se añade como un solo lote, así que el número
+    de actualizaciones por segundo no depende de la tasa de eventos.
+    errores cuenta los intentos fallidos y lotes_descartados los lotes que
+    se saltaron tras MAX_REINTENTOS fallos seguidos.
+    """
+
+    def __init__(self, seguidor, ventas, intervalo=INTERVALO):
+        self.seguidor = seguidor
+        self.ventas = ventas
+        self.intervalo = intervalo
+        self.eventos = 0
+        self.errores = 0
+        self.lotes_descartados = 0
+        self._fallos_seguidos = 0
+        # (versión, marcas de los eventos, hora de ingesta) de los últimos lotes
+        self._lotes = deque(maxlen=LOTES_HISTORIAL)
+        self._cerrojo = threading.Lock()
+        self._parar = threading.Event()
+        self._hilo = None
+        self._inicio = time.time()
+
+    def iniciar(self):
+        """Arranca el hilo en segundo plano (si no estaba ya en marcha)"""
+        if self._hilo is None or not self._hilo.is_alive():
+            self._parar.clear()
+            self._inicio = time.time()
+            self._hilo = threading.Thread(target=self._bucle, name='flujo-ventas', daemon=True)
+            self._hilo.start()
+        return self
+
+    def detener(self):
+        """Pide al hilo que termine y espera a que lo haga"""
+        self._parar.set()
+        if self._hilo is not None:
+            self._hilo.join()
+
+    def _bucle(self):
+        while not self._parar.wait(self.intervalo):
+            try:
+                self.procesar()
+            except Exception:
+                # La posición no ha avanzado: el lote se reintenta en el
+                # siguiente intervalo. Si sigue fallando (una línea corrupta),
+                # se salta para que no detenga el flujo.
+                self.errores += 1
+                self._fallos_seguidos += 1
+                if self._fallos_seguidos < MAX_REINTENTOS:
+                    logger.exception("Error al procesar un micro-lote del flujo "
+                                     "(intento %d de %d)", self._fallos_seguidos, MAX_REINTENTOS)
+                else:
+                    logger.exception("Micro-lote descartado tras %d intentos (bytes desde %d)",
+                                     MAX_REINTENTOS, self.seguidor.posicion)
+                    self.seguidor.confirmar()
+                    self.lotes_descartados += 1
+                    self._fallos_seguidos = 0
+            else:
+                self._fallos_seguidos = 0
+
+    def procesar(self):
+        """Lee las filas nuevas y las añade como un micro-lote; devuelve cuántas"""
+        filas = self.seguidor.leer_nuevas()
+        if filas is None or filas.empty:
+            self.seguidor.confirmar()
+            return 0
+        if COLUMNA_MARCA in filas.columns:
+            marcas = filas.pop(COLUMNA_MARCA).to_numpy(dtype='float64')
+        else:
+            marcas = np.full(len(filas), time.time())
+        version = self.ventas.anexar(filas)
+        # Solo ahora, con el lote ya en los agregados, avanza la posición
+        self.seguidor.confirmar()
+        with self._cerrojo:
+            self._lotes.append((version, marcas, time.time()))
+            self.eventos += len(filas)
+        return len(filas)
+
+    def marcas_desde(self, version, hasta=None):
+        """Marcas de los eventos de los lotes con versión en (version, hasta]"""
+        with self._cerrojo:
+            marcas = [m for v, m, _ in self._lotes
+                      if v > version and (hasta is None or v <= hasta)]
+        return np.concatenate(marcas) if marcas else np.empty(0)
+
+    def rendimiento(self, ventana=VENTANA_RENDIMIENTO):
+        """Eventos por segundo ingeridos en los últimos 'ventana' segundos"""
+        ahora = time.time()
+        with self._cerrojo:
+            recientes = [(len(m), t) for _, m, t in self._lotes if ahora - t <= ventana]
+            inicio = self._inicio
+        if not recientes:
+            return 0.0
+        # Al arrancar todavía no ha pasado una ventana completa
+        return sum(n for n, _ in recientes) / max(min(ventana, ahora - inicio), self.intervalo)
+
+
+def latencias_ms(marcas, ahora=None):
+    """Latencia de cada evento hasta 'ahora' (en milisegundos)"""
+    ahora = time.time() if ahora is None else ahora
+    return (ahora - np.asarray(marcas, dtype='float64')) * 1000
+
+
+def producir_eventos(ruta, tasa, duracion=None, intervalo=0.05, semilla=0, parar=None):
+    """Añade ventas al archivo a 'tasa' eventos por segundo (simulador del flujo)
+
+    Cada intervalo escribe de golpe los eventos que tocan, con la hora
+    actual en la columna 'Marca'. duracion=None sigue hasta que se
+    interrumpe (o hasta que se activa el threading.Event 'parar').
+    """
+    formato = 'jsonl' if ruta.endswith(('.jsonl', '.json')) else 'csv'
+    escribir_cabecera = formato == 'csv' and not os.path.exists(ruta)
+    inicio = time.time()
+    producidos = 0
+    lote = 0
+    with open(ruta, 'a', encoding='utf-8') as f:
+        while duracion is None or time.time() - inicio < duracion:
+            if parar is not None and parar.is_set():
+                break
+            pendientes = int((time.time() - inicio) * tasa) - producidos
+            if pendientes > 0:
+                filas = generar_ventas(n_filas=pendientes, semilla=semilla + lote)
+                filas[COLUMNA_MARCA] = time.time()
+                if formato == 'jsonl':
+                    f.write(filas.to_json(orient='records', lines=True, force_ascii=False))
+                    f.write('\n')
+                else:
+                    filas.to_csv(f, header=escribir_cabecera, index=False)
+                    escribir_cabecera = False
+                f.flush()
+                producidos += pendientes
+                lote += 1
+            time.sleep(intervalo)
+    return producidos
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simula un flujo de ventas añadiendo líneas a un archivo')
+    parser.add_argument('ruta', help='archivo .jsonl o .csv')
+    parser.add_argument('--tasa', type=float, default=100, help='eventos por segundo')
+    parser.add_argument('--duracion', type=float, default=None, help='segundos (por defecto, sin fin)')
+    args = parser.parse_args()
+    print(f"Escribiendo {args.tasa:.0f} ventas/s en {args.ruta} (Ctrl+C para parar)")
+    try:
+        producir_eventos(args.ruta, args.tasa, args.duracion)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
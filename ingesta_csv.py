@@ -0,0 +1,510 @@
+# ====================================
+# INGESTA DE CSV POR BLOQUES
+# ====================================
+# Conceptos: lectura por bloques (chunksize), estadísticas incrementales,
+#            muestreo para cuantiles aproximados, detección de formato y tipos
+
+# pd.read_csv(archivo) carga el archivo completo en memoria antes de mostrar
+# nada. Con archivos de varios GB eso puede agotar la memoria del servidor.
+#
+# Con chunksize, pandas devuelve el archivo en bloques de N filas. Para cada
+# bloque actualizamos unas estadísticas acumuladas (conteo, media, desviación,
+# mínimo, máximo y cuantiles aproximados) y lo descartamos. Así la memoria
+# usada depende del tamaño del bloque, no del tamaño del archivo.
+#
+# Antes de leer, se "olfatea" el principio del archivo (unos KB) para
+# detectar el separador, la codificación, si hay cabecera y el tipo de cada
+# columna. Las columnas de texto con pocos valores distintos se leen
+# directamente como 'category' (dtype=), que ocupa mucha menos memoria.
+# Los tipos numéricos no se fuerzan: la muestra no ve el resto del archivo,
+# y si una columna de enteros trae luego decimales o texto, un dtype
+# forzado haría fallar la lectura a mitad del archivo.
+#
+# Con el perfil también se elige cómo leer (ver leer_csv()): los archivos
+# pequeños se leen de una vez con el motor 'pyarrow', que usa varios
+# núcleos; los grandes, por bloques con el motor 'c'. Y como las columnas
+# se conocen antes de leer, se pueden leer solo algunas (usecols=).
+
+import csv
+import io
+import os
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from reduccion_series import indices_minmax_por_tramo
+
+# Filas por bloque al leer el CSV
+TAM_BLOQUE = 100_000
+
+# Tamaño de la muestra por columna para estimar los cuantiles
+TAM_MUESTRA = 10_000
+
+# Cuantiles que se muestran (los mismos que .describe())
+CUANTILES = [0.25, 0.5, 0.75]
+
+# Máximo de puntos que se guardan para el gráfico de líneas
+MAX_PUNTOS_GRAFICO = 2_000
+
+# Bytes del principio del archivo que se usan para detectar formato y tipos
+BYTES_MUESTRA = 64 * 1024
+
+# Los archivos de hasta este tamaño se leen de una vez con el motor más rápido
+MAX_BYTES_LECTURA_COMPLETA = 32 * 1024 ** 2
+
+# Codificaciones que se prueban, en orden
+CODIFICACIONES = ['utf-8-sig', 'utf-8', 'latin-1']
+
+# Separadores candidatos para csv.Sniffer
+SEPARADORES = ',;\t|'
+
+# Una columna de texto se lee como 'category' si tiene como mucho esta
+# proporción de valores distintos (con muestras pequeñas siempre se usa)
+PROPORCION_CATEGORIA = 0.5
+FILAS_MINIMAS_PROPORCION = 100
+
+
+# ====================================
+# DETECCIÓN DE FORMATO Y TIPOS
+# ====================================
+
+@dataclass
+class PerfilCSV:
+    """Resultado de olfatear el principio de un CSV
+
+    Contiene todo lo necesario para leer el resto del archivo: separador,
+    codificación, cabecera, los tipos que se pueden forzar sin riesgo y el
+    motor de lectura recomendado.
+    """
+    separador: str = ','
+    codificacion: str = 'utf-8'
+    cabecera: bool = True
+    columnas: list = field(default_factory=list)
+    tipos: dict = field(default_factory=dict)
+
+    def opciones_read_csv(self, columnas=None, por_bloques=True):
+        """Argumentos para pd.read_csv() según el perfil
+
+        columnas limita las columnas leídas (usecols=); si es None se leen
+        todas. Con por_bloques=False se elige el motor más rápido disponible.
+        """
+        opciones = {
+            'sep': self.separador,
+            'encoding': self.codificacion,
+            # Si más adelante aparece un carácter que no encaja con la
+            # codificación detectada, se reemplaza en lugar de fallar
+            'encoding_errors': 'replace',
+            'header': 0 if self.cabecera else None,
+            'dtype': self.tipos,
+            # El motor 'pyarrow' no encuentra las columnas de usecols= cuando
+            # los nombres vienen de names= (archivos sin cabecera)
+            'engine': motor_csv(por_bloques or (columnas is not None and not self.cabecera)),
+        }
+        if not self.cabecera:
+            opciones['names'] = self.columnas
+        if columnas is not None:
+            opciones['usecols'] = list(columnas)
+            opciones['dtype'] = {c: t for c, t in self.tipos.items() if c in columnas}
+        return opciones
+
+
+def motor_csv(por_bloques=True):
+    """Elige el motor de pd.read_csv() más rápido disponible
+
+    El motor 'pyarrow' lee en paralelo y es el más rápido, pero no admite
+    chunksize; para la lectura por bloques se usa el motor 'c'.
+    """
+    if por_bloques:
+        return 'c'
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return 'c'
+    return 'pyarrow'
+
+
+def _leer_muestra(archivo, n_bytes):
+    """Lee los primeros n_bytes de una ruta o archivo y vuelve al inicio"""
+    if isinstance(archivo, (str, bytes)) or hasattr(archivo, '__fspath__'):
+        with open(archivo, 'rb') as f:
+            return f.read(n_bytes)
+    posicion = archivo.tell()
+    datos = archivo.read(n_bytes)
+    archivo.seek(posicion)
+    return datos
+
+
+def _decodificar(datos):
+    """Decodifica los bytes probando las codificaciones de CODIFICACIONES
+
+    Si la muestra corta un carácter multibyte al final, se ignora ese final.
+    """
+    for codificacion in CODIFICACIONES:
+        try:
+            return datos.decode(codificacion), codificacion
+        except UnicodeDecodeError as error:
+            if error.start >= len(datos) - 3 and codificacion != 'latin-1':
+                try:
+                    return datos[:error.start].decode(codificacion), codificacion
+                except UnicodeDecodeError:
+                    pass
+    return datos.decode('latin-1'), 'latin-1'
+
+
+def _tipo_columna(serie):
+    """Tipo de pandas que se puede forzar en una columna de la muestra
+
+    Solo se fuerza 'category' en columnas de texto, que acepta cualquier
+    valor. Un tipo numérico adivinado con los primeros KB ('Int64',
+    'float64') falla si más adelante aparece un decimal o un texto, así que
+    en las columnas numéricas pandas decide en cada bloque.
+    Devuelve None si es mejor dejar que pandas decida.
+    """
+    if pd.api.types.is_bool_dtype(serie) or pd.api.types.is_numeric_dtype(serie):
+        return None
+    valores = serie.dropna()
+    if len(valores) == 0:
+        return None
+    if (len(valores) < FILAS_MINIMAS_PROPORCION
+            or valores.nunique() / len(valores) <= PROPORCION_CATEGORIA):
+        return 'category'
+    return None
+
+
+def _tiene_cabecera(texto, separador):
+    """Decide si la primera fila de la muestra es una cabecera
+
+    Si hay columnas numéricas, la primera fila es cabecera cuando alguno de
+    sus valores en esas columnas no es un número. Si todas las columnas son
+    de texto no hay pista fiable y se supone que hay cabecera, como hace
+    pd.read_csv() por defecto (csv.Sniffer.has_header() falla a menudo aquí,
+    sobre todo con muestras cortas de columnas numéricas).
+    Si la muestra no se puede leer también se supone cabecera: el error
+    de verdad lo dará la lectura del archivo.
+    """
+    try:
+        filas = pd.read_csv(io.StringIO(texto), sep=separador, header=None, dtype=str)
+    except (pd.errors.ParserError, pd.errors.EmptyDataError):
+        return True
+    if len(filas) < 2:
+        return True
+    primera, resto = filas.iloc[0], filas.iloc[1:]
+
+    numericas = [
+        c for c in filas.columns
+        if resto[c].notna().any()
+        and pd.to_numeric(resto[c].dropna(), errors='coerce').notna().all()
+    ]
+    if numericas:
+        return pd.to_numeric(primera[numericas], errors='coerce').isna().any()
+    return True
+
+
+def olfatear_csv(archivo, n_bytes=BYTES_MUESTRA):
+    """Detecta separador, codificación, cabecera y tipos de un CSV
+
+    Solo lee los primeros n_bytes (por defecto 64 KB), así que es
+    instantáneo incluso con archivos enormes. Devuelve un PerfilCSV.
+    """
+    datos = _leer_muestra(archivo, n_bytes)
+    texto, codificacion = _decodificar(datos)
+
+    # Si la muestra no es el archivo completo, la última línea puede estar cortada
+    if len(datos) == n_bytes and '\n' in texto:
+        texto = texto[:texto.rindex('\n') + 1]
+
+    # csv.Sniffer detecta el separador
+    try:
+        separador = csv.Sniffer().sniff(texto, delimiters=SEPARADORES).delimiter
+    except csv.Error:
+        separador = ','
+    cabecera = bool(_tiene_cabecera(texto, separador))
+
+    muestra = pd.read_csv(io.StringIO(texto), sep=separador,
+                          header=0 if cabecera else None)
+    columnas = [str(c) for c in muestra.columns] if cabecera else [
+        f'columna_{i}' for i in range(len(muestra.columns))
+    ]
+    muestra.columns = columnas
+
+    tipos = {}
+    for columna in columnas:
+        tipo = _tipo_columna(muestra[columna])
+        if tipo is not None:
+            tipos[columna] = tipo
+
+    return PerfilCSV(separador=separador, codificacion=codificacion,
+                     cabecera=cabecera, columnas=columnas, tipos=tipos)
+
+
+def leer_csv_tipado(archivo, perfil=None, columnas=None):
+    """Lee un CSV completo usando el perfil detectado y el motor más rápido
+
+    Para archivos que sí caben en memoria. Si no se pasa perfil, se olfatea.
+    """
+    if perfil is None:
+        perfil = olfatear_csv(archivo)
+    return pd.read_csv(archivo, **perfil.opciones_read_csv(columnas, por_bloques=False))
+
+
+# ====================================
+# LECTURA POR BLOQUES
+# ====================================
+
+
+def _tamano_archivo(archivo):
+    """Bytes de una ruta o de un archivo subido (None si no se sabe)"""
+    if isinstance(archivo, (str, bytes)) or hasattr(archivo, '__fspath__'):
+        return os.path.getsize(archivo)
+    return getattr(archivo, 'size', None)
+
+
+def leer_csv(archivo, perfil, columnas=None, tam_bloque=TAM_BLOQUE):
+    """Iterador de bloques de un CSV, leído con el motor más rápido posible
+
+    Si el archivo ocupa como mucho MAX_BYTES_LECTURA_COMPLETA se lee de una
+    vez con leer_csv_tipado() (motor 'pyarrow' si está instalado) y se
+    devuelve como un único bloque. Si es mayor, o no se sabe su tamaño, se
+    lee por bloques de tam_bloque filas con leer_csv_por_bloques().
+    columnas limita las columnas leídas (usecols=). Un archivo abierto se
+    lee desde el principio, aunque ya se hubiera leído antes.
+    """
+    if hasattr(archivo, 'seek'):
+        archivo.seek(0)
+    tamano = _tamano_archivo(archivo)
+    if tamano is not None and tamano <= MAX_BYTES_LECTURA_COMPLETA:
+        return iter([leer_csv_tipado(archivo, perfil, columnas)])
+    return leer_csv_por_bloques(archivo, tam_bloque, perfil=perfil, columnas=columnas)
+
+
+def leer_csv_por_bloques(archivo, tam_bloque=TAM_BLOQUE, perfil=None, columnas=None, **kwargs):
+    """Devuelve un iterador de DataFrames de como máximo tam_bloque filas
+
+    Es un envoltorio de pd.read_csv(chunksize=...): acepta una ruta o un
+    archivo abierto (como el que devuelve st.file_uploader()).
+    Si se pasa un perfil (ver olfatear_csv()) se usan sus opciones de lectura;
+    columnas limita las columnas que se leen.
+    """
+    if perfil is not None:
+        kwargs = {**perfil.opciones_read_csv(columnas, por_bloques=True), **kwargs}
+    elif columnas is not None:
+        kwargs.setdefault('usecols', list(columnas))
+    return pd.read_csv(archivo, chunksize=tam_bloque, **kwargs)
+
+
+def _a_float(valores):
+    """Convierte una Series o array a float64 con NaN en los nulos"""
+    if isinstance(valores, pd.Series):
+        return pd.to_numeric(valores, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+    return np.asarray(valores, dtype='float64')
+
+
+class EstadisticasColumna:
+    """Estadísticas de una columna numérica que se actualizan por bloques
+
+    La media y la varianza se combinan con la fórmula de Chan et al.
+    (variante por bloques del algoritmo de Welford), que es numéricamente
+    estable. Para los cuantiles se guarda una muestra uniforme de tamaño fijo:
+    cada valor recibe una clave aleatoria y se conservan los de clave menor.
+    """
+
+    def __init__(self, tam_muestra=TAM_MUESTRA, semilla=0):
+        self.conteo = 0
+        self.media = 0.0
+        self.m2 = 0.0  # Suma de cuadrados de las diferencias a la media
+        self.minimo = np.inf
+        self.maximo = -np.inf
+        self.tam_muestra = tam_muestra
+        self._rng = np.random.default_rng(semilla)
+        self._muestra = np.empty(0)
+        self._claves = np.empty(0)
+
+    def actualizar(self, valores):
+        """Incorpora un bloque de valores (Series o array); ignora los nulos"""
+        valores = _a_float(valores)
+        valores = valores[~np.isnan(valores)]
+        n = len(valores)
+        if n == 0:
+            return
+
+        # Combinar media y varianza del bloque con las acumuladas
+        media_bloque = valores.mean()
+        m2_bloque = ((valores - media_bloque) ** 2).sum()
+        total = self.conteo + n
+        delta = media_bloque - self.media
+        self.media += delta * n / total
+        self.m2 += m2_bloque + delta ** 2 * self.conteo * n / total
+        self.conteo = total
+
+        self.minimo = min(self.minimo, valores.min())
+        self.maximo = max(self.maximo, valores.max())
+
+        # Muestra uniforme: unir y quedarse con las tam_muestra claves menores
+        claves = np.concatenate([self._claves, self._rng.random(n)])
+        muestra = np.concatenate([self._muestra, valores])
+        if len(claves) > self.tam_muestra:
+            elegidos = np.argpartition(claves, self.tam_muestra)[:self.tam_muestra]
+            claves, muestra = claves[elegidos], muestra[elegidos]
+        self._claves, self._muestra = claves, muestra
+
+    def combinar(self, otra):
+        """Incorpora las estadísticas de otra instancia (por ejemplo, de otro bloque)
+
+        Usa la misma fórmula que actualizar(), así que combinar las
+        estadísticas de varios bloques calculadas en paralelo da el mismo
+        resultado que procesarlos uno detrás de otro.
+        """
+        if otra.conteo == 0:
+            return self
+        total = self.conteo + otra.conteo
+        delta = otra.media - self.media
+        self.media += delta * otra.conteo / total
+        self.m2 += otra.m2 + delta ** 2 * self.conteo * otra.conteo / total
+        self.conteo = total
+        self.minimo = min(self.minimo, otra.minimo)
+        self.maximo = max(self.maximo, otra.maximo)
+
+        claves = np.concatenate([self._claves, otra._claves])
+        muestra = np.concatenate([self._muestra, otra._muestra])
+        if len(claves) > self.tam_muestra:
+            elegidos = np.argpartition(claves, self.tam_muestra)[:self.tam_muestra]
+            claves, muestra = claves[elegidos], muestra[elegidos]
+        self._claves, self._muestra = claves, muestra
+        return self
+
+    @property
+    def desviacion(self):
+        """Desviación estándar muestral (ddof=1, igual que pandas)"""
+        return np.sqrt(self.m2 / (self.conteo - 1)) if self.conteo > 1 else np.nan
+
+    def cuantiles(self, qs=CUANTILES):
+        """Cuantiles aproximados calculados sobre la muestra"""
+        if len(self._muestra) == 0:
+            return [np.nan] * len(qs)
+        return list(np.quantile(self._muestra, qs))
+
+    def resumen(self):
+        """Devuelve las estadísticas con los mismos nombres que .describe()"""
+        vacia = self.conteo == 0
+        datos = {
+            'count': float(self.conteo),
+            'mean': np.nan if vacia else self.media,
+            'std': self.desviacion,
+            'min': np.nan if vacia else self.minimo,
+        }
+        for q, valor in zip(CUANTILES, self.cuantiles()):
+            datos[f'{q:.0%}'] = valor
+        datos['max'] = np.nan if vacia else self.maximo
+        return pd.Series(datos)
+
+
+class SerieReducida:
+    """Serie de tamaño acotado para graficar una columna leída por bloques
+
+    Las filas se agrupan en tramos de igual número de filas y de cada tramo
+    se guardan su mínimo y su máximo (ver reduccion_series.py). Cuando los
+    tramos ya no caben en max_puntos, su anchura se duplica y los puntos
+    guardados se vuelven a reducir. Así cubre todo el archivo por igual
+    (las primeras filas con la misma densidad que las últimas) con como
+    mucho max_puntos valores, y conserva los picos.
+    """
+
+    def __init__(self, max_puntos=MAX_PUNTOS_GRAFICO):
+        self.max_puntos = max_puntos
+        self._posiciones = np.empty(0, dtype='int64')
+        self._valores = np.empty(0)
+        self._leidos = 0
+        self._ancho = 1  # Filas por tramo
+
+    def actualizar(self, valores):
+        """Añade un bloque de valores consecutivos"""
+        valores = _a_float(valores)
+        posiciones = np.arange(self._leidos, self._leidos + len(valores))
+        self._leidos += len(valores)
+
+        # Dos puntos por tramo: se ensanchan los tramos hasta que quepan
+        while 2 * -(-self._leidos // self._ancho) > self.max_puntos:
+            self._ancho *= 2
+
+        posiciones = np.concatenate([self._posiciones, posiciones])
+        valores = np.concatenate([self._valores, valores])
+        elegidos = indices_minmax_por_tramo(posiciones // self._ancho, valores)
+        self._posiciones = posiciones[elegidos]
+        self._valores = valores[elegidos]
+
+    def serie(self, nombre=None):
+        """Devuelve la serie como pd.Series indexada por número de fila"""
+        return pd.Series(self._valores, index=self._posiciones, name=nombre)
+
+
+class IngestaIncremental:
+    """Estado de la lectura por bloques de un CSV
+
+    Guarda las primeras filas (para mostrarlas enseguida), el número de
+    filas leídas, las estadísticas de cada columna numérica y una serie
+    acotada de la primera columna numérica para el gráfico. Nunca guarda
+    el archivo completo.
+    """
+
+    def __init__(self, filas_vista_previa=5, tam_muestra=TAM_MUESTRA,
+                 max_puntos_grafico=MAX_PUNTOS_GRAFICO):
+        self.filas_vista_previa = filas_vista_previa
+        self.tam_muestra = tam_muestra
+        self.vista_previa = None
+        self.columnas = []
+        self.filas = 0
+        self.bloques = 0
+        self.estadisticas = {}
+        self.columna_grafico = None
+        self.grafico = SerieReducida(max_puntos_grafico)
+
+    def actualizar(self, bloque):
+        """Procesa un bloque del CSV"""
+        if self.vista_previa is None:
+            self.vista_previa = bloque.head(self.filas_vista_previa)
+            self.columnas = list(bloque.columns)
+
+        for columna in bloque.select_dtypes(include=[np.number]).columns:
+            if columna not in self.estadisticas:
+                self.estadisticas[columna] = EstadisticasColumna(self.tam_muestra)
+            self.estadisticas[columna].actualizar(bloque[columna])
+
+        # La columna del gráfico se fija con el primer bloque que tenga números
+        if self.columna_grafico is None and self.columnas_numericas:
+            self.columna_grafico = self.columnas_numericas[0]
+        if self.columna_grafico in bloque.columns:
+            self.grafico.actualizar(bloque[self.columna_grafico])
+
+        self.filas += len(bloque)
+        self.bloques += 1
+
+    @property
+    def columnas_numericas(self):
+        """Columnas numéricas en el orden del archivo"""
+        return [c for c in self.columnas if c in self.estadisticas]
+
+    def serie_grafico(self):
+        """Serie acotada de la primera columna numérica (o None)"""
+        if self.columna_grafico is None:
+            return None
+        return self.grafico.serie(self.columna_grafico)
+
+    def describe(self):
+        """DataFrame con el mismo formato que df.describe()"""
+        return pd.DataFrame({
+            columna: self.estadisticas[columna].resumen()
+            for columna in self.columnas_numericas
+        })
+
+
+def progreso_archivo(archivo):
+    """Fracción del archivo leída hasta ahora (0.0 a 1.0)
+
+    Usa la posición del cursor del archivo; pandas lee un poco por delante
+    del bloque actual, así que es una aproximación.
+    """
+    tamano = getattr(archivo, 'size', None)
+    if not tamano:
+        return 0.0
+    return min(archivo.tell() / tamano, 1.0)
@@ -0,0 +1,155 @@
+# ====================================
+# LISTA DE TAREAS INDEXADA
+# ====================================
+# Conceptos: identificadores estables, índice invertido de palabras,
+#            paginación, coste constante por operación
+
+# Con una lista de Python, borrar una tarea o buscar texto recorre la lista
+# entera, y mostrarla con un st.write() por tarea envía miles de elementos
+# al navegador en cada ejecución: con muchas tareas, cada clic es más lento.
+#
+# ListaTareas guarda cada tarea con un id que no cambia y mantiene:
+#   - un diccionario id -> texto: añadir, borrar y consultar en O(1)
+#   - los ids en orden de creación: una página se obtiene cortando la
+#     lista, sin recorrer las demás tareas
+#   - un índice invertido palabra -> ids: buscar una palabra solo toca las
+#     tareas que la contienen
+#   - los bytes que ocupa, actualizados en cada operación (para
+#     estado_sesion.AlmacenEstado, que si no tendría que medir la lista
+#     entera cada vez que se guarda)
+#
+# Así el coste de una ejecución de app_05_estado.py depende del tamaño de
+# la página, no del número de tareas.
+
+import re
+import sys
+from collections import defaultdict
+
+# Bytes aproximados por tarea, además del propio texto: entrada del
+# diccionario, id, hueco en la lista de orden y entradas del índice
+BYTES_POR_TAREA = 200
+
+
+def palabras(texto):
+    """Palabras de un texto en minúsculas (las claves del índice)"""
+    return set(re.findall(r'\w+', texto.lower()))
+
+
+class ListaTareas:
+    """Tareas en orden de creación, con id estable e índice de palabras
+
+    Coste de las operaciones (n = número de tareas):
+      agregar(texto) -> id       O(1)
+      eliminar(id)               O(1)
+      texto(id), id in lista     O(1)
+      buscar(consulta)           O(tareas encontradas)
+      pagina(numero, tam)        O(tam); la primera página pedida tras
+                                 borrar tareas quita los huecos: O(n) una vez
+    """
+
+    def __init__(self, textos=()):
+        self._textos = {}                  # id -> texto
+        self._orden = []                   # ids en orden de creación (puede tener borrados)
+        self._borrados = 0                 # ids borrados que siguen en self._orden
+        self._indice = defaultdict(set)    # palabra -> ids de las tareas que la contienen
+        self._siguiente = 1
+        self._bytes = sys.getsizeof(self._textos) + sys.getsizeof(self._orden)
+        for texto in textos:
+            self.agregar(texto)
+
+    @classmethod
+    def desde_guardado(cls, guardado):
+        """Reconstruye la lista desde {id: texto} (como la guarda persistencia_estado)"""
+        lista = cls()
+        for id_tarea, texto in guardado.items():
+            lista._insertar(int(id_tarea), texto)
+        return lista
+
+    def _insertar(self, id_tarea, texto):
+        self._textos[id_tarea] = texto
+        self._orden.append(id_tarea)
+        for palabra in palabras(texto):
+            self._indice[palabra].add(id_tarea)
+        self._siguiente = max(self._siguiente, id_tarea + 1)
+        self._bytes += sys.getsizeof(texto) + BYTES_POR_TAREA
+
+    # ------------------------------------
+    # Operaciones
+    # ------------------------------------
+
+    def agregar(self, texto):
+        """Añade una tarea al final y devuelve su id"""
+        id_tarea = self._siguiente
+        self._insertar(id_tarea, texto)
+        return id_tarea
+
+    def eliminar(self, id_tarea):
+        """Borra una tarea por su id (no hace nada si no existe)"""
+        texto = self._textos.pop(id_tarea, None)
+        if texto is None:
+            return
+        # Queda un hueco en self._orden: se quita al pedir la siguiente página
+        self._borrados += 1
+        for palabra in palabras(texto):
+            ids = self._indice[palabra]
+            ids.discard(id_tarea)
+            if not ids:
+                del self._indice[palabra]
+        self._bytes -= sys.getsizeof(texto) + BYTES_POR_TAREA
+
+    def texto(self, id_tarea):
+        return self._textos[id_tarea]
+
+    def buscar(self, consulta):
+        """Ids (en orden de creación) de las tareas que contienen todas las palabras"""
+        buscadas = palabras(consulta)
+        if not buscadas:
+            return []
+        conjuntos = sorted((self._indice.get(p, set()) for p in buscadas), key=len)
+        return sorted(conjuntos[0].intersection(*conjuntos[1:]))
+
+    def pagina(self, numero, tam_pagina, ids=None):
+        """[(id, texto), ...] de la página 'numero' (empezando en 1)
+
+        Con ids (por ejemplo el resultado de buscar()) se pagina esa lista
+        en lugar de todas las tareas.
+        """
+        if ids is None:
+            self._quitar_huecos()
+            ids = self._orden
+        inicio = (numero - 1) * tam_pagina
+        return [(id_tarea, self._textos[id_tarea]) for id_tarea in ids[inicio:inicio + tam_pagina]]
+
+    def _quitar_huecos(self):
+        if self._borrados:
+            self._orden = [id_tarea for id_tarea in self._orden if id_tarea in self._textos]
+            self._borrados = 0
+
+    def bytes_memoria(self):
+        """Bytes aproximados que ocupa la lista (sin recorrerla)"""
+        return self._bytes
+
+    def __len__(self):
+        return len(self._textos)
+
+    def __contains__(self, id_tarea):
+        return id_tarea in self._textos
+
+    def __iter__(self):
+        """Recorre (id, texto) en orden de creación"""
+        return iter(self._textos.items())
+
+    # ------------------------------------
+    # Serialización (pickle)
+    # ------------------------------------
+
+    # Al moverla a disco (estado_sesion.AlmacenEstado) solo se guardan los
+    # textos: el orden y el índice se reconstruyen al cargarla
+    def __getstate__(self):
+        return {'textos': self._textos, 'siguiente': self._siguiente}
+
+    def __setstate__(self, estado):
+        self.__init__()
+        for id_tarea, texto in estado['textos'].items():
+            self._insertar(id_tarea, texto)
+        self._siguiente = max(self._siguiente, estado['siguiente'])
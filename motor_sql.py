@@ -0,0 +1,336 @@
+# ====================================
+# MOTOR SQL EMBEBIDO PARA EL DASHBOARD
+# ====================================
+# Conceptos: SQL, SQLite, DuckDB, consultas agregadas, resultados pequeños
+
+# Con pandas, cada agregación del dashboard trabaja sobre el DataFrame
+# completo en memoria y en un solo núcleo. Un motor SQL embebido (dentro del
+# mismo proceso, sin servidor) puede guardar las ventas en un archivo local
+# y devolver a Streamlit solo el resultado: unas pocas filas de totales.
+#
+#   - SQLite viene con Python (módulo sqlite3), siempre está disponible.
+#   - DuckDB es un motor analítico columnar y multinúcleo; si está instalado
+#     (pip install duckdb) se usa automáticamente porque es mucho más rápido
+#     para este tipo de consultas.
+#
+# Las consultas son las mismas que hace el dashboard: KPIs, ventas por
+# producto/región, top-N, estadísticas (describe) y una página de detalle.
+#
+# Varios procesos del servidor pueden usar la misma base de datos (ver
+# publicar_o_abrir()): el primero la carga en un archivo temporal y la
+# publica con un nombre que incluye la versión de los datos; a partir de
+# ahí todos la abren en solo lectura. Nadie borra ni recarga una base que
+# otro proceso está consultando, y DuckDB permite varios procesos a la vez
+# sobre un archivo si todos lo abren en solo lectura.
+
+import hashlib
+import math
+import os
+import pathlib
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from datos_ventas import MEDIDAS, aplicar_esquema
+
+# Nombre de la tabla de ventas dentro de la base de datos
+TABLA = 'ventas'
+
+# Columnas de la tabla (las dimensiones como texto y las medidas como enteros)
+COLUMNAS = ['Producto', 'Región'] + MEDIDAS
+
+# Filas de describe(), en el mismo orden que pandas
+ESTADISTICAS = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+
+
+def motor_disponible():
+    """Devuelve 'duckdb' si está instalado y, si no, 'sqlite'"""
+    try:
+        import duckdb  # noqa: F401
+    except ImportError:
+        return 'sqlite'
+    return 'duckdb'
+
+
+def publicar_o_abrir(cargar, version, directorio, motor='auto'):
+    """Abre en solo lectura la base de datos de una versión; si no existe, la crea
+
+    cargar(motor_sql) llena la base la primera vez. Se carga en un archivo
+    temporal de este proceso y se publica renombrándolo (os.replace), así
+    ningún proceso ve nunca una base a medio cargar. Si dos procesos la
+    crean a la vez gana el último; el otro sigue leyendo su archivo.
+    """
+    motor = motor_disponible() if motor == 'auto' else motor
+    os.makedirs(directorio, exist_ok=True)
+    nombre = hashlib.blake2b(str(version).encode('utf-8'), digest_size=8).hexdigest()
+    ruta = os.path.join(directorio, f'ventas_{motor}_{nombre}.db')
+    if not os.path.exists(ruta):
+        temporal = f'{ruta}.{os.getpid()}.tmp'
+        if os.path.exists(temporal):
+            os.remove(temporal)  # restos de un proceso anterior con el mismo pid
+        motor_sql = MotorSQL(temporal, motor=motor)
+        try:
+            cargar(motor_sql)
+        except BaseException:
+            motor_sql.cerrar()
+            os.remove(temporal)
+            raise
+        motor_sql.cerrar()
+        os.replace(temporal, ruta)
+    return MotorSQL(ruta, motor=motor, solo_lectura=True)
+
+
+def _columna(nombre):
+    """Nombre de columna entre comillas (necesario por la tilde de 'Región')"""
+    return '"' + nombre.replace('"', '""') + '"'
+
+
+def _describe_histograma(histograma):
+    """Estadísticas de describe() a partir de pares (valor, repeticiones)
+
+    Los cuartiles usan interpolación lineal entre las posiciones q*(n-1),
+    igual que pandas.
+    """
+    if not histograma:
+        return [0.0] + [np.nan] * (len(ESTADISTICAS) - 1)
+    valores = np.array([v for v, _ in histograma], dtype='float64')
+    pesos = np.array([k for _, k in histograma], dtype='int64')
+    n = int(pesos.sum())
+    media = float(np.dot(valores, pesos) / n)
+    desviacion = (math.sqrt(float(np.dot((valores - media) ** 2, pesos)) / (n - 1))
+                  if n > 1 else np.nan)
+    # acumulado[i] = posición (en el orden) de la última fila con valores[i]
+    acumulado = np.cumsum(pesos) - 1
+    cuartiles = []
+    for q in (0.25, 0.5, 0.75):
+        posicion = q * (n - 1)
+        abajo = math.floor(posicion)
+        v_abajo = valores[np.searchsorted(acumulado, abajo)]
+        v_arriba = valores[np.searchsorted(acumulado, min(abajo + 1, n - 1))]
+        cuartiles.append(float(v_abajo + (v_arriba - v_abajo) * (posicion - abajo)))
+    return [float(n), media, desviacion, float(valores[0]), *cuartiles, float(valores[-1])]
+
+
+class MotorSQL:
+    """Ejecuta los filtros y agregaciones del dashboard en SQLite o DuckDB
+
+    ruta es el archivo de la base de datos (':memory:' para no usar disco).
+    motor puede ser 'sqlite', 'duckdb' o 'auto' (DuckDB si está disponible).
+    Con solo_lectura=True la base ya debe existir y no se puede cargar.
+    Todas las consultas devuelven resultados pequeños (DataFrames o dicts).
+
+    Es seguro entre hilos: se comparte entre sesiones con @st.cache_resource.
+    """
+
+    def __init__(self, ruta=':memory:', motor='auto', solo_lectura=False):
+        self.motor = motor_disponible() if motor == 'auto' else motor
+        self.ruta = ruta
+        self.solo_lectura = solo_lectura
+        # Una conexión de SQLite o DuckDB no admite consultas simultáneas
+        # desde varios hilos (un fetch podría devolver las filas de la
+        # consulta de otra sesión): cada execute() y su fetch van juntos
+        # bajo este cerrojo
+        self._cerrojo = threading.Lock()
+        if self.motor == 'duckdb':
+            import duckdb
+            self.conexion = duckdb.connect(ruta, read_only=solo_lectura)
+        elif self.motor == 'sqlite':
+            if solo_lectura:
+                ruta = pathlib.Path(ruta).absolute().as_uri() + '?mode=ro'
+            # check_same_thread=False: Streamlit atiende cada sesión en un hilo
+            self.conexion = sqlite3.connect(ruta, check_same_thread=False, uri=solo_lectura)
+        else:
+            raise ValueError(f"Motor SQL desconocido: {motor}")
+
+    # ------------------------------------
+    # Carga de datos
+    # ------------------------------------
+
+    def cargar(self, bloques, reemplazar=True):
+        """Carga ventas en la tabla desde un DataFrame o un iterable de DataFrames
+
+        Con un iterable (por ejemplo generar_ventas_por_bloques()) se pueden
+        cargar cientos de millones de filas sin tenerlas todas en memoria.
+        """
+        if hasattr(bloques, 'columns'):
+            bloques = [bloques]
+        columnas_sql = ', '.join(_columna(c) for c in COLUMNAS)
+
+        with self._cerrojo:
+            if reemplazar:
+                self.conexion.execute(f'DROP TABLE IF EXISTS {TABLA}')
+            self.conexion.execute(
+                f'CREATE TABLE IF NOT EXISTS {TABLA} ('
+                f'{_columna("Producto")} VARCHAR, {_columna("Región")} VARCHAR, '
+                + ', '.join(f'{_columna(m)} INTEGER' for m in MEDIDAS) + ')'
+            )
+
+            for bloque in bloques:
+                bloque = bloque[COLUMNAS]
+                if self.motor == 'duckdb':
+                    # DuckDB lee el DataFrame directamente (sin pasar fila a fila)
+                    self.conexion.register('bloque_nuevo', bloque)
+                    self.conexion.execute(
+                        f'INSERT INTO {TABLA} SELECT {columnas_sql} FROM bloque_nuevo'
+                    )
+                    self.conexion.unregister('bloque_nuevo')
+                else:
+                    # .tolist() convierte a tipos de Python, que es lo que acepta sqlite3
+                    filas = zip(*(bloque[c].astype(object if c in ('Producto', 'Región') else 'int64')
+                                  .tolist() for c in COLUMNAS))
+                    marcadores = ', '.join('?' * len(COLUMNAS))
+                    self.conexion.executemany(
+                        f'INSERT INTO {TABLA} ({columnas_sql}) VALUES ({marcadores})', filas
+                    )
+
+            if self.motor == 'sqlite':
+                # Índice para que los filtros por producto y región no recorran la tabla
+                self.conexion.execute(
+                    f'CREATE INDEX IF NOT EXISTS idx_{TABLA}_dimensiones '
+                    f'ON {TABLA} ({_columna("Producto")}, {_columna("Región")})'
+                )
+            self.conexion.commit()
+
+    def cargar_parquet(self, ruta):
+        """Crea la tabla a partir de un dataset Parquet (ver almacen_parquet.py)
+
+        Con DuckDB se lee el Parquet directamente; con SQLite se carga por lotes.
+        """
+        if self.motor == 'duckdb':
+            with self._cerrojo:
+                self.conexion.execute(f'DROP TABLE IF EXISTS {TABLA}')
+                self.conexion.execute(
+                    f"CREATE TABLE {TABLA} AS SELECT {', '.join(_columna(c) for c in COLUMNAS)} "
+                    f"FROM read_parquet(?, hive_partitioning = true)", [f'{ruta}/**/*.parquet']
+                )
+            return
+        from almacen_parquet import OrigenParquet
+        self.cargar(OrigenParquet(ruta).leer_por_bloques())
+
+    # ------------------------------------
+    # Consultas
+    # ------------------------------------
+
+    @staticmethod
+    def _donde(productos=None, regiones=None):
+        """Cláusula WHERE y parámetros para las selecciones del sidebar"""
+        condiciones, parametros = [], []
+        for campo, seleccion in (('Producto', productos), ('Región', regiones)):
+            if seleccion is None:
+                continue
+            seleccion = list(seleccion)
+            if not seleccion:
+                condiciones.append('1 = 0')  # Nada seleccionado: ninguna fila
+                continue
+            condiciones.append(f'{_columna(campo)} IN ({", ".join("?" * len(seleccion))})')
+            parametros.extend(str(v) for v in seleccion)
+        donde = ' WHERE ' + ' AND '.join(condiciones) if condiciones else ''
+        return donde, parametros
+
+    def _ejecutar(self, sql, parametros=()):
+        """Ejecuta una consulta y devuelve (nombres de columna, filas)"""
+        with self._cerrojo:
+            cursor = self.conexion.execute(sql, list(parametros))
+            return [d[0] for d in cursor.description], cursor.fetchall()
+
+    def _consultar(self, sql, parametros=()):
+        """Ejecuta una consulta y devuelve un DataFrame"""
+        columnas, filas = self._ejecutar(sql, parametros)
+        return pd.DataFrame(filas, columns=columnas)
+
+    def valores(self, dimension):
+        """Valores distintos de una dimensión, ordenados (para los filtros)"""
+        c = _columna(dimension)
+        return [v for (v,) in self._ejecutar(f'SELECT DISTINCT {c} FROM {TABLA} ORDER BY 1')[1]]
+
+    def contar(self, productos=None, regiones=None):
+        """Número de ventas que cumplen los filtros"""
+        donde, parametros = self._donde(productos, regiones)
+        return int(self._ejecutar(f'SELECT COUNT(*) FROM {TABLA}{donde}', parametros)[1][0][0])
+
+    def kpis(self, productos=None, regiones=None):
+        """total_ventas, numero_ventas y ticket_promedio con los filtros dados"""
+        donde, parametros = self._donde(productos, regiones)
+        total, numero = self._ejecutar(
+            f'SELECT COALESCE(SUM({_columna("Total")}), 0), COUNT(*) FROM {TABLA}{donde}',
+            parametros,
+        )[1][0]
+        return {
+            'total_ventas': total,
+            'numero_ventas': int(numero),
+            'ticket_promedio': total / numero if numero > 0 else 0,
+        }
+
+    def ventas_por(self, dimension, productos=None, regiones=None, medida='Total'):
+        """Suma de una medida por dimensión, como df.groupby(dimension)[medida].sum()"""
+        donde, parametros = self._donde(productos, regiones)
+        sql = (f'SELECT {_columna(dimension)}, SUM({_columna(medida)}) AS {_columna(medida)} '
+               f'FROM {TABLA}{donde} GROUP BY 1 ORDER BY 1')
+        return self._consultar(sql, parametros).set_index(dimension)[medida]
+
+    def top(self, dimension, n=5, productos=None, regiones=None, medida='Total'):
+        """Las n categorías con más ventas (el motor ordena y corta con LIMIT)"""
+        donde, parametros = self._donde(productos, regiones)
+        sql = (f'SELECT {_columna(dimension)}, SUM({_columna(medida)}) AS {_columna(medida)} '
+               f'FROM {TABLA}{donde} GROUP BY 1 ORDER BY 2 DESC, 1 LIMIT {int(n)}')
+        return self._consultar(sql, parametros).set_index(dimension)[medida]
+
+    def describe(self, productos=None, regiones=None, columnas=MEDIDAS):
+        """Estadísticas con el formato de df.describe()
+
+        Con DuckDB todo sale de una sola consulta (quantile_cont da los
+        cuartiles exactos). SQLite no tiene función de cuantiles: se pide el
+        histograma de cada columna (GROUP BY valor) y las estadísticas se
+        calculan sobre él. Las medidas son enteros con pocos valores
+        distintos, así que el histograma es pequeño aunque haya millones de filas.
+        """
+        donde, parametros = self._donde(productos, regiones)
+        if self.motor == 'duckdb':
+            return self._describe_duckdb(donde, parametros, columnas)
+        resultado = {}
+        for columna in columnas:
+            c = _columna(columna)
+            histograma = self._ejecutar(
+                f'SELECT {c}, COUNT(*) FROM {TABLA}{donde} GROUP BY 1 ORDER BY 1', parametros
+            )[1]
+            resultado[columna] = _describe_histograma(histograma)
+        return pd.DataFrame(resultado, index=ESTADISTICAS)
+
+    def _describe_duckdb(self, donde, parametros, columnas):
+        """describe() con una única consulta en DuckDB"""
+        expresiones = []
+        for columna in columnas:
+            c = _columna(columna)
+            expresiones += [f'COUNT({c})', f'AVG({c})', f'STDDEV_SAMP({c})', f'MIN({c})',
+                            f'QUANTILE_CONT({c}, [0.25, 0.5, 0.75])', f'MAX({c})']
+        fila = self._ejecutar(
+            f'SELECT {", ".join(expresiones)} FROM {TABLA}{donde}', parametros
+        )[1][0]
+        resultado = {}
+        for i, columna in enumerate(columnas):
+            n, media, desviacion, minimo, cuartiles, maximo = fila[6 * i:6 * i + 6]
+            cuartiles = cuartiles or [None] * 3
+            resultado[columna] = [float(v) if v is not None else np.nan for v in
+                                  (n, media, desviacion, minimo, *cuartiles, maximo)]
+        return pd.DataFrame(resultado, index=ESTADISTICAS)
+
+    def pagina(self, pagina, tam_pagina, productos=None, regiones=None,
+               orden='Total', ascendente=False):
+        """Una página de las ventas filtradas, ordenadas por la columna orden
+
+        Solo viajan a Python las filas de la página (LIMIT/OFFSET).
+        Los empates se ordenan por rowid para que las páginas sean estables.
+        """
+        donde, parametros = self._donde(productos, regiones)
+        desempate = 'rowid'
+        sql = (f'SELECT {", ".join(_columna(c) for c in COLUMNAS)} FROM {TABLA}{donde} '
+               f'ORDER BY {_columna(orden)} {"ASC" if ascendente else "DESC"}, {desempate} '
+               f'LIMIT {int(tam_pagina)} OFFSET {int((pagina - 1) * tam_pagina)}')
+        return aplicar_esquema(self._consultar(sql, parametros))
+
+    def cerrar(self):
+        """Cierra la conexión con la base de datos"""
+        with self._cerrojo:
+            self.conexion.close()
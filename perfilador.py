@@ -0,0 +1,306 @@
+# ====================================
+# PERFILADOR DE EJECUCIONES
+# ====================================
+# Conceptos: medir antes de optimizar, secciones con nombre,
+#            tamaño de los mensajes, formato Chrome trace
+
+# Streamlit vuelve a ejecutar el script entero en cada interacción (ver
+# app_05_estado.py). Si una ejecución tarda 2 segundos, ¿qué parte es?
+# ¿Cargar los datos, filtrar, un gráfico, la tabla?
+#
+# Este módulo mide:
+#   - El tiempo de cada sección con nombre del script.
+#   - Cada elemento que se envía al navegador (st.write, st.dataframe,
+#     st.bar_chart...): su tipo, los bytes del mensaje y el tiempo de
+#     serializarlo. Para eso se intercepta el envío de mensajes de la sesión.
+#
+# Uso en una app:
+#
+#     perfil = iniciar_perfil('app_01_fundamentos')
+#     perfil.marcar('Parte 1: texto')     # termina la sección anterior
+#     ...
+#     with perfil.seccion('Gráfico'):     # o una sección con bloque
+#         st.bar_chart(datos)
+#     ...
+#     perfil.finalizar()                  # al final del script
+#
+# El panel del sidebar aparece con la variable de entorno PERFILADOR=1 o
+# añadiendo ?perfil=1 a la URL, y permite descargar la ejecución en JSON o
+# en formato Chrome trace (se abre en chrome://tracing o en ui.perfetto.dev).
+# Las ejecuciones más lentas que PERFILADOR_UMBRAL_MS se registran siempre
+# con logging (y en PERFILADOR_ARCHIVO, si se indica, una línea JSON por
+# ejecución), para poder diagnosticarlas en producción.
+
+import json
+import logging
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+# Ejecuciones más lentas que esto (ms) se registran como lentas
+UMBRAL_LENTA_MS = float(os.environ.get('PERFILADOR_UMBRAL_MS', 1000))
+
+# Archivo JSONL donde se guardan las ejecuciones lentas (opcional)
+ARCHIVO_LENTAS = os.environ.get('PERFILADOR_ARCHIVO')
+
+# Ejecuciones que se recuerdan por sesión (para el historial del panel)
+MAX_HISTORIAL = 20
+
+# Elementos más grandes que se muestran en el panel
+MAX_ELEMENTOS_PANEL = 10
+
+
+def perfilador_activo():
+    """True si el panel está activado (variable de entorno o ?perfil=1 en la URL)"""
+    if os.environ.get('PERFILADOR', '') not in ('', '0'):
+        return True
+    try:
+        return st.query_params.get('perfil', '0') not in ('', '0')
+    except Exception:
+        return False  # Fuera de un servidor de Streamlit
+
+
+def _contexto():
+    """Contexto de ejecución de la sesión actual (None si no hay servidor)"""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        return get_script_run_ctx(suppress_warning=True)
+    except Exception:
+        return None
+
+
+class Perfilador:
+    """Tiempos por sección y elementos enviados durante UNA ejecución del script"""
+
+    def __init__(self, app, medir_elementos=False):
+        self.app = app
+        self.inicio = time.perf_counter()
+        self.fecha = time.time()
+        self.secciones = []   # dicts: nombre, nivel, inicio_ms, ms
+        self.elementos = []   # dicts: seccion, tipo, bytes, ms_serializar, inicio_ms
+        self.total_ms = None
+        self._abiertas = []   # pila de secciones abiertas
+        self._marcada = None  # sección abierta con marcar()
+        self._contexto = None
+        if medir_elementos:
+            self._interceptar_envios()
+
+    # ------------------------------------
+    # Secciones
+    # ------------------------------------
+
+    def _ms(self):
+        return (time.perf_counter() - self.inicio) * 1000
+
+    def _abrir(self, nombre):
+        seccion = {'nombre': nombre, 'nivel': len(self._abiertas),
+                   'inicio_ms': self._ms(), 'ms': None}
+        self.secciones.append(seccion)
+        self._abiertas.append(seccion)
+        return seccion
+
+    def _cerrar(self, seccion):
+        seccion['ms'] = self._ms() - seccion['inicio_ms']
+        if seccion in self._abiertas:
+            self._abiertas.remove(seccion)
+
+    def marcar(self, nombre):
+        """Termina la sección marcada anterior y empieza otra llamada nombre
+
+        Pensado para scripts lineales: basta una línea al principio de cada
+        parte, sin cambiar la indentación del código.
+        """
+        if self.total_ms is not None:
+            return
+        if self._marcada is not None:
+            self._cerrar(self._marcada)
+        self._marcada = self._abrir(nombre)
+
+    @contextmanager
+    def seccion(self, nombre):
+        """Mide el bloque with como una sección (se pueden anidar)"""
+        if self.total_ms is not None:
+            # Ejecución ya terminada (por ejemplo, un fragmento que se re-ejecuta solo)
+            yield
+            return
+        seccion = self._abrir(nombre)
+        try:
+            yield
+        finally:
+            self._cerrar(seccion)
+
+    def _seccion_actual(self):
+        return self._abiertas[-1]['nombre'] if self._abiertas else '(sin sección)'
+
+    # ------------------------------------
+    # Elementos enviados al navegador
+    # ------------------------------------
+
+    def _interceptar_envios(self):
+        """Envuelve el envío de mensajes de la sesión para medir cada elemento
+
+        Si una ejecución anterior terminó sin finalizar() (por ejemplo por
+        st.rerun() o una excepción), se recupera la función original.
+        """
+        contexto = _contexto()
+        if contexto is None:
+            return
+        original = getattr(contexto, '_enqueue_sin_perfil', contexto.enqueue)
+        contexto._enqueue_sin_perfil = original
+
+        def enviar(mensaje):
+            inicio = time.perf_counter()
+            tamano = len(mensaje.SerializeToString())
+            ms_serializar = (time.perf_counter() - inicio) * 1000
+            if mensaje.WhichOneof('type') == 'delta':
+                delta = mensaje.delta
+                tipo = delta.WhichOneof('type')
+                if tipo == 'new_element':
+                    tipo = delta.new_element.WhichOneof('type')
+                self.elementos.append({
+                    'seccion': self._seccion_actual(), 'tipo': tipo, 'bytes': tamano,
+                    'ms_serializar': ms_serializar, 'inicio_ms': self._ms(),
+                })
+            original(mensaje)
+
+        contexto.enqueue = enviar
+        self._contexto = contexto
+
+    def _restaurar_envios(self):
+        if self._contexto is not None:
+            self._contexto.enqueue = self._contexto._enqueue_sin_perfil
+            del self._contexto._enqueue_sin_perfil
+            self._contexto = None
+
+    # ------------------------------------
+    # Resultados
+    # ------------------------------------
+
+    def finalizar(self, mostrar_panel=None):
+        """Cierra las secciones, guarda la ejecución y muestra el panel si está activo
+
+        Llamar al final del script. Devuelve el resumen de la ejecución.
+        """
+        if self.total_ms is None:
+            for seccion in list(self._abiertas):
+                self._cerrar(seccion)
+            self.total_ms = self._ms()
+            self._restaurar_envios()
+            self._registrar()
+        if mostrar_panel is None:
+            mostrar_panel = perfilador_activo()
+        if mostrar_panel:
+            mostrar_panel_perfil(self)
+        return self.resumen()
+
+    def resumen(self):
+        """Diccionario con toda la ejecución (es lo que se exporta como JSON)"""
+        return {
+            'app': self.app,
+            'fecha': self.fecha,
+            'total_ms': self.total_ms,
+            'secciones': self.secciones,
+            'elementos': self.elementos,
+            'bytes_enviados': sum(e['bytes'] for e in self.elementos),
+        }
+
+    def tabla_secciones(self):
+        """Filas (sección, ms, % del total, elementos, KB) para mostrar en una tabla"""
+        total = self.total_ms or self._ms()
+        filas = []
+        for seccion in self.secciones:
+            elementos = [e for e in self.elementos if e['seccion'] == seccion['nombre']]
+            ms = seccion['ms'] if seccion['ms'] is not None else self._ms() - seccion['inicio_ms']
+            filas.append({
+                'Sección': ('  ' * (seccion['nivel'] - 1) + '└ ' if seccion['nivel'] else '')
+                           + seccion['nombre'],
+                'ms': round(ms, 1),
+                '%': round(100 * ms / total, 1) if total else 0.0,
+                'Elementos': len(elementos),
+                'KB': round(sum(e['bytes'] for e in elementos) / 1024, 1),
+            })
+        return filas
+
+    def chrome_trace(self):
+        """La ejecución en formato Chrome trace (JSON para chrome://tracing o Perfetto)
+
+        Las secciones son eventos completos ("X") con su duración; cada
+        elemento es un evento de la duración de su serialización, con el
+        tipo y los bytes como argumentos. Los tiempos van en microsegundos.
+        """
+        pid = os.getpid()
+        eventos = [{'name': f'{self.app} (ejecución)', 'ph': 'X', 'ts': 0,
+                    'dur': (self.total_ms or 0) * 1000, 'pid': pid, 'tid': 1}]
+        for seccion in self.secciones:
+            eventos.append({'name': seccion['nombre'], 'cat': 'seccion', 'ph': 'X',
+                            'ts': seccion['inicio_ms'] * 1000,
+                            'dur': (seccion['ms'] or 0) * 1000, 'pid': pid, 'tid': 1})
+        for elemento in self.elementos:
+            eventos.append({'name': elemento['tipo'] or 'mensaje', 'cat': 'elemento', 'ph': 'X',
+                            'ts': elemento['inicio_ms'] * 1000,
+                            'dur': elemento['ms_serializar'] * 1000, 'pid': pid, 'tid': 2,
+                            'args': {'bytes': elemento['bytes'], 'seccion': elemento['seccion']}})
+        return {'traceEvents': eventos, 'displayTimeUnit': 'ms',
+                'otherData': {'app': self.app, 'fecha': self.fecha}}
+
+    def _registrar(self):
+        """Guarda la ejecución en el historial de la sesión y avisa si es lenta"""
+        try:
+            historial = st.session_state.setdefault('_perfiles', deque(maxlen=MAX_HISTORIAL))
+            historial.append({'app': self.app, 'total_ms': self.total_ms,
+                              'bytes_enviados': sum(e['bytes'] for e in self.elementos)})
+        except Exception:
+            pass  # Sin sesión (por ejemplo, al importar el script desde Python)
+
+        if self.total_ms < UMBRAL_LENTA_MS:
+            return
+        lentas = sorted(self.tabla_secciones(), key=lambda f: f['ms'], reverse=True)[:3]
+        logger.warning("Ejecución lenta de %s: %.0f ms (secciones más lentas: %s)",
+                       self.app, self.total_ms,
+                       ', '.join(f"{f['Sección'].strip()} {f['ms']:.0f} ms" for f in lentas))
+        if ARCHIVO_LENTAS:
+            with open(ARCHIVO_LENTAS, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(self.resumen(), ensure_ascii=False) + '\n')
+
+
+def iniciar_perfil(app):
+    """Empieza a perfilar la ejecución actual del script y devuelve el Perfilador
+
+    Los tiempos de las secciones se miden siempre (cuesta muy poco); los
+    elementos enviados solo se miden con el perfilador activo, porque
+    serializar cada mensaje una vez más sí tiene coste.
+    """
+    return Perfilador(app, medir_elementos=perfilador_activo())
+
+
+def mostrar_panel_perfil(perfil):
+    """Panel del sidebar con los tiempos de la ejecución y las descargas"""
+    with st.sidebar.expander(f"⏱️ Perfil: {perfil.total_ms:,.0f} ms", expanded=False):
+        st.caption(f"{len(perfil.elementos)} elementos, "
+                   f"{sum(e['bytes'] for e in perfil.elementos) / 1024:,.1f} KB enviados")
+        st.dataframe(perfil.tabla_secciones(), hide_index=True)
+
+        if perfil.elementos:
+            st.write("**Elementos más pesados**")
+            mayores = sorted(perfil.elementos, key=lambda e: e['bytes'],
+                             reverse=True)[:MAX_ELEMENTOS_PANEL]
+            st.dataframe([{'Sección': e['seccion'], 'Tipo': e['tipo'],
+                           'KB': round(e['bytes'] / 1024, 1),
+                           'ms serializar': round(e['ms_serializar'], 2)} for e in mayores],
+                         hide_index=True)
+
+        historial = st.session_state.get('_perfiles')
+        if historial and len(historial) > 1:
+            st.write("**Últimas ejecuciones (ms)**")
+            st.line_chart([h['total_ms'] for h in historial], height=120)
+
+        nombre = f"perfil_{perfil.app}_{int(perfil.fecha)}"
+        st.download_button("⬇️ JSON", json.dumps(perfil.resumen(), ensure_ascii=False, indent=1),
+                           file_name=f"{nombre}.json", mime='application/json')
+        st.download_button("⬇️ Chrome trace", json.dumps(perfil.chrome_trace()),
+                           file_name=f"{nombre}.trace.json", mime='application/json')
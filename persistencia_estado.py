@@ -0,0 +1,378 @@
+# ====================================
+# PERSISTENCIA DEL ESTADO ENTRE REINICIOS
+# ====================================
+# Conceptos: escritura diferida (write-behind), escrituras por lotes,
+#            diario de solo añadir (append-only), compactación, SQLite
+
+# st.session_state (y estado_sesion.AlmacenEstado) solo viven mientras el
+# servidor está en marcha: al reiniciarlo, el contador y las tareas de
+# app_05_estado.py se pierden.
+#
+# DiarioEstado guarda cada cambio en disco sin hacer esperar a la app:
+#   - fijar(), agregar(), poner() y quitar() solo añaden la operación a
+#     una lista en memoria; la re-ejecución no toca el disco.
+#   - Un hilo escribe las operaciones pendientes por lotes (todas las que
+#     se acumulen durante INTERVALO_ESCRITURA segundos) en una tabla
+#     "diario" de SQLite a la que solo se añaden filas: una transacción
+#     por lote, en lugar de una por clic.
+#   - Agregar o borrar una tarea guarda solo esa tarea, no la lista entera.
+#   - Cada cierto tiempo el diario se compacta: las operaciones se aplican
+#     sobre la tabla "valores" (el último valor de cada clave) y se borran.
+#
+# Al cerrar el servidor se escribe todo lo pendiente. Si el proceso muere de
+# golpe (kill -9) se pierden, como mucho, los cambios de los últimos
+# INTERVALO_ESCRITURA segundos.
+#
+# Si escribir un lote falla (disco lleno, base bloqueada...), el lote vuelve
+# a la cola y se reintenta esperando cada vez más (hasta ESPERA_MAXIMA
+# segundos): el hilo de escritura no se detiene por un error.
+#
+# Al arrancar, cargar() lee el estado de un usuario con dos consultas por
+# índice: su fila de "valores" y sus pocas operaciones aún sin compactar.
+#
+# Los identificadores de sesión de Streamlit cambian en cada reinicio, así
+# que el estado se guarda por usuario (ver id_persistente()):
+#   - Si la app tiene inicio de sesión (st.login, configurado en
+#     .streamlit/secrets.toml), se usa la identidad que da el proveedor.
+#     No va en la URL y nadie más puede usarla.
+#   - Si no, un identificador aleatorio en la URL (?usuario=...), que el
+#     navegador conserva al recargar o reconectarse. ESE ENLACE ES UNA
+#     CREDENCIAL: quien lo tenga puede ver y cambiar el estado guardado de
+#     ese usuario, así que no debe compartirse. Solo se aceptan
+#     identificadores con el formato de los generados (32 caracteres
+#     hexadecimales), para que nadie pueda elegir uno fácil de adivinar.
+#
+# Los valores se guardan como JSON (números, textos, listas, diccionarios).
+
+import atexit
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Base de datos con el estado guardado
+RUTA_DIARIO = os.path.join(os.environ.get('ESTADO_DIRECTORIO', '.estado_sesiones'), 'persistente.db')
+
+# Segundos que se acumulan operaciones antes de escribirlas en un lote
+INTERVALO_ESCRITURA = 0.5
+
+# Se compacta al superar estas operaciones en el diario, o cada tantos segundos
+OPERACIONES_COMPACTACION = 5_000
+INTERVALO_COMPACTACION = 5 * 60
+
+# Espera máxima (segundos) entre reintentos de un lote que no se pudo escribir
+ESPERA_MAXIMA = 30
+
+# Reintentos de un lote al cerrar, antes de darlo por perdido
+REINTENTOS_AL_CERRAR = 3
+
+# Formato de los identificadores de usuario de la URL (uuid4().hex)
+FORMATO_ID_URL = re.compile(r'[0-9a-f]{32}')
+
+
+def aplicar_operacion(valor, operacion, dato):
+    """Aplica una operación del diario al valor guardado de una clave"""
+    if operacion == 'fijar':
+        return dato
+    if operacion == 'agregar':
+        valor = [] if valor is None else valor
+        valor.append(dato)
+        return valor
+    # Diccionarios: las subclaves se guardan como texto (como las claves JSON)
+    if operacion == 'poner':
+        valor = {} if valor is None else valor
+        subclave, elemento = dato
+        valor[str(subclave)] = elemento
+        return valor
+    if operacion == 'quitar':
+        valor = {} if valor is None else valor
+        valor.pop(str(dato), None)
+        return valor
+    raise ValueError(f"Operación desconocida en el diario: {operacion!r}")
+
+
+def id_persistente(parametro='usuario'):
+    """Identificador del usuario que sobrevive a los reinicios del servidor
+
+    Con inicio de sesión (st.user.is_logged_in) es la identidad del
+    proveedor ('sub' o, si no lo hay, el correo), y no se expone en la URL.
+    Sin él se guarda en la URL: la primera vez se crea uno nuevo, y al
+    recargar la página o reconectarse tras un reinicio el navegador lo
+    vuelve a enviar. Ese enlace da acceso al estado guardado (ver la
+    cabecera del módulo); un valor con otro formato se reemplaza.
+    """
+    import streamlit as st
+
+    if st.user.get('is_logged_in'):
+        return 'usuario:' + (st.user.get('sub') or st.user.get('email'))
+    if not FORMATO_ID_URL.fullmatch(st.query_params.get(parametro, '')):
+        st.query_params[parametro] = uuid.uuid4().hex
+    return st.query_params[parametro]
+
+
+class DiarioEstado:
+    """Estado por usuario guardado en disco con escritura diferida y por lotes
+
+    Es seguro entre hilos: se comparte entre sesiones con @st.cache_resource.
+    Varios procesos del servidor pueden compartir la misma base de datos.
+    """
+
+    def __init__(self, ruta=RUTA_DIARIO, intervalo=INTERVALO_ESCRITURA,
+                 operaciones_compactacion=OPERACIONES_COMPACTACION,
+                 intervalo_compactacion=INTERVALO_COMPACTACION):
+        self.ruta = ruta
+        self.intervalo = intervalo
+        self.operaciones_compactacion = operaciones_compactacion
+        self.intervalo_compactacion = intervalo_compactacion
+        # Cada operación se identifica por (origen, número): así cargar() no
+        # aplica dos veces una operación que ya esté escrita
+        self._origen = uuid.uuid4().hex
+        self._numero = 0
+        self._pendientes = []   # operaciones aún sin escribir
+        self._en_vuelo = []     # lote que se está escribiendo ahora
+        self._condicion = threading.Condition()
+        self._cerrado = False
+        self._escritor_activo = True
+        self.lotes = 0
+        self.operaciones_escritas = 0
+        self.compactaciones = 0
+        self.errores = 0
+
+        os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False, timeout=30)
+        self._conexion.execute('PRAGMA journal_mode=WAL')
+        # Con WAL, NORMAL no sincroniza el disco en cada transacción (solo al
+        # pasar el WAL a la base): basta para no perder nada si cae el proceso
+        self._conexion.execute('PRAGMA synchronous=NORMAL')
+        self._conexion.executescript("""
+            CREATE TABLE IF NOT EXISTS valores (
+                usuario TEXT, clave TEXT, valor TEXT, PRIMARY KEY (usuario, clave));
+            CREATE TABLE IF NOT EXISTS diario (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, origen TEXT, numero INTEGER,
+                usuario TEXT, clave TEXT, operacion TEXT, dato TEXT);
+            CREATE INDEX IF NOT EXISTS diario_usuario ON diario (usuario);
+        """)
+        # Conexión propia para cargar(): con WAL, cada lectura ve una foto
+        # consistente de la base aunque el hilo de escritura esté escribiendo
+        self._lectura = sqlite3.connect(ruta, check_same_thread=False, timeout=30,
+                                        isolation_level=None)
+        self._ultima_compactacion = time.time()
+        self._operaciones_sin_compactar = self._conexion.execute(
+            'SELECT COUNT(*) FROM diario').fetchone()[0]
+
+        self._hilo = threading.Thread(target=self._escribir_en_segundo_plano,
+                                      name='diario-estado', daemon=True)
+        self._hilo.start()
+        atexit.register(self.cerrar)
+
+    # ------------------------------------
+    # Operaciones (no tocan el disco)
+    # ------------------------------------
+
+    def _anotar(self, usuario, clave, operacion, dato):
+        # Se serializa ya: la app puede seguir modificando su objeto
+        texto = json.dumps(dato, ensure_ascii=False)
+        with self._condicion:
+            if self._cerrado:
+                raise RuntimeError("El diario de estado está cerrado")
+            self._numero += 1
+            self._pendientes.append((self._origen, self._numero, usuario, clave, operacion, texto))
+            self._condicion.notify()
+
+    def fijar(self, usuario, clave, valor):
+        """Guarda el nuevo valor de una clave"""
+        self._anotar(usuario, clave, 'fijar', valor)
+
+    def agregar(self, usuario, clave, elemento):
+        """Añade un elemento a la lista guardada en una clave"""
+        self._anotar(usuario, clave, 'agregar', elemento)
+
+    def poner(self, usuario, clave, subclave, elemento):
+        """Guarda un elemento en el diccionario de una clave (valor[subclave] = elemento)"""
+        self._anotar(usuario, clave, 'poner', [subclave, elemento])
+
+    def quitar(self, usuario, clave, subclave):
+        """Borra un elemento del diccionario de una clave"""
+        self._anotar(usuario, clave, 'quitar', subclave)
+
+    # ------------------------------------
+    # Lectura
+    # ------------------------------------
+
+    def cargar(self, usuario):
+        """Estado guardado de un usuario, como diccionario {clave: valor}
+
+        Incluye las operaciones que todavía no se han escrito en disco.
+        """
+        with self._condicion:
+            # Mientras se tiene el cerrojo, el hilo de escritura no puede dar
+            # por terminado un lote: lo que no esté en la foto de la base
+            # sigue en self._en_vuelo o self._pendientes. compactar() no
+            # toma el cerrojo porque no hace falta: pasa las operaciones del
+            # diario a "valores" en una sola transacción, y la foto ve la
+            # base o antes o después de compactar, nunca a medias.
+            self._lectura.execute('BEGIN')
+            try:
+                filas = self._lectura.execute(
+                    'SELECT clave, valor FROM valores WHERE usuario = ?', (usuario,)).fetchall()
+                operaciones = self._lectura.execute(
+                    'SELECT origen, numero, clave, operacion, dato FROM diario '
+                    'WHERE usuario = ? ORDER BY id', (usuario,)).fetchall()
+            finally:
+                self._lectura.execute('COMMIT')
+            escritas = {(origen, numero) for origen, numero, *_ in operaciones}
+            operaciones += [(origen, numero, clave, operacion, dato)
+                            for origen, numero, u, clave, operacion, dato
+                            in self._en_vuelo + self._pendientes
+                            if u == usuario and (origen, numero) not in escritas]
+
+        estado = {clave: json.loads(valor) for clave, valor in filas}
+        for _, _, clave, operacion, dato in operaciones:
+            estado[clave] = aplicar_operacion(estado.get(clave), operacion, json.loads(dato))
+        return estado
+
+    # ------------------------------------
+    # Escritura por lotes y compactación
+    # ------------------------------------
+
+    def _escribir_en_segundo_plano(self):
+        try:
+            self._bucle_escritura()
+        finally:
+            # vaciar() no debe quedarse esperando a un hilo que ya no escribe
+            with self._condicion:
+                self._escritor_activo = False
+                self._condicion.notify_all()
+
+    def _bucle_escritura(self):
+        fallos = 0
+        while True:
+            with self._condicion:
+                while not self._pendientes and not self._cerrado:
+                    self._condicion.wait()
+                if not self._pendientes and self._cerrado:
+                    return
+            # Se deja que se acumulen más operaciones para el mismo lote
+            if not self._cerrado:
+                time.sleep(self.intervalo)
+            with self._condicion:
+                self._en_vuelo, self._pendientes = self._pendientes, []
+            try:
+                self._escribir_lote(self._en_vuelo)
+            except Exception:
+                fallos += 1
+                self.errores += 1
+                # El lote vuelve a la cola, delante de lo anotado después
+                with self._condicion:
+                    self._pendientes = self._en_vuelo + self._pendientes
+                    self._en_vuelo = []
+                    pendientes = len(self._pendientes)
+                if self._cerrado and fallos >= REINTENTOS_AL_CERRAR:
+                    logger.exception("No se pudo escribir el diario de estado al cerrar: "
+                                     "se pierden %d operaciones", pendientes)
+                    return
+                espera = min(self.intervalo * 2 ** fallos, ESPERA_MAXIMA)
+                logger.exception("Error al escribir el diario de estado (intento %d); "
+                                 "se reintenta en %.1f s", fallos, espera)
+                # cerrar() interrumpe la espera para reintentar enseguida
+                with self._condicion:
+                    self._condicion.wait_for(lambda: self._cerrado, espera)
+                continue
+            fallos = 0
+            with self._condicion:
+                self._en_vuelo = []
+                self._condicion.notify_all()
+            if (self._operaciones_sin_compactar >= self.operaciones_compactacion
+                    or time.time() - self._ultima_compactacion >= self.intervalo_compactacion):
+                try:
+                    self.compactar()
+                except Exception:
+                    # Las operaciones siguen en el diario: se compactarán más tarde
+                    self.errores += 1
+                    logger.exception("Error al compactar el diario de estado")
+
+    def _escribir_lote(self, lote):
+        with self._conexion:
+            self._conexion.executemany(
+                'INSERT INTO diario (origen, numero, usuario, clave, operacion, dato) '
+                'VALUES (?, ?, ?, ?, ?, ?)', lote)
+        self.lotes += 1
+        self.operaciones_escritas += len(lote)
+        self._operaciones_sin_compactar += len(lote)
+
+    def compactar(self):
+        """Aplica las operaciones del diario a la tabla de valores y las borra"""
+        with self._conexion:
+            # BEGIN IMMEDIATE toma el bloqueo de escritura ANTES de leer el
+            # diario: si otro proceso compacta a la vez, esta transacción
+            # espera a que termine y ya no ve las operaciones que aquel
+            # aplicó y borró (si no, un 'agregar' se aplicaría dos veces)
+            self._conexion.execute('BEGIN IMMEDIATE')
+            ultima = self._conexion.execute('SELECT MAX(id) FROM diario').fetchone()[0]
+            if ultima is not None:
+                operaciones = self._conexion.execute(
+                    'SELECT usuario, clave, operacion, dato FROM diario WHERE id <= ? ORDER BY id',
+                    (ultima,)).fetchall()
+                nuevos = {}
+                for usuario, clave, operacion, dato in operaciones:
+                    if (usuario, clave) not in nuevos:
+                        fila = self._conexion.execute(
+                            'SELECT valor FROM valores WHERE usuario = ? AND clave = ?',
+                            (usuario, clave)).fetchone()
+                        nuevos[usuario, clave] = json.loads(fila[0]) if fila else None
+                    nuevos[usuario, clave] = aplicar_operacion(nuevos[usuario, clave], operacion,
+                                                               json.loads(dato))
+                self._conexion.executemany(
+                    'INSERT OR REPLACE INTO valores VALUES (?, ?, ?)',
+                    [(usuario, clave, json.dumps(valor, ensure_ascii=False))
+                     for (usuario, clave), valor in nuevos.items()])
+                self._conexion.execute('DELETE FROM diario WHERE id <= ?', (ultima,))
+        self._operaciones_sin_compactar = 0
+        self._ultima_compactacion = time.time()
+        self.compactaciones += 1
+
+    def vaciar(self, timeout=None):
+        """Espera a que todas las operaciones anotadas estén escritas en disco
+
+        Devuelve False si se agota el timeout o si el hilo de escritura ya
+        terminó sin poder escribirlas.
+        """
+        with self._condicion:
+            self._condicion.wait_for(
+                lambda: (not self._pendientes and not self._en_vuelo) or not self._escritor_activo,
+                timeout)
+            return not self._pendientes and not self._en_vuelo
+
+    def estadisticas(self):
+        with self._condicion:
+            pendientes = len(self._pendientes) + len(self._en_vuelo)
+        return {
+            'pendientes': pendientes,
+            'lotes': self.lotes,
+            'operaciones_escritas': self.operaciones_escritas,
+            'sin_compactar': self._operaciones_sin_compactar,
+            'compactaciones': self.compactaciones,
+            'errores': self.errores,
+        }
+
+    def cerrar(self):
+        """Escribe lo pendiente, compacta y cierra la base de datos"""
+        with self._condicion:
+            if self._cerrado:
+                return
+            self._cerrado = True
+            self._condicion.notify_all()
+        self._hilo.join()
+        try:
+            self.compactar()
+        except Exception:
+            logger.exception("No se pudo compactar el diario de estado al cerrar")
+        finally:
+            self._conexion.close()
+            self._lectura.close()
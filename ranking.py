@@ -0,0 +1,59 @@
+# ====================================
+# RANKINGS TOP-K
+# ====================================
+# Conceptos: top-K con np.argpartition, agregar una sola vez, "Otros"
+
+# Los rankings del dashboard (Top 5 productos, Top 3 regiones) se hacían con
+# groupby().sum().sort_values().head(): un segundo groupby idéntico al de los
+# gráficos y una ordenación completa para quedarse con 3 o 5 valores.
+#
+# Aquí cada dimensión se agrega UNA vez por ejecución y ese mismo resultado
+# alimenta el gráfico y la pestaña del ranking. Para el top-K se usa
+# np.argpartition, que separa los K mayores en tiempo lineal; solo esos K
+# se ordenan. Con 100.000 productos (nivel SKU) la diferencia es grande, y
+# el gráfico muestra los mayores más una barra "Otros" en lugar de 100.000 barras.
+
+import numpy as np
+import pandas as pd
+
+# Máximo de barras en un gráfico antes de agrupar el resto en "Otros"
+MAX_BARRAS = 20
+
+# Etiqueta de la barra que agrupa el resto
+ETIQUETA_OTROS = 'Otros'
+
+
+def top_k(serie, k):
+    """Los k mayores valores de una Series, de mayor a menor
+
+    Equivale a serie.sort_values(ascending=False).head(k), pero con
+    np.argpartition (O(n)) seguido de ordenar solo k valores (O(k log k)).
+    En empates gana la etiqueta que aparece antes en la serie.
+    """
+    n = len(serie)
+    if k <= 0 or n == 0:
+        return serie.iloc[:0]
+    valores = serie.to_numpy(dtype='float64', na_value=-np.inf)
+    if k < n:
+        candidatos = np.argpartition(-valores, k - 1)[:k]
+    else:
+        candidatos = np.arange(n)
+    # Ordenar los candidatos por valor descendente y, en empates, por posición
+    orden = np.lexsort((candidatos, -valores[candidatos]))
+    return serie.iloc[candidatos[orden]]
+
+
+def agrupar_otros(serie, max_barras=MAX_BARRAS, etiqueta=ETIQUETA_OTROS):
+    """Prepara una serie para un gráfico de barras con como mucho max_barras
+
+    Si hay pocas categorías se devuelve tal cual (en su orden original).
+    Si hay más, se muestran las max_barras - 1 mayores y una barra 'Otros'
+    con la suma del resto.
+    """
+    if len(serie) <= max_barras:
+        return serie
+    mayores = top_k(serie, max_barras - 1)
+    resto = serie.sum() - mayores.sum()
+    otros = pd.Series([resto], index=[etiqueta], name=serie.name)
+    mayores = mayores.set_axis(mayores.index.astype(str))
+    return pd.concat([mayores, otros])
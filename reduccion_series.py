@@ -0,0 +1,145 @@
+# ====================================
+# REDUCCIÓN DE SERIES PARA GRÁFICOS
+# ====================================
+# Conceptos: downsampling, mínimo/máximo por tramo, LTTB, numpy vectorizado
+
+# st.line_chart() envía TODOS los puntos al navegador. Con millones de filas
+# el mensaje pesa decenas de MB y el navegador tarda segundos en dibujarlo,
+# aunque la pantalla solo tenga unos pocos miles de píxeles de ancho.
+#
+# Aquí reducimos la serie a un "presupuesto de píxeles" antes de graficarla:
+#   - minmax: divide la serie en tramos y se queda con el mínimo y el máximo
+#     de cada uno. Es muy rápido y conserva los picos.
+#   - lttb (Largest-Triangle-Three-Buckets): en cada tramo elige el punto que
+#     forma el triángulo de mayor área con sus vecinos. Visualmente es el más
+#     fiel con pocos puntos.
+# En ambos casos se devuelven puntos reales de la serie (no promedios).
+
+import numpy as np
+import pandas as pd
+
+# Puntos máximos por defecto (aprox. el ancho en píxeles de un gráfico)
+MAX_PUNTOS = 1_000
+
+
+def _eje_x(serie):
+    """Valores numéricos del eje X: el índice si es numérico o de fechas, si no la posición"""
+    indice = serie.index
+    if pd.api.types.is_numeric_dtype(indice) or pd.api.types.is_datetime64_any_dtype(indice):
+        return np.asarray(indice, dtype='float64')
+    return np.arange(len(serie), dtype='float64')
+
+
+def indices_minmax(y, n_tramos):
+    """Posiciones del mínimo y el máximo de cada tramo (totalmente vectorizado)
+
+    La serie se reparte en n_tramos tramos de igual número de puntos.
+    Devuelve como mucho 2 * n_tramos posiciones ordenadas.
+    """
+    y = np.asarray(y, dtype='float64')
+    n = len(y)
+    if n <= 2 * n_tramos:
+        return np.arange(n)
+    inicios = np.linspace(0, n, n_tramos + 1).astype('int64')[:-1]
+    tramo = np.repeat(np.arange(n_tramos), np.diff(np.append(inicios, n)))
+    return indices_minmax_por_tramo(tramo, y)
+
+
+def indices_minmax_por_tramo(tramo, y):
+    """Posiciones del mínimo y el máximo de cada tramo, con los tramos dados
+
+    tramo es el número de tramo de cada punto (no decreciente). Se usa
+    np.minimum.reduceat/np.maximum.reduceat para calcular todos los tramos
+    a la vez. Devuelve como mucho dos posiciones ordenadas por tramo.
+    """
+    y = np.asarray(y, dtype='float64')
+    tramo = np.asarray(tramo)
+    n = len(y)
+    if n == 0:
+        return np.arange(0)
+
+    # Primer punto de cada tramo, y tramos renumerados 0, 1, 2...
+    inicios = np.flatnonzero(np.r_[True, tramo[1:] != tramo[:-1]])
+    tramo = np.repeat(np.arange(len(inicios)), np.diff(np.append(inicios, n)))
+
+    # Los NaN no pueden ser mínimo ni máximo
+    y_min = np.where(np.isnan(y), np.inf, y)
+    y_max = np.where(np.isnan(y), -np.inf, y)
+    minimos = np.minimum.reduceat(y_min, inicios)
+    maximos = np.maximum.reduceat(y_max, inicios)
+    es_min = y_min == minimos[tramo]
+    es_max = y_max == maximos[tramo]
+
+    # Primera aparición del mínimo y del máximo en cada tramo
+    pos = np.arange(n)
+    pos_min = np.full(len(inicios), n)
+    pos_max = np.full(len(inicios), n)
+    np.minimum.at(pos_min, tramo[es_min], pos[es_min])
+    np.minimum.at(pos_max, tramo[es_max], pos[es_max])
+
+    return np.unique(np.concatenate([pos_min, pos_max]))
+
+
+def indices_lttb(x, y, n_puntos):
+    """Posiciones elegidas por el algoritmo LTTB
+
+    El primer y el último punto se conservan siempre; el resto de la serie
+    se divide en n_puntos - 2 tramos. El cálculo de las áreas dentro de cada
+    tramo está vectorizado; solo el recorrido de los tramos es un bucle,
+    porque cada elección depende del punto elegido en el tramo anterior.
+    """
+    x = np.asarray(x, dtype='float64')
+    y = np.nan_to_num(np.asarray(y, dtype='float64'))
+    n = len(y)
+    if n_puntos >= n or n_puntos < 3:
+        return np.arange(n)
+
+    limites = np.linspace(1, n - 1, n_puntos - 1).astype('int64')
+
+    # Promedio de cada tramo (se usa como tercer vértice del triángulo)
+    media_x = np.add.reduceat(x[1:n - 1], limites[:-1] - 1) / np.diff(limites)
+    media_y = np.add.reduceat(y[1:n - 1], limites[:-1] - 1) / np.diff(limites)
+    media_x = np.append(media_x, x[-1])
+    media_y = np.append(media_y, y[-1])
+
+    elegidos = np.empty(n_puntos, dtype='int64')
+    elegidos[0], elegidos[-1] = 0, n - 1
+    anterior = 0
+    for i in range(n_puntos - 2):
+        inicio, fin = limites[i], limites[i + 1]
+        # Área (x2) del triángulo: punto anterior, candidato, media del tramo siguiente
+        areas = np.abs(
+            (x[anterior] - media_x[i + 1]) * (y[inicio:fin] - y[anterior])
+            - (x[anterior] - x[inicio:fin]) * (media_y[i + 1] - y[anterior])
+        )
+        anterior = inicio + int(np.argmax(areas))
+        elegidos[i + 1] = anterior
+    return elegidos
+
+
+def reducir_serie(datos, max_puntos=MAX_PUNTOS, metodo='minmax'):
+    """Reduce una Series o un DataFrame a como mucho unos max_puntos puntos
+
+    Devuelve el mismo tipo de objeto con un subconjunto de sus filas
+    (conserva el índice original), listo para st.line_chart().
+    En un DataFrame se reduce cada columna y se unen las filas elegidas,
+    repartiendo el presupuesto entre las columnas.
+    """
+    if metodo not in ('minmax', 'lttb'):
+        raise ValueError(f"Método de reducción desconocido: {metodo}")
+    if len(datos) <= max_puntos:
+        return datos
+
+    columnas = [datos] if isinstance(datos, pd.Series) else [datos[c] for c in datos.columns]
+    presupuesto = max(max_puntos // len(columnas), 3)
+
+    posiciones = []
+    for serie in columnas:
+        if metodo == 'minmax':
+            posiciones.append(indices_minmax(serie.to_numpy(dtype='float64', na_value=np.nan),
+                                             presupuesto // 2))
+        else:
+            posiciones.append(indices_lttb(_eje_x(serie),
+                                           serie.to_numpy(dtype='float64', na_value=np.nan),
+                                           presupuesto))
+    return datos.iloc[np.unique(np.concatenate(posiciones))]
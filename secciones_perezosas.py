@@ -0,0 +1,55 @@
+# ====================================
+# PESTAÑAS Y EXPANDERS PEREZOSOS
+# ====================================
+# Conceptos: evaluación perezosa, st.tabs / st.expander con on_change,
+#            .open, resultados guardados hasta que cambian sus entradas
+
+# Por defecto, Streamlit ejecuta el contenido de TODAS las pestañas y de
+# los expanders cerrados en cada ejecución: el navegador solo oculta lo
+# que no se ve, pero el servidor ya lo ha calculado y enviado.
+#
+# Con on_change="rerun", las pestañas y los expanders recuerdan cuál está
+# abierto (su atributo .open) y abrirlos vuelve a ejecutar el script (o el
+# fragmento donde estén). Así se puede calcular el contenido solo cuando
+# se muestra:
+#
+#     grafico, datos = pestanas_perezosas(["Gráfico", "Datos"], key="pestanas")
+#     if grafico.open:
+#         with grafico:
+#             serie = calcular_una_vez('serie', (filtros,), lambda: calcular(filtros))
+#             st.line_chart(serie)
+#
+# calcular_una_vez() guarda el resultado en st.session_state junto con sus
+# entradas: volver a abrir la pestaña no repite el cálculo mientras las
+# entradas (filtros, versión de los datos...) sigan siendo las mismas.
+
+import streamlit as st
+
+# Prefijo de las claves de st.session_state donde se guardan los resultados
+PREFIJO_RESULTADOS = '_seccion_perezosa_'
+
+
+def pestanas_perezosas(etiquetas, key, default=None):
+    """st.tabs() que sabe qué pestaña está abierta (pestaña.open)"""
+    return st.tabs(etiquetas, key=key, default=default, on_change="rerun")
+
+
+def expander_perezoso(etiqueta, key, expanded=False):
+    """st.expander() que sabe si está abierto (expander.open)"""
+    return st.expander(etiqueta, expanded=expanded, key=key, on_change="rerun")
+
+
+def calcular_una_vez(clave, entradas, funcion):
+    """Resultado de funcion(), recalculado solo si cambian las entradas
+
+    entradas debe describir todo aquello de lo que depende el resultado y
+    poder compararse con == (por ejemplo la clave de los filtros de
+    cache_filtros.clave_filtros). Los resultados son de cada sesión.
+    """
+    nombre = PREFIJO_RESULTADOS + clave
+    guardado = st.session_state.get(nombre)
+    if guardado is not None and guardado[0] == entradas:
+        return guardado[1]
+    resultado = funcion()
+    st.session_state[nombre] = (entradas, resultado)
+    return resultado
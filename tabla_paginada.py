@@ -0,0 +1,92 @@
+# ====================================
+# TABLA PAGINADA CON ORDENACIÓN PARCIAL
+# ====================================
+# Conceptos: paginación, ordenación parcial (np.partition / argpartition)
+
+# Para mostrar las ventas ordenadas por Total, lo habitual es
+# df.sort_values('Total') y enviar la tabla entera a st.dataframe().
+# Con 10 millones de filas eso significa ordenar todo (O(n log n)) y
+# serializar todo en cada ejecución, aunque el usuario solo vea 50 filas.
+#
+# Aquí solo se calcula la página visible: con np.partition se encuentran
+# los valores que delimitan la página en tiempo lineal, y solo se ordenan
+# las filas que caen dentro. Se puede saltar a cualquier página sin
+# ordenar ni copiar el DataFrame completo.
+
+import math
+
+import numpy as np
+import pandas as pd
+
+# Opciones de filas por página
+TAMANOS_PAGINA = [25, 50, 100, 500]
+
+
+def num_paginas(n_filas, tam_pagina):
+    """Número de páginas necesarias para n_filas (al menos 1)"""
+    return max(math.ceil(n_filas / tam_pagina), 1)
+
+
+def indices_rango(valores, inicio, fin, ascendente=True):
+    """Posiciones de las filas que ocupan los puestos [inicio, fin) al ordenar
+
+    Equivale a np.argsort(valores, kind='stable')[inicio:fin] pero sin
+    ordenar todo el array:
+      1. np.partition encuentra el valor del puesto inicio y del puesto fin-1.
+      2. Se eligen las filas con valores entre esos dos límites.
+      3. Solo esas filas se ordenan (por valor y, en empates, por posición).
+    Los empates se resuelven siempre por posición, así que las páginas
+    consecutivas nunca repiten ni se saltan filas.
+    """
+    valores = np.asarray(valores)
+    n = len(valores)
+    inicio, fin = max(inicio, 0), min(fin, n)
+    if inicio >= fin:
+        return np.empty(0, dtype='int64')
+
+    # Para orden descendente se invierte la clave (los NaN quedan al final)
+    clave = valores.astype('float64')
+    if not ascendente:
+        clave = -clave
+    clave = np.where(np.isnan(clave), np.inf, clave)
+
+    limite_inf, limite_sup = np.partition(clave, [inicio, fin - 1])[[inicio, fin - 1]]
+    antes = np.count_nonzero(clave < limite_inf)
+    candidatos = np.flatnonzero((clave >= limite_inf) & (clave <= limite_sup))
+
+    # np.lexsort ordena por la última clave y desempata con las anteriores
+    orden = np.lexsort((candidatos, clave[candidatos]))
+    return candidatos[orden][inicio - antes:fin - antes]
+
+
+def top_filas(df, columna, n, ascendente=False):
+    """Las n filas con mayor (o menor) valor en columna, ya ordenadas
+
+    Alternativa a df.sort_values(columna).head(n) que no ordena todo.
+    """
+    return df.iloc[indices_rango(df[columna].to_numpy(), 0, n, ascendente)]
+
+
+def pagina_ordenada(df, columna, pagina, tam_pagina, ascendente=False):
+    """Devuelve la página número 'pagina' (empezando en 1) de df ordenado por columna
+
+    Solo se copia y se envía al navegador la página pedida.
+    """
+    inicio = (pagina - 1) * tam_pagina
+    posiciones = indices_rango(df[columna].to_numpy(), inicio, inicio + tam_pagina, ascendente)
+    return df.iloc[posiciones]
+
+
+def pagina_ordenada_partes(partes, columna, pagina, tam_pagina, ascendente=False):
+    """Como pagina_ordenada() sobre pd.concat(partes), pero sin juntar las partes
+
+    De cada parte solo hacen falta sus primeras filas hasta el final de la
+    página: se juntan esas pocas filas y la página se elige entre ellas.
+    Los empates se resuelven como en el DataFrame concatenado.
+    """
+    con_filas = [parte for parte in partes if len(parte)] or list(partes[:1])
+    if len(con_filas) == 1:
+        return pagina_ordenada(con_filas[0], columna, pagina, tam_pagina, ascendente)
+    candidatas = pd.concat([top_filas(parte, columna, pagina * tam_pagina, ascendente)
+                            for parte in con_filas], ignore_index=True)
+    return pagina_ordenada(candidatas, columna, pagina, tam_pagina, ascendente)
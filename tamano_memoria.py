@@ -0,0 +1,42 @@
+# ====================================
+# TAMAÑO DE LOS VALORES EN MEMORIA
+# ====================================
+# Conceptos: memory_usage(deep=True), sys.getsizeof, presupuestos en bytes
+
+# Para acotar una caché o un almacén por memoria (y no solo por número de
+# entradas) hay que saber cuánto ocupa cada valor. sys.getsizeof() solo
+# mide el objeto exterior: una lista de DataFrames "ocuparía" unos pocos
+# bytes. tamano_valor() entra en los contenedores y usa la medida de cada
+# tipo.
+#
+# Lo usan estado_sesion.AlmacenEstado (presupuestos por sesión) y
+# cache_filtros.CacheLRU (límite en bytes).
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+
+def tamano_valor(valor):
+    """Bytes aproximados que ocupa un valor en memoria
+
+    DataFrames y arrays se miden con sus propios métodos (incluyendo los
+    strings), igual que los objetos con un método bytes_memoria(); listas,
+    tuplas, conjuntos y diccionarios suman sus elementos.
+    """
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(deep=True).sum())
+    if isinstance(valor, (pd.Series, pd.Index)):
+        return int(valor.memory_usage(deep=True))
+    if isinstance(valor, np.ndarray):
+        return int(valor.nbytes)
+    if hasattr(valor, 'bytes_memoria'):
+        # Objetos que llevan la cuenta de lo que ocupan (lista_tareas.ListaTareas)
+        return int(valor.bytes_memoria())
+    if isinstance(valor, (list, tuple, set, frozenset)):
+        return sys.getsizeof(valor) + sum(tamano_valor(v) for v in valor)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(tamano_valor(k) + tamano_valor(v)
+                                          for k, v in valor.items())
+    return sys.getsizeof(valor)
@@ -0,0 +1,166 @@
+# ====================================
+# VENTAS INCREMENTALES (MODO "APPEND")
+# ====================================
+# Conceptos: agregación incremental, versión de datos, invalidación de cachés
+
+# Las ventas no son un conjunto fijo: llegan lotes nuevos continuamente.
+# Si cada lote obligara a reconstruir el cubo con todas las filas, el coste
+# de añadir 1.000 ventas crecería con el histórico (millones de filas).
+#
+# Aquí cada lote se agrega por separado (construir_cubo() sobre el lote)
+# y se suma a los agregados existentes:
+#   - Cubo Producto × Región: solo se actualizan las celdas del lote
+#     (ver cubo_ventas.actualizar_cubo).
+#   - KPIs: total de ventas y número de ventas son dos sumas acumuladas;
+#     el ticket promedio se calcula a partir de ellas.
+#   - Rankings: se mantienen las ventas por producto y por región y el
+#     top-K se saca de ahí (tamaño = número de categorías, no de filas).
+# Las filas antiguas nunca se vuelven a recorrer.
+#
+# Las filas de los lotes solo hacen falta para la tabla de detalle, así
+# que se guardan solo las MAX_FILAS_RECIENTES más recientes: la memoria no
+# crece con el histórico de lotes, y cuando se acumulan muchos lotes
+# pequeños se juntan en un solo DataFrame.
+#
+# Cada lote incrementa la versión. Es un entero barato de comparar que las
+# cachés (st.cache_data, cache_filtros.CacheLRU) pueden usar en su clave
+# para saber cuándo sus resultados han quedado viejos.
+
+import threading
+
+import pandas as pd
+
+from cubo_ventas import (COLUMNA_FILAS, DIMENSIONES_CUBO, actualizar_cubo, combinar_cubos,
+                         construir_cubo)
+from datos_ventas import aplicar_esquema
+from ranking import top_k
+
+# Filas de los lotes más recientes que se conservan (para la tabla de detalle)
+MAX_FILAS_RECIENTES = 100_000
+
+# Con más lotes guardados que estos, se juntan en uno solo
+MAX_LOTES = 16
+
+
+class VentasIncrementales:
+    """Agregados de ventas que se actualizan lote a lote
+
+    df es el conjunto inicial (se recorre una sola vez). Después, anexar()
+    añade lotes con las mismas columnas que generar_datos(). Los agregados
+    incluyen todos los lotes; como filas solo se guardan las últimas
+    max_filas_recientes. Es seguro
+    usarlo desde varias sesiones a la vez (por ejemplo, guardado con
+    @st.cache_resource): las escrituras se hacen con un cerrojo.
+    """
+
+    def __init__(self, df=None, cubo=None, max_filas_recientes=MAX_FILAS_RECIENTES):
+        if cubo is None:
+            cubo = construir_cubo(df) if df is not None else combinar_cubos([])
+        self._cubo = cubo
+        self.max_filas_recientes = max_filas_recientes
+        self._lotes = []
+        self._filas_recientes = 0
+        self._cerrojo = threading.Lock()
+        self.version = 0
+        self.total_ventas = cubo['Total_suma'].sum()
+        self.numero_ventas = int(cubo[COLUMNA_FILAS].sum())
+        self._ventas = {
+            dimension: cubo.groupby(level=dimension, observed=True)['Total_suma'].sum()
+            for dimension in DIMENSIONES_CUBO
+        }
+
+    def anexar(self, lote):
+        """Añade un lote de ventas nuevas y devuelve la nueva versión
+
+        El coste depende solo del tamaño del lote.
+        """
+        lote = aplicar_esquema(lote)
+        parcial = construir_cubo(lote)
+        ventas_lote = {
+            dimension: parcial.groupby(level=dimension, observed=True)['Total_suma'].sum()
+            for dimension in DIMENSIONES_CUBO
+        }
+        with self._cerrojo:
+            self._cubo = actualizar_cubo(self._cubo, parcial)
+            for dimension, serie in ventas_lote.items():
+                self._ventas[dimension] = _sumar_serie(self._ventas[dimension], serie)
+            self.total_ventas += parcial['Total_suma'].sum()
+            self.numero_ventas += int(parcial[COLUMNA_FILAS].sum())
+            self._lotes.append(lote)
+            self._filas_recientes += len(lote)
+            self._recortar_lotes()
+            self.version += 1
+            return self.version
+
+    def _recortar_lotes(self):
+        """Descarta las filas más antiguas que no caben en max_filas_recientes
+
+        Si quedan muchos lotes, los junta en uno (el coste depende del
+        límite de filas, no del histórico). Se llama con el cerrojo tomado.
+        """
+        exceso = self._filas_recientes - self.max_filas_recientes
+        while exceso > 0:
+            primero = self._lotes[0]
+            if len(primero) <= exceso:
+                self._lotes.pop(0)
+                exceso -= len(primero)
+            else:
+                self._lotes[0] = primero.iloc[exceso:]
+                exceso = 0
+        if len(self._lotes) > MAX_LOTES:
+            self._lotes = [pd.concat(self._lotes, ignore_index=True)]
+        self._filas_recientes = sum(len(lote) for lote in self._lotes)
+
+    def cubo(self):
+        """Cubo Producto × Región actual
+
+        Los lectores reciben el objeto actual; como pandas copia al escribir
+        (copy-on-write), un anexar() posterior no modifica lo que ya tienen.
+        """
+        with self._cerrojo:
+            return self._cubo.copy(deep=False)
+
+    def instantanea(self):
+        """Versión, cubo y lotes recientes, leídos a la vez (siempre coherentes)"""
+        with self._cerrojo:
+            return {'version': self.version, 'cubo': self._cubo.copy(deep=False),
+                    'lotes': list(self._lotes)}
+
+    def kpis(self):
+        """total_ventas, numero_ventas y ticket_promedio sin filtros (O(1))"""
+        with self._cerrojo:
+            total, numero = self.total_ventas, self.numero_ventas
+        return {
+            'total_ventas': total,
+            'numero_ventas': numero,
+            'ticket_promedio': total / numero if numero > 0 else 0,
+        }
+
+    def ventas_por(self, dimension):
+        """Ventas totales por Producto o Región (sin filtros)"""
+        with self._cerrojo:
+            return self._ventas[dimension].rename('Total')
+
+    def top(self, dimension, k=5):
+        """Las k categorías con más ventas de una dimensión"""
+        return top_k(self.ventas_por(dimension), k)
+
+    def lotes(self):
+        """Lotes recientes, como mucho max_filas_recientes filas (para la tabla de detalle)"""
+        with self._cerrojo:
+            return list(self._lotes)
+
+
+def _sumar_serie(acumulada, parcial):
+    """Suma una serie parcial a la acumulada tocando solo sus etiquetas
+
+    Las etiquetas existentes se actualizan por posición; las nuevas se
+    añaden al final.
+    """
+    posiciones = acumulada.index.get_indexer(parcial.index)
+    existentes = posiciones >= 0
+    if existentes.any():
+        acumulada.iloc[posiciones[existentes]] += parcial.to_numpy()[existentes]
+    if not existentes.all():
+        acumulada = pd.concat([acumulada, parcial[~existentes]])
+    return acumulada